@@ -0,0 +1,180 @@
+# Background aggregation worker for the dashboard.
+#
+#   python aggregator.py --snapshot-dir data/snapshots --interval 300
+#
+# Every interval it computes each KPI and chart dataset the views read, spread
+# over a process pool (market KPIs as one mergeable partial per region shard),
+# and publishes them per (source, version) as one KPI file
+# next to the Arrow snapshots. The file is replaced atomically, so a dashboard
+# pointed at the same KASIPAY_SNAPSHOT_DIR only ever loads a complete set and
+# does no aggregation of its own. Inputs default to the dashboard's KASIPAY_*
+# environment variables.
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from analytics import (
+    DATA_SOURCE, DATA_VERSION, generate_frames, shard_frames, kpi_snapshot_path, write_kpi_snapshot, file_versions,
+    event_funnel,
+)
+from metrics import (
+    FRAME_NAMES, METRICS, PRE_POST_COLUMNS, MARKET_COLUMNS, MARKET_TOTAL_METRICS, resolve_metric, market_partial,
+    merge_market_partials, RETENTION_METRICS,
+)
+from retention import LedgerFeed
+from review_store import ReviewStore, ReviewFeed
+from snapshot_store import SnapshotStore
+
+# One pool task per group; metrics in a group share intermediate results. Market
+# KPIs (MARKET_TOTAL_METRICS) are merged from one task per region shard instead;
+# the cross-filter cubes are built over the whole frame, so their bins are shared.
+METRIC_GROUPS = [
+    ('review_aggregates', 'review_totals', 'avg_sentiment', 'verification_complaints', 'mpesa_requests', 'fee_mentions', 'keyword_counts'),
+    ('review_index',),
+    ('review_cube',),
+    ('market_cube',),
+    ('review_count', 'rating_counts', 'sentiment_counts'),
+    ('weekly_df', 'week_count') + tuple(f'{period}_avg_{key}' for key in PRE_POST_COLUMNS for period in ('pre', 'post')),
+    ('funnel_df', 'funnel_cohorts'),
+    tuple(RETENTION_METRICS),
+]
+REVIEW_SNAPSHOTS_KEPT = 3  # older ingested-review snapshots are removed
+
+
+def metric_dependencies(name):
+    deps = set()
+    for dep in METRICS.get(name, ((), None))[0]:
+        deps |= {dep} | metric_dependencies(dep)
+    return deps
+
+
+def publish_source(root, source, version):
+    SnapshotStore(root).publish(f'{source}-{version}', shard_frames(generate_frames(source)))
+
+
+def compute_metrics(root, frame_snapshots, names, seeded):
+    # Pool task: frames are memory-mapped from the Arrow snapshots, column by column
+    snapshots = SnapshotStore(root)
+    store = dict(seeded)
+    load = lambda frame, columns: snapshots.read(frame_snapshots[frame], frame, columns)
+    return {name: resolve_metric(name, store, load) for name in names}
+
+
+def compute_market_partial(root, snapshot, region):
+    # Pool task: reads one region's shard only
+    return region, market_partial(SnapshotStore(root).read(snapshot, 'market_df', MARKET_COLUMNS, shards=[region]))
+
+
+def merge_market(partials):
+    # market_partials, market_totals and every MARKET_TOTAL_METRICS entry
+    totals = merge_market_partials(partials.values())
+    return {
+        'market_partials': partials,
+        'market_totals': totals,
+        **{name: total_metric(totals) for name, total_metric in MARKET_TOTAL_METRICS.items()},
+    }
+
+
+def compute_event_funnel(paths):
+    funnel_df, funnel_cohorts = event_funnel(paths)
+    return {'funnel_df': funnel_df, 'funnel_cohorts': funnel_cohorts}
+
+
+def publish_reviews(snapshots, reviews):
+    snapshot = f'reviews-{reviews.version}'
+    if not snapshots.exists(snapshot):
+        snapshots.publish(snapshot, {'review_df': reviews.frame})
+        published = sorted(
+            (name for name in os.listdir(snapshots.root) if name.startswith('reviews-')),
+            key=lambda name: int(name.partition('-')[2]),
+        )
+        for name in published[:-REVIEW_SNAPSHOTS_KEPT]:
+            snapshots.remove(name)
+    return snapshot
+
+
+def aggregate(pool, root, source, version, feed=None, funnel_paths=(), last_key=None, ledger_feed=None):
+    # Publishes the KPI file for (source, version) unless its inputs are unchanged
+    # since last_key. Returns the key of the inputs it covers.
+    funnel_version = file_versions(funnel_paths) or None
+    reviews = feed.refresh() if feed is not None else None
+    ledger = ledger_feed.refresh() if ledger_feed is not None else None
+    key = (source, version, reviews.version if reviews is not None else None, funnel_version,
+           ledger.version if ledger is not None else None)
+    if key == last_key:
+        return key
+
+    snapshots = SnapshotStore(root)
+    frame_snapshots = dict.fromkeys(FRAME_NAMES, f'{source}-{version}')
+    if not snapshots.exists(frame_snapshots['market_df']):
+        pool.submit(publish_source, root, source, version).result()
+
+    values = {}
+    if reviews is not None:
+        frame_snapshots['review_df'] = publish_reviews(snapshots, reviews)
+        values.update(review_index=reviews.index, review_aggregates=reviews.aggregates, review_cube=reviews.cube)
+    if ledger is not None:
+        # The ledger state stays in this process; only the retention tables are published
+        values.update({name: retention_metric(ledger.state) for name, retention_metric in RETENTION_METRICS.items()})
+
+    market_snapshot = frame_snapshots['market_df']
+    market_jobs = [
+        pool.submit(compute_market_partial, root, market_snapshot, region)
+        for region in snapshots.shards(market_snapshot, 'market_df')
+    ]
+    jobs = []
+    if funnel_paths:
+        jobs.append(pool.submit(compute_event_funnel, tuple(funnel_paths)))
+    for group in METRIC_GROUPS:
+        names = [name for name in group if name not in values and not (funnel_paths and name.startswith('funnel_'))]
+        if names:
+            needed = set().union(*(metric_dependencies(name) for name in names))
+            seeded = {name: value for name, value in values.items() if name in needed}
+            jobs.append(pool.submit(compute_metrics, root, frame_snapshots, names, seeded))
+    for job in jobs:
+        values.update(job.result())
+    values.update(merge_market(dict(job.result() for job in market_jobs)))
+
+    write_kpi_snapshot(kpi_snapshot_path(root, source, version), {
+        'key': key,
+        'published_at': time.time(),
+        'frames': frame_snapshots,
+        'metrics': values,
+    })
+    return key
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-aggregate dashboard KPIs into published snapshots.")
+    parser.add_argument('--snapshot-dir', default=os.environ.get("KASIPAY_SNAPSHOT_DIR"), help="Arrow snapshot directory shared with the dashboard")
+    parser.add_argument('--source', default=DATA_SOURCE)
+    parser.add_argument('--version', default=DATA_VERSION)
+    parser.add_argument('--review-store', default=os.environ.get("KASIPAY_REVIEW_STORE"), help="review store filled by review_ingest.py")
+    parser.add_argument('--funnel-events', default=os.environ.get("KASIPAY_FUNNEL_EVENTS", ""), help="comma-separated event logs")
+    parser.add_argument('--ledger', default=os.environ.get("KASIPAY_LEDGER"), help="transaction ledger directory or comma-separated files")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--interval', type=float, default=300, help="seconds between runs")
+    parser.add_argument('--once', action='store_true', help="publish once and exit")
+    args = parser.parse_args(argv)
+    if not args.snapshot_dir:
+        parser.error("--snapshot-dir (or KASIPAY_SNAPSHOT_DIR) is required")
+
+    feed = ReviewFeed(ReviewStore(args.review_store)) if args.review_store else None
+    funnel_paths = [path for path in args.funnel_events.split(",") if path]
+    ledger_feed = LedgerFeed(args.ledger) if args.ledger else None
+    key = None
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        while True:
+            started = time.monotonic()
+            previous, key = key, aggregate(pool, args.snapshot_dir, args.source, args.version, feed, funnel_paths, key, ledger_feed)
+            if key != previous:
+                print(f"Published KPIs for {args.source}-{args.version} in {time.monotonic() - started:.1f}s", flush=True)
+            if args.once:
+                break
+            time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
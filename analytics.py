@@ -0,0 +1,517 @@
+# UI-free analytics core: data loading, KPI computation and chart-data preparation.
+# The dashboard is a renderer on top of it; batch jobs, benchmarks and the
+# aggregation worker import it without Streamlit or plotly (figures live in
+# charts.py, which imports plotly on first use).
+import os
+import pickle
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, TimeoutError as FutureTimeoutError, wait
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from chart_data import downsample
+from funnel import build_funnel_table, furthest_stages, compute_funnel, compute_cohort_funnels
+from impact import MIN_PERIOD_SIZE, impact_estimate
+from metrics import (
+    FRAME_NAMES, INTERVENTION_DATE, PRE_POST_COLUMNS, REGION_COLUMN, MARKET_COLUMNS, MARKET_TOTAL_METRICS,
+    MARKET_CUBE_METRICS, REVIEW_CUBE_METRICS, MARKET_CUBE_DIMENSIONS, REVIEW_CUBE_DIMENSIONS,
+    resolve_metric, dependent_metrics, market_partial, merge_market_partials,
+)
+from review_store import GRANULARITIES
+from schema import conform, validate_frame
+from snapshot_store import SnapshotStore
+from synthetic_data import DATA_SOURCES
+
+DATA_SOURCE = os.environ.get("KASIPAY_DATA_SOURCE", "synthetic")
+DATA_VERSION = os.environ.get("KASIPAY_DATA_VERSION", "2025-10")
+
+# Chart-data reduction: time series are downsampled to a per-chart point budget
+DEFAULT_POINT_BUDGET = int(os.environ.get("KASIPAY_POINT_BUDGET", 1000))
+POINT_BUDGETS = {}  # chart id -> budget, overriding the default
+DOWNSAMPLE_METHOD = os.environ.get("KASIPAY_DOWNSAMPLE_METHOD", "lttb")
+
+
+# Frame sources
+# A source is {frame name: load()}; the loads are independent and run concurrently.
+# "files" reads one export per frame from KASIPAY_DATA_DIR.
+FILE_SOURCE = "files"
+DATA_DIR = os.environ.get("KASIPAY_DATA_DIR", "data")
+LOAD_TIMEOUT = float(os.environ.get("KASIPAY_LOAD_TIMEOUT", 60))  # seconds per source
+LOAD_TIMEOUTS = {}  # frame name -> timeout, overriding the default
+LOAD_STATUSES = ('not started', 'loading', 'ready', 'failed', 'timed out')
+
+
+def read_frame_file(path):
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+
+
+def file_source(directory):
+    # <directory>/<frame name>.parquet, or .csv when there is no Parquet export
+    loaders = {}
+    for name in FRAME_NAMES:
+        path = os.path.join(directory, f'{name}.parquet')
+        if not os.path.exists(path):
+            path = os.path.join(directory, f'{name}.csv')
+        loaders[name] = partial(read_frame_file, path)
+    return loaders
+
+
+def source_loaders(source):
+    # {frame name: load()} of a data source, as the source produces them
+    if source == FILE_SOURCE:
+        return file_source(DATA_DIR)
+    if source not in DATA_SOURCES:
+        raise ValueError(f"Unknown data source: {source!r}")
+    return DATA_SOURCES[source]()
+
+
+def load_compact(name, load):
+    # A frame in its compact schema (see schema.py)
+    return validate_frame(name, conform(name, load()))
+
+
+def compact_loaders(source):
+    return {name: partial(load_compact, name, load) for name, load in source_loaders(source).items()}
+
+
+class FrameLoader:
+    # Runs the loads of a source on a thread pool, all at once. Each load has its own
+    # timeout, counted from start(); a load still running past it is reported as
+    # 'timed out' and its result is never used.
+
+    def __init__(self, loaders, timeouts=None):
+        self.loaders = dict(loaders)
+        self.timeouts = {
+            name: (timeouts or {}).get(name, LOAD_TIMEOUTS.get(name, LOAD_TIMEOUT)) for name in self.loaders
+        }
+        self._futures = {}
+        self._deadlines = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._futures or not self.loaders:
+                return
+            pool = ThreadPoolExecutor(max_workers=len(self.loaders), thread_name_prefix='frame-load')
+            started = time.monotonic()
+            for name, load in self.loaders.items():
+                self._futures[name] = pool.submit(load)
+                self._deadlines[name] = started + self.timeouts[name]
+            # Workers exit once their load returns
+            pool.shutdown(wait=False)
+
+    def status(self, name):
+        # One of LOAD_STATUSES
+        future = self._futures.get(name)
+        if future is None:
+            return 'not started'
+        if future.done():
+            return 'failed' if future.exception() is not None else 'ready'
+        return 'timed out' if time.monotonic() > self._deadlines[name] else 'loading'
+
+    def error(self, name):
+        if self.status(name) == 'timed out':
+            return f"{name} did not load within {self.timeouts[name]:g}s"
+        future = self._futures.get(name)
+        return str(future.exception()) if future is not None and future.done() else None
+
+    def loading(self):
+        return [name for name in self.loaders if self.status(name) == 'loading']
+
+    def complete(self):
+        return all(self.status(name) == 'ready' for name in self.loaders)
+
+    def result(self, name):
+        # The loaded frame, waiting for it when needed; TimeoutError past its timeout
+        self.start()
+        try:
+            return self._futures[name].result(timeout=max(0.0, self._deadlines[name] - time.monotonic()))
+        except FutureTimeoutError:
+            raise TimeoutError(self.error(name)) from None
+
+    def results(self):
+        return {name: self.result(name) for name in self.loaders}
+
+    def wait_next(self):
+        # Blocks until one more load finishes or times out; returns the loads still running
+        loading = self.loading()
+        if loading:
+            timeout = min(self._deadlines[name] for name in loading) - time.monotonic()
+            wait([self._futures[name] for name in loading], max(0.0, timeout), FIRST_COMPLETED)
+        return self.loading()
+
+
+def generate_frames(source):
+    # Frames of a data source in their compact schema, loaded concurrently
+    return FrameLoader(compact_loaders(source)).results()
+
+
+# Snapshot shards: frame name -> column whose values each get their own file
+SHARD_COLUMNS = {'market_df': REGION_COLUMN}
+
+
+def shard_frames(frames):
+    # frames as SnapshotStore.publish() takes them, sharded frames as {value: rows}
+    sharded = dict(frames)
+    for name, column in SHARD_COLUMNS.items():
+        if name in sharded:
+            sharded[name] = {
+                str(value): shard.reset_index(drop=True)
+                for value, shard in sharded[name].groupby(column, observed=True, sort=True)
+            }
+    return sharded
+
+
+class MetricStore:
+    # Frames and memoized metrics of one (source, version). Frames come from the
+    # Arrow snapshots under snapshot_dir when given (published once every frame has
+    # loaded), otherwise from the source's loaders, which run concurrently; see
+    # frame_status() for frames still on their way. Values are shared by every
+    # caller and must be treated as read-only.
+
+    def __init__(self, source=DATA_SOURCE, version=DATA_VERSION, snapshot_dir=None, loaders=None, timeouts=None):
+        self.source = source
+        self.version = version
+        self.snapshots = SnapshotStore(snapshot_dir) if snapshot_dir else None
+        self.loader = FrameLoader(compact_loaders(source) if loaders is None else loaders, timeouts)
+        self.frame_snapshots = {}  # frame name -> snapshot, overriding '<source>-<version>'
+        self.published_key = None
+        self.values = {}
+        self.impacts = {}  # (frame, column, cut-over) -> impact estimate
+        self.region_shards = {}  # region -> market partial, read from its shard alone
+        self.hits = 0
+        self.misses = 0
+
+    def frames(self):
+        # All loaded frames of the source, waiting for the rest
+        return self.loader.results()
+
+    def frame_snapshot(self, name):
+        return self.frame_snapshots.get(name, f'{self.source}-{self.version}')
+
+    def _snapshot_exists(self, name):
+        return self.snapshots is not None and self.snapshots.exists(self.frame_snapshot(name))
+
+    def start_loading(self):
+        # Starts loading in the background every frame the snapshots do not already hold
+        if not all(name in self.values or self._snapshot_exists(name) for name in self.loader.loaders):
+            self.loader.start()
+
+    def frame_status(self, name):
+        # One of LOAD_STATUSES; a frame that is not started loads on first use
+        if name in self.values or self._snapshot_exists(name):
+            return 'ready'
+        return self.loader.status(name)
+
+    def frame_error(self, name):
+        return self.loader.error(name)
+
+    def load_frame(self, name, columns=None):
+        if self.snapshots is not None and not self._snapshot_exists(name) and self.loader.complete():
+            self.snapshots.publish(self.frame_snapshot(name), shard_frames(self.frames()))
+        if self._snapshot_exists(name):
+            return self.snapshots.read(self.frame_snapshot(name), name, columns)
+        frame = self.loader.result(name)
+        return frame if columns is None else frame[list(columns)]
+
+    def get(self, name):
+        if name in self.values:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return resolve_metric(name, self.values, self.load_frame)
+
+    def _market_shards(self):
+        # Region shard names when the market survey is read from a sharded snapshot
+        if 'market_partials' in self.values or not self._snapshot_exists('market_df'):
+            return []
+        return self.snapshots.shards(self.frame_snapshot('market_df'), 'market_df')
+
+    def regions(self):
+        return self._market_shards() or sorted(self.get('market_partials'))
+
+    def region_partials(self, regions):
+        # Market partials of the given regions. From a sharded snapshot only those
+        # regions' shards are read, and live stalls added; otherwise they come from
+        # the full set, live stalls included.
+        if not self._market_shards():
+            partials = self.get('market_partials')
+            return [partials[region] for region in regions]
+        for region in regions:
+            if region not in self.region_shards:
+                shard = self.snapshots.read(self.frame_snapshot('market_df'), 'market_df', MARKET_COLUMNS, shards=[region])
+                self.region_shards[region] = market_partial(shard)
+        partials = {region: self.region_shards[region] for region in regions}
+        live_events = self.values.get('live_events')
+        if live_events is not None:
+            partials = live_events.add_partials(partials)
+        return [partials[region] for region in regions]
+
+    def impact(self, column, cutover, frame='weekly_df'):
+        # Before/after estimate of a column split at cutover, computed once per (frame, column, cut-over)
+        key = (frame, column, pd.Timestamp(cutover))
+        if key not in self.impacts:
+            self.impacts[key] = period_impact(self.get(frame), column, key[2])
+        return self.impacts[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.values),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def rows(self, name, positions):
+        # Selected rows of a frame without loading the whole frame when avoidable
+        if name in self.values:
+            return self.values[name].iloc[positions]
+        if not self._snapshot_exists(name):
+            return self.loader.result(name).iloc[positions]
+        return self.snapshots.take(self.frame_snapshot(name), name, positions)
+
+    def update_frame(self, name, frame, **maintained):
+        # Swap in a new frame and drop every metric that depends on it, directly or not.
+        # Metrics the caller keeps up to date itself are passed as keywords and kept.
+        for stale in dependent_metrics(name, list(self.values)):
+            self.values.pop(stale, None)
+        self.impacts = {key: value for key, value in self.impacts.items() if key[0] != name}
+        if name == 'market_df':
+            self.region_shards = {}
+        self.values[name] = frame
+        self.values.update(maintained)
+
+    def apply_published(self, kpis):
+        # Replace everything with a KPI file from aggregator.py, unless already applied
+        if self.published_key != kpis['key']:
+            self.values = dict(kpis['metrics'])
+            self.impacts = {}
+            self.region_shards = {}
+            self.frame_snapshots = dict(kpis['frames'])
+            self.published_key = kpis['key']
+
+
+# Published KPI files, written by aggregator.py next to the Arrow snapshots
+def kpi_snapshot_path(root, source, version):
+    return os.path.join(root, f'{source}-{version}.kpis.pkl')
+
+
+def write_kpi_snapshot(path, payload):
+    # Written beside the target and renamed over it, so readers see the old or the new file
+    fd, tmp_path = tempfile.mkstemp(prefix='.kpis-', dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_kpi_snapshot(path):
+    # {'key', 'published_at', 'frames': frame name -> snapshot, 'metrics': name -> value}
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+# Event-log funnels
+def file_versions(paths):
+    return tuple((os.path.getmtime(path), os.path.getsize(path)) for path in paths)
+
+
+def event_funnel(paths):
+    # funnel_df and per-signup-week funnels computed from event logs
+    state = furthest_stages(list(paths))
+    return compute_funnel(state), compute_cohort_funnels(state)
+
+
+def cohort_funnel(funnel_df, funnel_cohorts, cohort=None):
+    # funnel_df for one signup week ('YYYY-MM-DD'), or all users when cohort is None
+    if cohort is None:
+        return funnel_df
+    return build_funnel_table(funnel_cohorts.loc[cohort].to_numpy())
+
+
+def cohort_weeks(funnel_cohorts):
+    if funnel_cohorts is None:
+        return []
+    return [week.strftime('%Y-%m-%d') for week in funnel_cohorts.index]
+
+
+# Chart data
+def reduce_series(chart_id, frame, x, y):
+    return downsample(frame, x, y, POINT_BUDGETS.get(chart_id, DEFAULT_POINT_BUDGET), DOWNSAMPLE_METHOD)
+
+
+def histogram_bars(histogram):
+    # Bar centers and widths for pre-binned (edges, all counts, user counts)
+    edges, all_counts, user_counts = histogram
+    return (edges[:-1] + edges[1:]) / 2, np.diff(edges), all_counts, user_counts
+
+
+def dropoff_table(funnel_df):
+    dropoff = funnel_df[funnel_df['Drop-off_Count'] > 0]
+    return pd.DataFrame({
+        'Stage': dropoff['Funnel_Stage'],
+        'Lost Users': dropoff['Drop-off_Count'],
+        'Drop-off_Rate': dropoff['Drop-off_Rate'],
+    })
+
+
+def keyword_counts(store, selection=None):
+    return filtered_metric(store, 'keyword_counts', selection)
+
+
+def sentiment_trend(store, granularity='week', selection=None):
+    reviews = cube_selection(selection, REVIEW_CUBE_DIMENSIONS)
+    if reviews:
+        series = cube_sentiment_series(store.get('review_cube'), reviews, granularity)
+    else:
+        series = store.get('review_aggregates').series(granularity)
+    return reduce_series('sentiment_trend', series, 'Period', 'Sentiment_Score')
+
+
+# Region filter
+def regional_metric(store, name, regions=None):
+    # A market KPI (see MARKET_TOTAL_METRICS) over the given regions, or all when None
+    if regions is None:
+        return store.get(name)
+    return MARKET_TOTAL_METRICS[name](merge_market_partials(store.region_partials(regions)))
+
+
+# Cross-filter
+# A selection maps cube dimensions (see metrics.py) to chosen labels; charts take it
+# as (dimension, labels) pairs so it can be part of a cache key. Selected KPIs are
+# answered from the market or review cube, unselected ones as before.
+def cube_selection(selection, dimensions):
+    return {dimension: list(labels) for dimension, labels in dict(selection or ()).items()
+            if dimension in dimensions and len(labels)}
+
+
+def filtered_metric(store, name, selection=None, regions=None):
+    # A market or review KPI over the stalls or reviews matching selection
+    if name in MARKET_CUBE_METRICS:
+        market = cube_selection(selection, MARKET_CUBE_DIMENSIONS)
+        if not market:
+            return regional_metric(store, name, regions)
+        if regions is not None:
+            market[REGION_COLUMN] = list(regions)
+        return MARKET_CUBE_METRICS[name](store.get('market_cube'), market)
+    reviews = cube_selection(selection, REVIEW_CUBE_DIMENSIONS)
+    if not reviews:
+        return store.get(name)
+    return REVIEW_CUBE_METRICS[name](store.get('review_cube'), reviews)
+
+
+def cube_sentiment_series(cube, selection, granularity='week'):
+    # Review count and mean sentiment per period, as ReviewAggregates.series() for the selected reviews
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity!r} (expected one of {list(GRANULARITIES)})")
+    periods = GRANULARITIES[granularity](pd.Series(cube.labels['Day'])).to_numpy()
+    table = pd.DataFrame({
+        'Reviews': cube.marginal('Day', selection).to_numpy(),
+        'Sentiment_Score': cube.marginal('Day', selection, 'sentiment').to_numpy(),
+    }).groupby(periods).sum()
+    table = table[table['Reviews'] > 0]
+    return table.assign(Sentiment_Score=table['Sentiment_Score'] / table['Reviews']).rename_axis('Period').reset_index()
+
+
+def filter_options(store, dimension):
+    # Labels a cross-filter dimension offers; reviews are filtered by 'Week', which
+    # the review cube answers from its days
+    if dimension in MARKET_CUBE_DIMENSIONS:
+        return list(store.get('market_cube').labels[dimension])
+    cube = store.get('review_cube')
+    if dimension == 'Week':
+        return list(GRANULARITIES['week'](pd.Series(cube.labels['Day'])).unique())
+    return list(cube.labels[dimension])
+
+
+def point_labels(store, dimension, values):
+    # Filter labels of the clicked points of a chart (see CHART_SELECTIONS)
+    if dimension == 'Transactions':
+        buckets = store.get('market_cube').labels['Transactions']
+        return [buckets[position] for position in buckets.get_indexer(np.asarray(values, dtype=float)) if position >= 0]
+    if dimension == 'Week':
+        days = pd.Series(pd.to_datetime(values)).dt.normalize()
+        return list(GRANULARITIES['week'](days).unique())
+    options = filter_options(store, dimension)
+    return [option for option in options if option in values]
+
+
+def filter_selection(store, filters):
+    # Cube selection for {dimension: chosen labels} from the dashboard filters
+    selection = {dimension: labels for dimension, labels in filters.items() if len(labels) and dimension != 'Week'}
+    if len(filters.get('Week', ())):
+        days = pd.Series(store.get('review_cube').labels['Day'])
+        selection['Day'] = list(days[GRANULARITIES['week'](days).isin(filters['Week'])])
+    return selection
+
+
+def selection_key(selection):
+    # Hashable form of {dimension: labels}, for chart parameters
+    return tuple(sorted((dimension, tuple(labels)) for dimension, labels in (selection or {}).items() if len(labels)))
+
+
+# Impact estimates; a cut-over is the first date of the "after" period
+BEFORE_AFTER_LABELS = ['Weekly New Users', 'Onboarding Drop-off', 'Customer Satisfaction', 'Support Tickets']
+
+
+def period_impact(frame, column, cutover, date_column='Date'):
+    # Weeks without a value (no live events of that kind yet) are left out
+    after = (frame[date_column] >= cutover).to_numpy()
+    values = frame[column].to_numpy(dtype=float)
+    observed = ~np.isnan(values)
+    return impact_estimate(values[~after & observed], values[after & observed])
+
+
+def cutover_options(frame, date_column='Date'):
+    # Dates that leave enough observations on both sides for an estimate
+    dates = list(frame[date_column])
+    return dates[MIN_PERIOD_SIZE:len(dates) - MIN_PERIOD_SIZE + 1]
+
+
+def default_cutover(frame, date_column='Date'):
+    # First date on or after the intervention
+    dates = frame[date_column]
+    return dates[dates >= INTERVENTION_DATE].iloc[0]
+
+
+def cutover_week(frame, cutover):
+    return int(frame.loc[frame['Date'] >= cutover, 'Week'].iloc[0])
+
+
+def format_interval(interval, fmt):
+    low, high = interval
+    return f"{fmt.format(low)} to {fmt.format(high)}"
+
+
+def period_averages(store):
+    # {key: (before, after)} for each weekly measure in PRE_POST_COLUMNS
+    return {key: (store.get(f'pre_avg_{key}'), store.get(f'post_avg_{key}')) for key in PRE_POST_COLUMNS}
+
+
+def before_after_table(store, cutover=None):
+    # Period means of each measure in PRE_POST_COLUMNS, split at cutover (the
+    # intervention by default), with the difference and percent change and their intervals
+    weekly_df = store.get('weekly_df')
+    cutover = default_cutover(weekly_df) if cutover is None else cutover
+    impacts = [store.impact(column, cutover) for column in PRE_POST_COLUMNS.values()]
+    return pd.DataFrame({
+        'Metric': BEFORE_AFTER_LABELS,
+        'Before': [impact['before'] for impact in impacts],
+        'After': [impact['after'] for impact in impacts],
+        'Difference': [impact['difference'] for impact in impacts],
+        'Difference CI': [format_interval(impact['difference_ci'], "{:+.2f}") for impact in impacts],
+        'Improvement': [f"{impact['percent_change']:+.0f}%" for impact in impacts],
+        'Improvement CI': [format_interval(impact['percent_change_ci'], "{:+.0f}%") for impact in impacts],
+    })
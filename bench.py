@@ -0,0 +1,333 @@
+# Headless benchmarks for the dashboard data paths.
+#
+#   python bench.py --sizes 1e2,1e4,1e6 --output bench-results.json
+#   python bench.py --sizes 1e2,1e4,1e6 --compare bench-results.json
+#
+# Each stage of each view (data generation, KPI computation, chart-data
+# preparation, figure build and serialization) runs at every size, where size is
+# the number of stalls, reviews, funnel users and ledger users alike. Per stage it records wall
+# time, peak RSS and, in a separate traced pass, Python/numpy allocations.
+# Results are written as JSON; --compare exits non-zero on wall-time regressions.
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from analytics import (
+    MetricStore, generate_frames, sentiment_trend, before_after_table, cutover_options, regional_metric,
+    filtered_metric, keyword_counts,
+)
+from charts import build_chart, view_charts
+from funnel import CHUNK_SIZE, reduce_events, compute_funnel, compute_cohort_funnels
+from metrics import (
+    FRAME_NAMES, MARKET_TOTAL_METRICS, MARKET_CUBE_METRICS, REVIEW_CUBE_METRICS, build_payment_index, count_payment_methods,
+)
+from perf import current_rss
+from retention import RetentionState
+from schema import conform
+from synthetic_data import generate_market_data, generate_ledger, generate_dataset
+
+DEFAULT_SIZES = [100, 10_000, 1_000_000]
+RSS_SAMPLE_INTERVAL = 0.005  # seconds
+MIN_COMPARED_SECONDS = 0.001  # faster stages are too noisy to flag
+
+
+def generate_reviews(n, seed=42):
+    # n reviews resampled from the synthetic ones, spread over a year
+    base = generate_frames('synthetic')['review_df']
+    rng = np.random.default_rng(seed)
+    reviews = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    reviews['Review_ID'] = np.char.add('R', np.arange(1, n + 1).astype(str))
+    reviews['Date'] = pd.Timestamp('2025-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 365, n)), unit='D')
+    reviews['Sentiment_Score'] = np.clip(rng.normal(0.35, 0.5, n), -1, 1)
+    return conform('review_df', reviews)
+
+
+def build_figures(ctx, view):
+    # What st.plotly_chart ships to the browser, for each chart of the view, serialized
+    # as it does; the figures are kept, as the dashboard's FigureCache keeps them
+    import plotly.io as pio
+    ctx.setdefault('figures', {})[view] = [build_chart(chart_id, ctx['store']) for chart_id in view_charts(view)]
+    return [pio.to_json(fig, validate=False) for fig in ctx['figures'][view]]
+
+
+def serialize_cached_figures(ctx, view):
+    # A rerun on FigureCache hits: only the serialization st.plotly_chart still does
+    import plotly.io as pio
+    return [pio.to_json(fig, validate=False) for fig in ctx['figures'][view]]
+
+
+def stage_import_plotly(ctx, n):
+    # charts.py imports plotly on first build; paid here so figure stages are steady-state
+    importlib.import_module('plotly.express')
+
+
+def stage_market(ctx, n):
+    ctx['market_df'] = conform('market_df', generate_market_data(n))
+
+
+def stage_reviews(ctx, n):
+    ctx['review_df'] = generate_reviews(n)
+    frames = generate_frames('synthetic')
+    ctx['funnel_df'], ctx['weekly_df'] = frames['funnel_df'], frames['weekly_df']
+
+
+def stage_events(ctx, n):
+    ctx['events'] = generate_dataset('funnel_events', n)
+
+
+def stage_ledger(ctx, n):
+    ctx['ledger'] = generate_ledger(n_users=n)
+
+
+def metric_stage(*names):
+    return lambda ctx, n: [ctx['store'].get(name) for name in names]
+
+
+def stage_payment_counts(ctx, n):
+    # From the market frame itself: the payment_counts metric only sums the cached
+    # market partials, which the market_partials stage already computed
+    count_payment_methods(build_payment_index(ctx['market_df']))
+
+
+def stage_region_filter(ctx, n):
+    # Every market KPI over two regions, merged from their partials
+    regions = tuple(ctx['store'].regions()[:2])
+    for name in MARKET_TOTAL_METRICS:
+        regional_metric(ctx['store'], name, regions)
+
+
+def stage_market_cross_filter(ctx, n):
+    # Every market KPI under a barrier, payment method and region selection
+    selection = (('Barrier', ('Phone too old',)), ('Payment', ('SnapScan', 'Zapper')))
+    for name in MARKET_CUBE_METRICS:
+        filtered_metric(ctx['store'], name, selection, tuple(ctx['store'].regions()[:2]))
+
+
+def stage_review_cross_filter(ctx, n):
+    selection = (('Rating', (1, 2)), ('Keyword', ('Fees',)))
+    for name in REVIEW_CUBE_METRICS:
+        if name != 'keyword_counts':
+            filtered_metric(ctx['store'], name, selection)
+    keyword_counts(ctx['store'], selection)
+    sentiment_trend(ctx['store'], 'week', selection)
+
+
+def stage_sentiment_trend(ctx, n):
+    for granularity in ('day', 'week', 'month'):
+        sentiment_trend(ctx['store'], granularity)
+
+
+def stage_review_page(ctx, n):
+    ctx['store'].get('review_index').page(0, 10, rating=5, band=2)
+
+
+def stage_event_funnel(ctx, n):
+    # As in the dashboard with KASIPAY_FUNNEL_EVENTS set
+    state = reduce_events(ctx['events'])
+    ctx['store'].update_frame('funnel_df', compute_funnel(state), funnel_cohorts=compute_cohort_funnels(state))
+
+
+def stage_retention(ctx, n):
+    # As in the dashboard with KASIPAY_LEDGER set, one ledger chunk at a time
+    state = RetentionState()
+    ledger = ctx['ledger']
+    for start in range(0, len(ledger), CHUNK_SIZE):
+        state = state.extend(ledger.iloc[start:start + CHUNK_SIZE])
+    ctx['store'].update_frame('retention', state)
+
+
+def stage_impacts(ctx, n):
+    # Every cut-over the slider offers, with the estimate cache cold as after a data change
+    store = ctx['store']
+    store.impacts = {}
+    for cutover in cutover_options(store.get('weekly_df')):
+        before_after_table(store, cutover)
+
+
+def figure_stage(view):
+    return lambda ctx, n: build_figures(ctx, view)
+
+
+def cached_figure_stage(view):
+    return lambda ctx, n: serialize_cached_figures(ctx, view)
+
+
+# (view, stage, fn(ctx, size)); stages run in this order and share ctx
+STAGES = [
+    ('data', 'import_plotly', stage_import_plotly),
+    ('data', 'generate_market', stage_market),
+    ('data', 'generate_reviews', stage_reviews),
+    ('data', 'generate_events', stage_events),
+    ('data', 'generate_ledger', stage_ledger),
+    ('Overview', 'market_partials', metric_stage('market_partials')),
+    ('Overview', 'kpis', metric_stage('market_share', *(
+        f'{period}_avg_{key}' for key in ('users', 'dropoff', 'satisfaction') for period in ('pre', 'post')
+    ))),
+    ('Overview', 'sentiment_counts', metric_stage('sentiment_counts')),
+    ('Overview', 'figures', figure_stage('Overview')),
+    ('Overview', 'cached_figures', cached_figure_stage('Overview')),
+    ('Market Analysis', 'payment_counts', stage_payment_counts),
+    ('Market Analysis', 'reason_counts', metric_stage('reason_counts')),
+    ('Market Analysis', 'transaction_histogram', metric_stage('transaction_histogram')),
+    ('Market Analysis', 'region_filter', stage_region_filter),
+    ('Market Analysis', 'market_cube', metric_stage('market_cube')),
+    ('Market Analysis', 'cross_filter', stage_market_cross_filter),
+    ('Market Analysis', 'figures', figure_stage('Market Analysis')),
+    ('Market Analysis', 'cached_figures', cached_figure_stage('Market Analysis')),
+    ('Onboarding Funnel', 'event_funnel', stage_event_funnel),
+    ('Onboarding Funnel', 'figures', figure_stage('Onboarding Funnel')),
+    ('Onboarding Funnel', 'cached_figures', cached_figure_stage('Onboarding Funnel')),
+    ('Customer Feedback', 'rating_counts', metric_stage('rating_counts')),
+    ('Customer Feedback', 'review_aggregates', metric_stage('review_aggregates', 'avg_sentiment', 'verification_complaints', 'mpesa_requests', 'fee_mentions')),
+    ('Customer Feedback', 'sentiment_trend', stage_sentiment_trend),
+    ('Customer Feedback', 'review_index', metric_stage('review_index')),
+    ('Customer Feedback', 'review_page', stage_review_page),
+    ('Customer Feedback', 'review_cube', metric_stage('review_cube')),
+    ('Customer Feedback', 'cross_filter', stage_review_cross_filter),
+    ('Customer Feedback', 'figures', figure_stage('Customer Feedback')),
+    ('Customer Feedback', 'cached_figures', cached_figure_stage('Customer Feedback')),
+    ('Retention', 'ledger', stage_retention),
+    ('Retention', 'matrix', metric_stage('retention_matrix', 'retention_curve', 'retention_cohort_sizes')),
+    ('Retention', 'figures', figure_stage('Retention')),
+    ('Retention', 'cached_figures', cached_figure_stage('Retention')),
+    ('Impact Analysis', 'impacts', stage_impacts),
+    ('Impact Analysis', 'figures', figure_stage('Impact Analysis')),
+    ('Impact Analysis', 'cached_figures', cached_figure_stage('Impact Analysis')),
+]
+
+
+class PeakRSS:
+    # Samples resident memory on a background thread while the stage runs
+
+    def __enter__(self):
+        self.start = self.peak = current_rss()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._done.wait(RSS_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, current_rss())
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def run_stage(fn, ctx, n, repeat):
+    # Best of `repeat` timed runs, then one traced run for allocations. Metrics a
+    # run computes are dropped before the next, so each run does the stage's full
+    # work; those of the traced run are kept for later stages, as in the dashboard.
+    store = ctx['store'].values
+    seconds = []
+    for _ in range(repeat):
+        known = set(store)
+        with PeakRSS() as rss:
+            started = time.perf_counter()
+            fn(ctx, n)
+            seconds.append(time.perf_counter() - started)
+        for name in set(store) - known:
+            del store[name]
+    tracemalloc.start()
+    fn(ctx, n)
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    return {
+        'seconds': min(seconds),
+        'peak_rss_bytes': rss.peak,
+        'rss_growth_bytes': rss.peak - rss.start,
+        'alloc_peak_bytes': peak,
+        'alloc_retained_bytes': current,
+        'alloc_retained_blocks': blocks,
+    }
+
+
+def run(sizes, repeat=1, views=None):
+    results = []
+    for n in sizes:
+        ctx = {}
+        # Frames are read straight from ctx, where the data stages put them
+        ctx['store'] = MetricStore(loaders={name: partial(ctx.__getitem__, name) for name in FRAME_NAMES})
+        for view, stage, fn in STAGES:
+            if views and view not in views and view != 'data':
+                continue
+            result = run_stage(fn, ctx, n, repeat)
+            results.append({'view': view, 'stage': stage, 'size': n, **result})
+            print(f"{n:>12,}  {view:<18} {stage:<22} {result['seconds'] * 1000:>10.1f} ms"
+                  f"  {result['peak_rss_bytes'] / 2**20:>8.0f} MiB RSS"
+                  f"  {result['alloc_peak_bytes'] / 2**20:>8.1f} MiB allocated", flush=True)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(results, baseline, threshold):
+    # Stages whose best wall time grew by more than threshold (a fraction) over baseline
+    previous = {(r['view'], r['stage'], r['size']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    for r in results:
+        before = previous.get((r['view'], r['stage'], r['size']))
+        if before is not None and max(before, r['seconds']) >= MIN_COMPARED_SECONDS and r['seconds'] > before * (1 + threshold):
+            regressions.append((r, before))
+    return regressions
+
+
+def parse_sizes(text):
+    return [int(float(size)) for size in text.split(',') if size]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard data paths headless.")
+    parser.add_argument('--sizes', type=parse_sizes, default=DEFAULT_SIZES, help="comma-separated, e.g. 1e2,1e4,1e7")
+    parser.add_argument('--views', help="comma-separated views to run (data generation always runs)")
+    parser.add_argument('--repeat', type=int, default=1, help="timed runs per stage; the best is kept")
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--compare', help="baseline JSON from an earlier --output")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed wall-time growth before flagging")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.views.split(',') if args.views else None)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r, before in regressions:
+            print(f"REGRESSION {r['view']} / {r['stage']} at {r['size']:,}: "
+                  f"{before * 1000:.1f} ms -> {r['seconds'] * 1000:.1f} ms")
+        if regressions:
+            return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import numpy as np
+
+# Chart-data reduction: large columns are binned or downsampled on the server so
+# the browser only receives what a chart can actually draw.
+
+
+def histogram_bins(values, bins=20, value_range=None):
+    # Bin edges and counts, ready to draw as bars instead of shipping raw values
+    values = np.asarray(values)
+    if value_range is None and len(values):
+        value_range = (values.min(), values.max())
+    counts, edges = np.histogram(values, bins=bins, range=value_range)
+    return edges, counts
+
+
+def _as_numeric(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def lttb_indices(x, y, budget):
+    # Largest-Triangle-Three-Buckets: keeps the first and last points and, from each
+    # bucket in between, the point forming the largest triangle with the previously
+    # kept point and the mean of the next bucket. Preserves the visual shape.
+    n = len(x)
+    if budget < 2:
+        raise ValueError(f"A point budget must be at least 2, got {budget}")
+    if budget >= n:
+        return np.arange(n)
+    if budget == 2:
+        return np.array([0, n - 1])
+    x, y = _as_numeric(x), np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, budget - 1).astype(int)  # budget - 2 inner buckets
+
+    kept = np.empty(budget, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(budget - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        next_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def minmax_indices(x, y, budget):
+    # Keeps the first and last point, so the x range is unchanged, and the lowest and
+    # highest point of each of (budget - 2) / 2 equal-count buckets; cheaper than
+    # LTTB and never hides a spike
+    n = len(y)
+    if budget < 2:
+        raise ValueError(f"A point budget must be at least 2, got {budget}")
+    if budget >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    pairs = (budget - 2) // 2
+    if not pairs:
+        return np.array([0, n - 1])
+    buckets = np.arange(n) * pairs // n
+    order = np.lexsort((y, buckets))
+    bucket_starts = np.flatnonzero(np.r_[True, np.diff(buckets[order]) != 0])
+    bucket_ends = np.r_[bucket_starts[1:], n] - 1
+    return np.unique(np.concatenate([[0, n - 1], order[bucket_starts], order[bucket_ends]]))
+
+
+DOWNSAMPLERS = {
+    'lttb': lttb_indices,
+    'minmax': minmax_indices,
+}
+
+
+def downsample(frame, x, y, budget, method='lttb'):
+    # At most `budget` rows of frame (sorted by x), chosen to preserve the y shape
+    if len(frame) <= budget:
+        return frame
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"Unknown downsampling method: {method!r} (expected one of {list(DOWNSAMPLERS)})")
+    frame = frame.sort_values(x)
+    keep = DOWNSAMPLERS[method](frame[x].to_numpy(), frame[y].to_numpy(), budget)
+    return frame.iloc[keep]
@@ -0,0 +1,411 @@
+# Plotly figures for every dashboard chart, built from a MetricStore.
+# plotly is imported on first build, so importing this module (or analytics) stays
+# cheap for batch jobs that never draw.
+from analytics import (
+    cohort_funnel, histogram_bars, dropoff_table, keyword_counts, sentiment_trend, reduce_series, before_after_table,
+    cutover_week, filtered_metric,
+)
+from impact import CONFIDENCE
+from metrics import INTERVENTION_WEEK, INTERVENTION_DATE
+
+CHARTS = {}  # chart id -> (view, build(store, *params), frames it reads)
+CHART_SELECTIONS = {}  # chart id -> (cross-filter dimension, field of a clicked point holding its label)
+
+
+def chart(chart_id, view, *frames, selects=None):
+    def register(fn):
+        CHARTS[chart_id] = (view, fn, frames)
+        if selects is not None:
+            CHART_SELECTIONS[chart_id] = selects
+        return fn
+    return register
+
+
+def build_chart(chart_id, store, *params):
+    return CHARTS[chart_id][1](store, *params)
+
+
+def chart_frames(chart_id):
+    return CHARTS[chart_id][2]
+
+
+def view_charts(view):
+    return [chart_id for chart_id, (chart_view, _, _) in CHARTS.items() if chart_view == view]
+
+
+def _plotly():
+    import plotly.express as px
+    import plotly.graph_objects as go
+    return px, go
+
+
+# Market charts take regions, a tuple of region shards or None for the whole market;
+# market and review charts take a cross-filter selection, (dimension, labels) pairs
+# Overview
+@chart('market_share', "Overview", 'market_df', selects=('KasiPay', 'label'))
+def market_share_figure(store, regions=None, selection=()):
+    px, _ = _plotly()
+    market_share = filtered_metric(store, 'market_share', selection, regions)
+    fig = px.pie(
+        values=[market_share, 100-market_share],
+        names=['KasiPay Users', 'Non-Users'],
+        title=f'Market Share: {market_share:.1f}%',
+        color_discrete_sequence=['#667eea', '#e2e8f0']
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+
+@chart('sentiment_distribution', "Overview", 'review_df', selects=('Sentiment', 'x'))
+def sentiment_distribution_figure(store, selection=()):
+    px, _ = _plotly()
+    sentiment_counts = filtered_metric(store, 'sentiment_counts', selection)
+    fig = px.bar(
+        x=sentiment_counts.index,
+        y=sentiment_counts.values,
+        title='Customer Sentiment Distribution',
+        color=sentiment_counts.values,
+        color_continuous_scale='RdYlGn'
+    )
+    fig.update_layout(xaxis_title='Sentiment', yaxis_title='Count')
+    return fig
+
+
+# Market Analysis
+@chart('payment_methods', "Market Analysis", 'market_df', selects=('Payment', 'x'))
+def payment_methods_figure(store, regions=None, selection=()):
+    px, _ = _plotly()
+    payment_counts = filtered_metric(store, 'payment_counts', selection, regions)
+    fig = px.bar(
+        x=payment_counts.index,
+        y=payment_counts.values,
+        title='Payment Methods Used by Stalls',
+        color=payment_counts.values,
+        color_continuous_scale='Viridis'
+    )
+    fig.update_layout(xaxis_title='Payment Method', yaxis_title='Number of Stalls')
+    return fig
+
+
+@chart('adoption_barriers', "Market Analysis", 'market_df', selects=('Barrier', 'label'))
+def adoption_barriers_figure(store, regions=None, selection=()):
+    px, _ = _plotly()
+    reason_counts = filtered_metric(store, 'reason_counts', selection, regions)
+    fig = px.pie(
+        values=reason_counts.values,
+        names=reason_counts.index,
+        title='Top Barriers to Adoption',
+        color_discrete_sequence=px.colors.sequential.RdBu
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+
+@chart('transaction_volume', "Market Analysis", 'market_df', selects=('Transactions', 'x'))
+def transaction_volume_figure(store, regions=None, selection=()):
+    # Pre-binned on the server: only bin edges and counts reach the browser
+    _, go = _plotly()
+    centers, widths, all_counts, user_counts = histogram_bars(filtered_metric(store, 'transaction_histogram', selection, regions))
+
+    fig = go.Figure(go.Bar(
+        x=centers,
+        y=all_counts,
+        width=widths,
+        name='All Stalls',
+        marker_color='#667eea'
+    ))
+    fig.update_layout(
+        title='Distribution of Daily Transactions',
+        xaxis_title='Daily Transactions',
+        yaxis_title='Number of Stalls',
+        showlegend=False,
+        bargap=0
+    )
+
+    # Add KasiPay users highlight
+    if user_counts.any():
+        fig.add_trace(go.Bar(
+            x=centers,
+            y=user_counts,
+            width=widths,
+            name='KasiPay Users',
+            marker_color='#10B981',
+            opacity=0.7
+        ))
+
+    fig.update_layout(barmode='overlay')
+    return fig
+
+
+# Onboarding Funnel; cohort is a signup week ('YYYY-MM-DD') or None for all users
+@chart('onboarding_funnel', "Onboarding Funnel", 'funnel_df')
+def onboarding_funnel_figure(store, cohort=None):
+    _, go = _plotly()
+    funnel_df = cohort_funnel(store.get('funnel_df'), store.get('funnel_cohorts'), cohort)
+    fig = go.Figure(go.Funnel(
+        y=funnel_df['Funnel_Stage'],
+        x=funnel_df['Users'],
+        textinfo="value+percent initial",
+        marker={"color": ["#EF4444", "#F59E0B", "#F59E0B", "#F59E0B", "#10B981", "#10B981"]}
+    ))
+
+    fig.update_layout(
+        title="User Onboarding Funnel",
+        showlegend=False,
+        height=500
+    )
+    return fig
+
+
+@chart('dropoff', "Onboarding Funnel", 'funnel_df')
+def dropoff_figure(store, cohort=None):
+    px, _ = _plotly()
+    dropoff_data = dropoff_table(cohort_funnel(store.get('funnel_df'), store.get('funnel_cohorts'), cohort))
+    fig = px.bar(
+        dropoff_data,
+        x='Stage',
+        y='Lost Users',
+        color='Drop-off_Rate',
+        title='Users Lost at Each Stage',
+        color_continuous_scale='Reds'
+    )
+    fig.update_layout(xaxis_title='Funnel Stage', yaxis_title='Users Lost')
+    return fig
+
+
+# Customer Feedback
+@chart('ratings', "Customer Feedback", 'review_df', selects=('Rating', 'x'))
+def ratings_figure(store, selection=()):
+    px, _ = _plotly()
+    rating_counts = filtered_metric(store, 'rating_counts', selection)
+    fig = px.bar(
+        x=rating_counts.index,
+        y=rating_counts.values,
+        title='Customer Rating Distribution',
+        color=rating_counts.values,
+        color_continuous_scale='RdYlGn'
+    )
+    fig.update_layout(xaxis_title='Rating (1-5)', yaxis_title='Count')
+    return fig
+
+
+@chart('keywords', "Customer Feedback", 'review_df', selects=('Keyword', 'x'))
+def keywords_figure(store, selection=()):
+    px, _ = _plotly()
+    counts = keyword_counts(store, selection)
+    fig = px.bar(
+        x=counts.index,
+        y=counts.values,
+        title='Top Keywords in Customer Feedback',
+        color=counts.values,
+        color_continuous_scale='Blues'
+    )
+    fig.update_layout(xaxis_title='Keyword', yaxis_title='Mentions')
+    return fig
+
+
+@chart('sentiment_trend', "Customer Feedback", 'review_df', selects=('Week', 'x'))
+def sentiment_trend_figure(store, granularity='Week', selection=()):
+    px, _ = _plotly()
+    trend = sentiment_trend(store, granularity.lower(), selection)
+    fig = px.line(
+        trend,
+        x='Period',
+        y='Sentiment_Score',
+        title=f'Average {"Daily" if granularity == "Day" else granularity + "ly"} Sentiment Score',
+        markers=True,
+        hover_data=['Reviews']
+    )
+
+    # Add intervention line (date axes take the position in epoch milliseconds)
+    fig.add_vline(
+        x=INTERVENTION_DATE.value // 10**6,
+        line_dash="dash",
+        line_color="red",
+        annotation_text="Onboarding Improved",
+        annotation_position="top right"
+    )
+
+    fig.update_layout(
+        xaxis_title=granularity,
+        yaxis_title='Sentiment Score (-1 to 1)',
+        yaxis_range=[-1, 1]
+    )
+    return fig
+
+
+# Impact Analysis; cutover is the first date after the intervention, None for INTERVENTION_WEEK
+def intervention_week(weekly_df, cutover):
+    return INTERVENTION_WEEK if cutover is None else cutover_week(weekly_df, cutover)
+
+
+@chart('weekly_users', "Impact Analysis", 'weekly_df')
+def weekly_users_figure(store, cutover=None):
+    _, go = _plotly()
+    weekly_df = store.get('weekly_df')
+    series = reduce_series('weekly_users', weekly_df, 'Week', 'Weekly_New_Active_Users')
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=series['Week'],
+        y=series['Weekly_New_Active_Users'],
+        mode='lines+markers',
+        name='Weekly New Users',
+        line=dict(color='#667eea', width=3)
+    ))
+
+    fig.add_vline(
+        x=intervention_week(weekly_df, cutover),
+        line_dash="dash",
+        line_color="red",
+        annotation_text="Onboarding Improved",
+        annotation_position="top right"
+    )
+
+    fig.update_layout(
+        title='Weekly New Active Users',
+        xaxis_title='Week',
+        yaxis_title='Users',
+        showlegend=True
+    )
+    return fig
+
+
+@chart('dropoff_rate', "Impact Analysis", 'weekly_df')
+def dropoff_rate_figure(store, cutover=None):
+    _, go = _plotly()
+    weekly_df = store.get('weekly_df')
+    series = reduce_series('dropoff_rate', weekly_df, 'Week', 'Onboarding_Dropoff_Rate')
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=series['Week'],
+        y=series['Onboarding_Dropoff_Rate'] * 100,
+        mode='lines+markers',
+        name='Drop-off Rate (%)',
+        line=dict(color='#EF4444', width=3)
+    ))
+
+    fig.add_vline(
+        x=intervention_week(weekly_df, cutover),
+        line_dash="dash",
+        line_color="red"
+    )
+
+    fig.update_layout(
+        title='Onboarding Drop-off Rate',
+        xaxis_title='Week',
+        yaxis_title='Drop-off Rate (%)',
+        yaxis_range=[30, 80]
+    )
+    return fig
+
+
+@chart('before_after', "Impact Analysis", 'weekly_df')
+def before_after_figure(store, cutover=None):
+    _, go = _plotly()
+    metrics_comparison = before_after_table(store, cutover)
+
+    fig = go.Figure(data=[
+        go.Bar(name='Before', x=metrics_comparison['Metric'], y=metrics_comparison['Before'], marker_color='#EF4444'),
+        go.Bar(name='After', x=metrics_comparison['Metric'], y=metrics_comparison['After'], marker_color='#10B981')
+    ])
+
+    fig.update_layout(
+        title=f'Before vs After Onboarding Improvements ({CONFIDENCE:.0%} bootstrap intervals)',
+        xaxis_title='Metric',
+        yaxis_title='Value',
+        barmode='group'
+    )
+
+    # Add improvement annotations
+    for row in metrics_comparison.to_dict('records'):
+        fig.add_annotation(
+            x=row['Metric'],
+            y=max(row['Before'], row['After']) + 0.1,
+            text=f"{row['Improvement']}<br><sup>{row['Improvement CI']}</sup>",
+            showarrow=False,
+            font=dict(size=12, color='black')
+        )
+
+    return fig
+
+
+@chart('support_tickets', "Impact Analysis", 'weekly_df')
+def support_tickets_figure(store, cutover=None):
+    _, go = _plotly()
+    weekly_df = store.get('weekly_df')
+    series = reduce_series('support_tickets', weekly_df, 'Week', 'Support_Tickets_Onboarding')
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=series['Week'],
+        y=series['Support_Tickets_Onboarding'],
+        mode='lines+markers',
+        name='Weekly Support Tickets',
+        line=dict(color='#F59E0B', width=3)
+    ))
+
+    fig.add_vline(
+        x=intervention_week(weekly_df, cutover),
+        line_dash="dash",
+        line_color="red"
+    )
+
+    fig.update_layout(
+        title='Weekly Onboarding Support Tickets',
+        xaxis_title='Week',
+        yaxis_title='Number of Tickets',
+        showlegend=True
+    )
+    return fig
+
+
+# Retention
+@chart('retention_heatmap', "Retention")
+def retention_heatmap_figure(store):
+    _, go = _plotly()
+    matrix = store.get('retention_matrix')
+    cohorts = matrix.index.strftime('%Y-%m-%d')
+    fig = go.Figure(go.Heatmap(
+        z=matrix.to_numpy() * 100,
+        x=matrix.columns,
+        y=cohorts,
+        text=matrix.map(lambda share: '' if share != share else f'{share:.0%}').to_numpy(),
+        texttemplate='%{text}',
+        colorscale='Blues',
+        zmin=0,
+        zmax=100,
+        colorbar=dict(title='% active'),
+        hovertemplate='Cohort %{y}<br>Week %{x}: %{z:.1f}%<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title='Weekly Retention by Signup Cohort',
+        xaxis_title='Weeks Since Signup',
+        yaxis_title='Signup Week',
+        yaxis=dict(autorange='reversed', type='category'),
+        height=max(400, 22 * len(matrix) + 150)
+    )
+    return fig
+
+
+@chart('retention_curve', "Retention")
+def retention_curve_figure(store):
+    _, go = _plotly()
+    curve = store.get('retention_curve')
+    fig = go.Figure(go.Scatter(
+        x=curve.index,
+        y=curve * 100,
+        mode='lines+markers',
+        name='All cohorts',
+        line=dict(color='#667eea', width=3)
+    ))
+
+    fig.update_layout(
+        title='Average Retention Curve',
+        xaxis_title='Weeks Since Signup',
+        yaxis_title='Active Users (%)',
+        yaxis=dict(range=[0, 105])
+    )
+    return fig
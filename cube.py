@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# Pre-aggregated cubes for cross-filtering. A cube holds each measure over every
+# combination of a few low-cardinality dimensions, as a dense array with one axis
+# per dimension, so filtering on some dimensions and reading the distribution of
+# another indexes and sums a small array, whatever the number of rows.
+#
+# A set-valued dimension (a stall accepts several payment methods, a review
+# mentions several keywords) is indexed by the bitmask of its members; selecting a
+# member selects every combination containing it. Its axis has a cell per subset,
+# so the number of members is capped.
+MAX_SET_MEMBERS = 8
+
+
+class Cube:
+    # Immutable; cubes over the same labels add up
+
+    def __init__(self, labels, measures, members=None):
+        self.labels = labels  # {dimension: pd.Index of labels}, in axis order
+        self.measures = measures  # {measure: ndarray}, 'count' always present
+        self.members = members or {}  # {dimension: (member names, label of the empty set or None)}
+
+    @classmethod
+    def build(cls, codes, labels, values=None, members=None):
+        # codes: {dimension: integer code per row, a member bitmask for set dimensions};
+        # values: {measure: per-row values summed into each cell}
+        members = members or {}
+        for dimension, (names, _) in members.items():
+            if len(names) > MAX_SET_MEMBERS:
+                raise ValueError(
+                    f"Set dimension {dimension!r} has {len(names)} members; a cube allows at most {MAX_SET_MEMBERS}"
+                )
+        labels = {dimension: pd.Index(dimension_labels) for dimension, dimension_labels in labels.items()}
+        shape = tuple(
+            1 << len(members[dimension][0]) if dimension in members else len(labels[dimension])
+            for dimension in labels
+        )
+        cells = np.ravel_multi_index([np.asarray(codes[dimension], dtype=np.intp) for dimension in labels], shape)
+        size = int(np.prod(shape))
+        measures = {'count': np.bincount(cells, minlength=size).reshape(shape)}
+        for name, row_values in (values or {}).items():
+            measures[name] = np.bincount(cells, weights=row_values, minlength=size).reshape(shape)
+        return cls(labels, measures, members)
+
+    def __add__(self, other):
+        if list(self.labels) != list(other.labels) or not all(self.labels[d].equals(other.labels[d]) for d in self.labels):
+            raise ValueError("Cubes have different dimensions or labels")
+        return Cube(self.labels, {name: self.measures[name] + other.measures[name] for name in self.measures}, self.members)
+
+    def pad(self, labels):
+        # The same cells over labels that extend this cube's, before or after them
+        # (its labels are a run of the padded ones); the added labels are empty
+        measures = self.measures
+        for axis, dimension in enumerate(self.labels):
+            own, padded = self.labels[dimension], pd.Index(labels[dimension])
+            if dimension in self.members or padded.equals(own):
+                continue
+            before = padded.get_loc(own[0]) if len(own) and own[0] in padded else 0
+            if not isinstance(before, (int, np.integer)) or not padded[before:before + len(own)].equals(own):
+                raise ValueError(f"Labels of {dimension!r} do not extend the cube's")
+            widths = [(0, 0)] * len(self.labels)
+            widths[axis] = (before, len(padded) - before - len(own))
+            measures = {name: np.pad(values, widths) for name, values in measures.items()}
+        labels = {
+            dimension: self.labels[dimension] if dimension in self.members else pd.Index(labels[dimension])
+            for dimension in self.labels
+        }
+        return Cube(labels, measures, self.members)
+
+    def _indices(self, dimension, chosen):
+        # Positions along the dimension's axis matching any of the chosen labels
+        if dimension not in self.labels:
+            raise ValueError(f"Unknown cube dimension: {dimension!r} (expected one of {list(self.labels)})")
+        if dimension in self.members:
+            names, empty_label = self.members[dimension]
+            masks = np.arange(1 << len(names))
+            bits = sum(1 << names.index(label) for label in chosen if label in names)
+            matching = (masks & bits) > 0
+            if empty_label is not None and empty_label in chosen:
+                matching[0] = True
+            return np.flatnonzero(matching)
+        positions = self.labels[dimension].get_indexer(list(chosen))
+        return positions[positions >= 0]
+
+    def _filtered(self, selection, measure, keep=None):
+        # measure over the selected cells; the kept dimension's own selection is ignored
+        values = self.measures[measure]
+        for axis, dimension in enumerate(self.labels):
+            if dimension != keep and dimension in (selection or {}):
+                values = np.take(values, self._indices(dimension, selection[dimension]), axis=axis)
+        return values
+
+    def marginal(self, dimension, selection=None, measure='count'):
+        # Totals of measure per label of dimension over the cells matching selection
+        # on the other dimensions, so a chart still shows the alternatives to its selection
+        axis = list(self.labels).index(dimension)
+        values = self._filtered(selection, measure, keep=dimension)
+        totals = values.sum(axis=tuple(i for i in range(values.ndim) if i != axis))
+        if dimension in self.members:
+            names, empty_label = self.members[dimension]
+            masks = np.arange(1 << len(names))
+            totals = np.array(
+                [totals[(masks >> bit) & 1 == 1].sum() for bit in range(len(names))]
+                + ([totals[0]] if empty_label is not None else []),
+                dtype=totals.dtype,
+            )
+        return pd.Series(totals, index=self.labels[dimension], name=measure)
+
+    def total(self, selection=None, measure='count'):
+        return self._filtered(selection, measure).sum()
@@ -0,0 +1,47 @@
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    # LRU cache of built Plotly figures keyed by (view, chart id, data version,
+    # parameters). A hit hands back the figure built on an earlier rerun, in this or
+    # any other session, so its traces, shapes and annotations are not rebuilt.
+    # Figures rather than their JSON are kept: st.plotly_chart validates and
+    # serializes whatever it is given, a dict included, on every call.
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+            self.misses += 1
+
+        # Built outside the lock so a slow chart does not block other sessions
+        figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._figures),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,139 @@
+# Onboarding funnel computed from raw per-user events.
+#
+#   python funnel.py events/*.csv --cohorts
+#   python funnel.py data/load-test/funnel_events.parquet
+#
+# The event log is streamed in chunks; each chunk is reduced to one row per user
+# (furthest stage reached, first event time) and those partial states are merged
+# with max/min, so memory grows with the number of users, not events.
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+FUNNEL_STAGES = ['App Download', 'Account Created', 'ID Uploaded', 'Profile Verified', 'First Transaction', 'Active User (30-day)']
+
+# Event names accepted for each stage, in stage order
+STAGE_EVENTS = {
+    'download': 0, 'app_download': 0,
+    'account': 1, 'account_created': 1,
+    'id_upload': 2, 'id_uploaded': 2,
+    'verified': 3, 'profile_verified': 3,
+    'first_txn': 4, 'first_transaction': 4,
+    'active_30d': 5, 'active_30_day': 5,
+}
+STAGE_EVENTS.update({stage.lower(): i for i, stage in enumerate(FUNNEL_STAGES)})
+
+CHUNK_SIZE = 1_000_000
+COMPACT_EVERY = 8  # chunks between merges of the partial per-user states
+
+
+def build_funnel_table(users, stages=FUNNEL_STAGES):
+    # funnel_df from the number of users reaching each stage
+    users = np.asarray(users, dtype=np.int64)
+    previous = np.r_[users[0], users[:-1]]
+    dropoff = previous - users
+    with np.errstate(divide='ignore', invalid='ignore'):
+        conversion = np.where(previous > 0, users / previous, 0.0)
+    return pd.DataFrame({
+        'Funnel_Stage': stages,
+        'Users': users,
+        'Drop-off_Count': dropoff,
+        'Drop-off_Rate': 1 - conversion,
+        'Conversion': conversion,
+        'Conversion_From_Start': users / users[0] if users[0] else np.zeros(len(users)),
+    })
+
+
+EVENT_COLUMNS = ['user_id', 'event', 'timestamp']
+
+
+def read_event_chunks(path, chunksize=CHUNK_SIZE, columns=EVENT_COLUMNS):
+    if os.path.isdir(path):
+        # A chunked dataset as generate_data.py writes it: its Parquet parts in name order
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.parquet'):
+                yield from read_event_chunks(os.path.join(path, name), chunksize, columns)
+    elif path.endswith('.parquet'):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif path.endswith('.csv'):
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+    else:
+        raise ValueError(f"Unsupported file: {path} (expected .csv or .parquet)")
+
+
+def reduce_events(events):
+    # One row per user: furthest stage reached and first event time in this chunk
+    stage = events['event'].astype(str).str.lower().map(STAGE_EVENTS)
+    known = stage.notna().to_numpy()
+    per_user = pd.DataFrame({
+        'user_id': events['user_id'].to_numpy()[known],
+        'stage': stage.to_numpy()[known].astype(np.int8),
+        'first_seen': pd.to_datetime(events['timestamp']).to_numpy()[known],
+    })
+    return per_user.groupby('user_id', sort=False).agg(stage=('stage', 'max'), first_seen=('first_seen', 'min'))
+
+
+def merge_states(states):
+    if len(states) == 1:
+        return states[0]
+    return pd.concat(states).groupby(level=0, sort=False).agg(stage=('stage', 'max'), first_seen=('first_seen', 'min'))
+
+
+def furthest_stages(paths, chunksize=CHUNK_SIZE):
+    partials = []
+    for path in paths:
+        for events in read_event_chunks(path, chunksize):
+            partials.append(reduce_events(events))
+            if len(partials) > COMPACT_EVERY:
+                partials = [merge_states(partials)]
+    if not partials:
+        return pd.DataFrame({'stage': pd.Series(dtype=np.int8), 'first_seen': pd.Series(dtype='datetime64[ns]')})
+    return merge_states(partials)
+
+
+def stage_users(stage_codes, n_stages=len(FUNNEL_STAGES)):
+    # A user whose furthest stage is k has passed every stage up to k
+    reached = np.bincount(stage_codes, minlength=n_stages)
+    return reached[::-1].cumsum()[::-1]
+
+
+def compute_funnel(state):
+    return build_funnel_table(stage_users(state['stage'].to_numpy()))
+
+
+def compute_cohort_funnels(state):
+    # Users reaching each stage per signup week (Monday of the first event's week)
+    if state.empty:
+        return pd.DataFrame(columns=FUNNEL_STAGES)
+    first_day = state['first_seen'].dt.normalize()
+    cohort = first_day - pd.to_timedelta(first_day.dt.weekday, unit='D')
+    cohort_codes, cohorts = pd.factorize(cohort, sort=True)
+    n_stages = len(FUNNEL_STAGES)
+    reached = np.bincount(
+        cohort_codes * n_stages + state['stage'].to_numpy(), minlength=len(cohorts) * n_stages
+    ).reshape(len(cohorts), n_stages)
+    users = reached[:, ::-1].cumsum(axis=1)[:, ::-1]
+    return pd.DataFrame(users, index=pd.DatetimeIndex(cohorts, name='Cohort_Week'), columns=FUNNEL_STAGES)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute the onboarding funnel from event logs.")
+    parser.add_argument('paths', nargs='+', help="CSV or Parquet files, or directories of Parquet parts, with user_id, event, timestamp")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--cohorts', action='store_true', help="also print per-signup-week funnels")
+    args = parser.parse_args(argv)
+
+    state = furthest_stages(args.paths, args.chunksize)
+    print(compute_funnel(state).to_string(index=False))
+    if args.cohorts:
+        print()
+        print(compute_cohort_funnels(state).to_string())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
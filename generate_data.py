@@ -0,0 +1,106 @@
+# Synthetic datasets of any size, written to disk chunk by chunk across worker processes.
+#
+#   python generate_data.py data/load-test --stalls 10000000 --reviews 2000000 --weeks 520 --funnel-users 1000000 --workers 8
+#
+# Each chunk is generated from its own streams (see synthetic_data.py) and written
+# as <out>/<dataset>.parquet/part-NNNNN.parquet, so the files are the same bytes
+# whatever --workers is, and a run with more rows leaves the values of the rows
+# already written unchanged. market_df, review_df and weekly_df load as the 'files'
+# data source (KASIPAY_DATA_SOURCE=files KASIPAY_DATA_DIR=<out>); funnel_df.parquet
+# is the funnel of the users in funnel_events.parquet/, whose parts funnel.py reads.
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from funnel import FUNNEL_STAGES, build_funnel_table, stage_users
+from synthetic_data import CHUNK_ROWS, chunk_count, generate_chunk
+
+PART_NAME = re.compile(r'part-(\d+)\.parquet$')
+
+
+def dataset_dir(out, dataset):
+    return os.path.join(out, f'{dataset}.parquet')
+
+
+def part_path(out, dataset, index):
+    return os.path.join(dataset_dir(out, dataset), f'part-{index:05d}.parquet')
+
+
+def write_chunk(out, dataset, index, n_rows, seed, chunk_rows, params):
+    # Pool task: one chunk, written to a temporary name and renamed into place.
+    # Returns the users reaching each funnel stage for funnel events, else None.
+    chunk = generate_chunk(dataset, index, n_rows, seed, chunk_rows, **params)
+    path = part_path(out, dataset, index)
+    chunk.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    if dataset == 'funnel_events':
+        furthest = chunk['event'].cat.codes.groupby(chunk['user_id'].to_numpy(), sort=False).max()
+        return stage_users(furthest.to_numpy())
+    return None
+
+
+def remove_stale_parts(out, dataset, n_chunks):
+    # Parts left from an earlier, larger run
+    for name in os.listdir(dataset_dir(out, dataset)):
+        match = PART_NAME.match(name)
+        if (match and int(match.group(1)) >= n_chunks) or name.endswith('.tmp'):
+            os.remove(os.path.join(dataset_dir(out, dataset), name))
+
+
+def write_datasets(out, sizes, seed=42, chunk_rows=CHUNK_ROWS, workers=None, params=None):
+    # sizes: {dataset: rows (users for funnel_events)}; params: {dataset: generator keywords}
+    params = params or {}
+    for dataset, n_rows in sizes.items():
+        os.makedirs(dataset_dir(out, dataset), exist_ok=True)
+        remove_stale_parts(out, dataset, max(1, chunk_count(n_rows, chunk_rows)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = {
+            (dataset, index): pool.submit(write_chunk, out, dataset, index, n_rows, seed, chunk_rows, params.get(dataset, {}))
+            for dataset, n_rows in sizes.items()
+            for index in range(max(1, chunk_count(n_rows, chunk_rows)))
+        }
+        results = {key: job.result() for key, job in jobs.items()}
+    if 'funnel_events' in sizes:
+        users = sum(
+            (result for (dataset, _), result in sorted(results.items()) if dataset == 'funnel_events'),
+            np.zeros(len(FUNNEL_STAGES), dtype=np.int64),
+        )
+        build_funnel_table(users).to_parquet(os.path.join(out, 'funnel_df.parquet'), index=False)
+    return len(jobs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write reproducible synthetic datasets in chunks, in parallel.")
+    parser.add_argument('out', help="output directory")
+    parser.add_argument('--stalls', type=int, default=96)
+    parser.add_argument('--reviews', type=int, default=150)
+    parser.add_argument('--weeks', type=int, default=24)
+    parser.add_argument('--funnel-users', type=int, default=500)
+    parser.add_argument('--adoption-rate', type=float, default=0.25)
+    parser.add_argument('--reviews-per-day', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="rows per chunk; part of what the values depend on")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+    if min(args.stalls, args.reviews, args.weeks, args.funnel_users) < 0 or args.chunk_rows < 1 or args.reviews_per_day < 1:
+        parser.error("sizes must be non-negative, --chunk-rows and --reviews-per-day positive")
+
+    started = time.monotonic()
+    chunks = write_datasets(
+        args.out,
+        {'market_df': args.stalls, 'funnel_events': args.funnel_users, 'review_df': args.reviews, 'weekly_df': args.weeks},
+        args.seed,
+        args.chunk_rows,
+        args.workers,
+        {'market_df': {'adoption_rate': args.adoption_rate}, 'review_df': {'reviews_per_day': args.reviews_per_day}},
+    )
+    print(f"Wrote {chunks} chunks to {args.out} in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import numpy as np
+
+# Before/after impact estimates with bootstrap confidence intervals. The two
+# periods are resampled independently, every resample at once as one index
+# array, so thousands of resamples cost a few array operations.
+
+BOOTSTRAP_RESAMPLES = 5000
+CONFIDENCE = 0.95
+MIN_PERIOD_SIZE = 2  # observations needed on each side of the cut-over
+BLOCK_ELEMENTS = 2**22  # resampled values drawn at a time, bounding memory for long series
+
+
+def bootstrap_means(values, n_resamples, rng):
+    # Means of n_resamples resamples of values, drawn with replacement
+    values = np.asarray(values, dtype=float)
+    means = np.empty(n_resamples)
+    block = max(1, BLOCK_ELEMENTS // len(values))
+    for start in range(0, n_resamples, block):
+        stop = min(start + block, n_resamples)
+        means[start:stop] = values[rng.integers(0, len(values), (stop - start, len(values)))].mean(axis=1)
+    return means
+
+
+def impact_estimate(before, after, n_resamples=BOOTSTRAP_RESAMPLES, confidence=CONFIDENCE, seed=0):
+    # Difference in means (after - before) and percent change, each with a
+    # percentile bootstrap interval. Seeded, so the same inputs give the same interval.
+    before, after = np.asarray(before, dtype=float), np.asarray(after, dtype=float)
+    if len(before) < MIN_PERIOD_SIZE or len(after) < MIN_PERIOD_SIZE:
+        raise ValueError(f"Need at least {MIN_PERIOD_SIZE} observations before and after the cut-over")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+
+    rng = np.random.default_rng(seed)
+    before_means = bootstrap_means(before, n_resamples, rng)
+    after_means = bootstrap_means(after, n_resamples, rng)
+    tail = (1 - confidence) / 2 * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        differences = after_means - before_means
+        percent_changes = differences / before_means * 100
+        before_mean, after_mean = before.mean(), after.mean()
+        percent_change = (after_mean - before_mean) / before_mean * 100
+
+    return {
+        'before': float(before_mean),
+        'after': float(after_mean),
+        'difference': float(after_mean - before_mean),
+        'difference_ci': tuple(np.percentile(differences, [tail, 100 - tail]).tolist()),
+        'percent_change': float(percent_change),
+        'percent_change_ci': tuple(np.percentile(percent_changes, [tail, 100 - tail]).tolist()),
+        'n_before': len(before),
+        'n_after': len(after),
+        'confidence': confidence,
+    }
@@ -1,13 +1,26 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from datetime import datetime, timedelta
+import os
 import warnings
+from functools import partial
+from review_store import ReviewStore, ReviewFeed, SENTIMENT_BANDS
+from retention import LedgerFeed
+from live import LiveFeed
+from figure_cache import FigureCache
+from analytics import (
+    DATA_SOURCE, DATA_VERSION, MetricStore, kpi_snapshot_path, read_kpi_snapshot,
+    file_versions, event_funnel, cohort_funnel, cohort_weeks, period_averages,
+    before_after_table, cutover_options, default_cutover, filtered_metric, cube_selection, selection_key,
+    filter_options, point_labels, filter_selection,
+)
+from charts import CHART_SELECTIONS, build_chart, chart_frames
+from metrics import MARKET_CUBE_DIMENSIONS, REVIEW_CUBE_DIMENSIONS
+from perf import RerunTimer, StageTimings, current_rss, write_metrics
+from static_assets import LOGO_PATH, STYLESHEET_URL, remote_assets
 warnings.filterwarnings('ignore')
 
+# Stage timings of this rerun, recorded per view at the end of the script
+rerun_timer = RerunTimer()
+
 # Page configuration
 st.set_page_config(
     page_title="KasiPay Analytics Dashboard",
@@ -16,178 +29,405 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS
-st.markdown("""
-    <style>
-    .main-header {
-        font-size: 2.5rem;
-        color: #1E3A8A;
-        font-weight: 700;
-        margin-bottom: 0.5rem;
-    }
-    .sub-header {
-        font-size: 1.2rem;
-        color: #4B5563;
-        margin-bottom: 2rem;
-    }
-    .metric-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 1.5rem;
-        border-radius: 10px;
-        color: white;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-    }
-    .positive-change {
-        color: #10B981;
-        font-weight: bold;
-    }
-    .negative-change {
-        color: #EF4444;
-        font-weight: bold;
-    }
-    </style>
-""", unsafe_allow_html=True)
+
+# Static assets
+# The logo and stylesheet are bundled under static/. The logo's SVG markup is read
+# once per server process and passed to st.image as text, which Streamlit sends
+# inline as a data URI. The stylesheet is served by Streamlit and only imported by
+# URL, so a rerun sends a one-line style tag rather than the whole stylesheet and
+# the browser caches it. Neither needs the network. At startup, any asset still
+# loaded from another host is flagged.
+@st.cache_resource(show_spinner=False)
+def read_asset(path):
+    return path.read_text(encoding='utf-8')
+
+
+@st.cache_resource(show_spinner=False)
+def check_offline_assets():
+    flagged = [f"{os.path.basename(path)}:{line} loads {url}" for path, line, url in remote_assets()]
+    if st.get_option('browser.gatherUsageStats'):
+        flagged.append("browser.gatherUsageStats is on, so the browser reports usage statistics")
+    return flagged
+
+
+st.html(f'<style>@import url("{STYLESHEET_URL}");</style>')
+
+remote_asset_warnings = check_offline_assets()
+if remote_asset_warnings:
+    st.warning("Rendering this dashboard needs network access:\n\n" + "\n".join(f"- {warning}" for warning in remote_asset_warnings))
 
 # Title
 st.markdown('<h1 class="main-header"> KasiPay Performance Dashboard</h1>', unsafe_allow_html=True)
 st.markdown('<p class="sub-header">Small-Level Analysis for Hyper-Local FinTech Growth</p>', unsafe_allow_html=True)
 
-# Generate synthetic data
-def generate_kasipay_data():
-    # Market penetration data
-    np.random.seed(42)
-    n_stalls = 96
-    stall_ids = [f"T{i:03d}" for i in range(1, n_stalls + 1)]
-    
-    payment_methods = ['Cash', 'KasiPay', 'SnapScan', 'Zapper', 'Cash, EFT']
-    reasons = ['Verification too difficult', 'Phone too old', "Don't trust apps", 'Need M-Pesa', 'Happy with cash']
-    
-    market_data = []
-    for i, stall_id in enumerate(stall_ids):
-        uses_kasipay = i < 24  # 25% market share
-        primary = 'Cash'
-        secondary = 'KasiPay' if uses_kasipay else np.random.choice(['SnapScan', 'Zapper', 'None', 'None'])
-        
-        reason = None if uses_kasipay else np.random.choice(reasons, p=[0.4, 0.2, 0.2, 0.15, 0.05])
-        
-        market_data.append({
-            'Stall_ID': stall_id,
-            'Primary_Payment_Method': primary,
-            'Secondary_Payment_Method': secondary,
-            'Uses_KasiPay': uses_kasipay,
-            'Reason_For_Not_Using': reason,
-            'Daily_Transaction_Count': np.random.randint(5, 100)
-        })
-    
-    market_df = pd.DataFrame(market_data)
-    
-    # Onboarding funnel data
-    funnel_data = {
-        'Funnel_Stage': ['App Download', 'Account Created', 'ID Uploaded', 'Profile Verified', 'First Transaction', 'Active User (30-day)'],
-        'Users': [500, 350, 180, 120, 110, 84],
-        'Drop-off_Count': [0, 150, 170, 60, 10, 26],
-        'Drop-off_Rate': [0, 0.30, 0.48, 0.33, 0.08, 0.24]
-    }
-    funnel_df = pd.DataFrame(funnel_data)
-    
-    # Review sentiment data
-    review_texts = [
-        "Low fees are great but the signup was a nightmare. My ID verification failed 3 times.",
-        "Love this app! So easy to pay at my local spaza now.",
-        "Why can't I use M-Pesa to top up my wallet? Makes no sense. Verification also took 2 days.",
-        "Gave up. Too difficult to sign up. Sticking with cash.",
-        "Good app. Would be perfect if it worked with M-Pesa.",
-        "Verification process needs improvement but otherwise great!",
-        "M-Pesa integration please! That's all I ask.",
-        "Fast transactions once you're set up. Setup was painful though.",
-        "Best app for township payments!",
-        "Can't believe how easy it is to pay now. No more cash problems."
-    ]
-    
-    sentiment_scores = [-0.5, 0.9, -0.8, -1.0, 0.7, -0.3, 0.6, 0.3, 0.8, 0.9]
-    keywords_verification = [1, 0, 1, 1, 0, 1, 0, 1, 0, 0]
-    keywords_mpesa = [0, 0, 1, 0, 1, 0, 1, 0, 0, 0]
-    keywords_fees = [1, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    
-    review_data = {
-        'Review_ID': [f'R{i:03d}' for i in range(1, 151)],
-        'Date': pd.date_range(start='2025-01-01', periods=150, freq='D'),
-        'Rating': np.random.choice([1, 2, 3, 4, 5], 150, p=[0.1, 0.15, 0.2, 0.3, 0.25]),
-        'Review_Text': np.random.choice(review_texts, 150),
-        'Sentiment_Score': np.random.normal(0.35, 0.5, 150),
-        'Keyword_Verification': np.random.choice([0, 1], 150, p=[0.7, 0.3]),
-        'Keyword_M-Pesa': np.random.choice([0, 1], 150, p=[0.6, 0.4]),
-        'Keyword_Fees': np.random.choice([0, 1], 150, p=[0.95, 0.05])
+# Data loading layer
+# Frames and metrics live in one analytics.MetricStore per (source, version), shared
+# by every session, so views must treat them as read-only. Bump KASIPAY_DATA_VERSION
+# to force a rebuild.
+DATA_CACHE_TTL = int(os.environ.get("KASIPAY_DATA_CACHE_TTL", 6 * 60 * 60))  # seconds
+DATA_CACHE_MAX_ENTRIES = 4
+
+# Columnar snapshots
+# With KASIPAY_SNAPSHOT_DIR set, frames are published once per (source, version) as
+# memory-mapped Arrow files and every worker reads them from there, column by column.
+SNAPSHOT_DIR = os.environ.get("KASIPAY_SNAPSHOT_DIR")
+
+
+@st.cache_resource(ttl=DATA_CACHE_TTL, max_entries=DATA_CACHE_MAX_ENTRIES, show_spinner=False)
+def load_metric_store(source, version):
+    return MetricStore(source, version, SNAPSHOT_DIR)
+
+
+def invalidate_kasipay_data(source=None, version=None):
+    if source is None:
+        load_metric_store.clear()
+    else:
+        load_metric_store.clear(source, version or DATA_VERSION)
+
+
+with rerun_timer.stage('load'):
+    metric_store = load_metric_store(DATA_SOURCE, DATA_VERSION)
+
+
+def get_metric(name):
+    with rerun_timer.stage('kpi'):
+        return metric_store.get(name)
+
+
+def get_market_metric(name):
+    # Market KPI over the regions and cross-filter selected in the sidebar
+    with rerun_timer.stage('kpi'):
+        return filtered_metric(metric_store, name, market_selection, regions)
+
+
+def get_review_metric(name):
+    with rerun_timer.stage('kpi'):
+        return filtered_metric(metric_store, name, review_selection)
+
+
+REVIEWS_PER_PAGE = 10
+
+
+# Published KPIs
+# When aggregator.py runs against the same KASIPAY_SNAPSHOT_DIR, it publishes every
+# KPI and chart dataset the views read. The dashboard then only loads that file,
+# whenever the worker replaces it, and leaves reviews and funnel events to the worker.
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_published_kpis(path, mtime):
+    return read_kpi_snapshot(path)
+
+
+published_kpis = None
+if SNAPSHOT_DIR:
+    kpi_path = kpi_snapshot_path(SNAPSHOT_DIR, DATA_SOURCE, DATA_VERSION)
+    if os.path.exists(kpi_path):
+        with rerun_timer.stage('load'):
+            published_kpis = load_published_kpis(kpi_path, os.path.getmtime(kpi_path))
+            metric_store.apply_published(published_kpis)
+
+# Ingested reviews
+# When KASIPAY_REVIEW_STORE points at a store filled by review_ingest.py, its reviews
+# replace the synthetic ones. The feed only reads rows appended since the last rerun.
+REVIEW_STORE_PATH = os.environ.get("KASIPAY_REVIEW_STORE")
+
+
+@st.cache_resource(show_spinner=False)
+def open_review_feed(path):
+    return ReviewFeed(ReviewStore(path))
+
+
+if REVIEW_STORE_PATH and published_kpis is None:
+    with rerun_timer.stage('load'):
+        ingested = open_review_feed(REVIEW_STORE_PATH).refresh()
+        if metric_store.values.get('review_df') is not ingested.frame:
+            metric_store.update_frame(
+                'review_df', ingested.frame,
+                review_index=ingested.index, review_aggregates=ingested.aggregates, review_cube=ingested.cube,
+            )
+
+# Onboarding events
+# KASIPAY_FUNNEL_EVENTS lists event logs (comma-separated CSV/Parquet paths) from
+# which funnel_df and the per-cohort funnels are computed; rerun when a file changes.
+FUNNEL_EVENT_PATHS = [path for path in os.environ.get("KASIPAY_FUNNEL_EVENTS", "").split(",") if path]
+
+
+@st.cache_resource(max_entries=2, show_spinner="Computing onboarding funnel...")
+def load_event_funnel(paths, file_versions):
+    return event_funnel(paths)
+
+
+funnel_events_version = None
+if FUNNEL_EVENT_PATHS and published_kpis is None:
+    funnel_events_version = file_versions(FUNNEL_EVENT_PATHS)
+    with rerun_timer.stage('load'):
+        event_funnel_df, event_cohorts = load_event_funnel(tuple(FUNNEL_EVENT_PATHS), funnel_events_version)
+        if metric_store.values.get('funnel_df') is not event_funnel_df:
+            metric_store.update_frame('funnel_df', event_funnel_df, funnel_cohorts=event_cohorts)
+
+# Transaction ledger
+# When KASIPAY_LEDGER names a directory of ledger day files (or comma-separated
+# CSV/Parquet files), cohort retention is computed from it instead of the synthetic
+# ledger. The feed only reads files added since the last rerun.
+LEDGER_PATH = os.environ.get("KASIPAY_LEDGER")
+
+
+@st.cache_resource(show_spinner=False)
+def open_ledger_feed(path):
+    return LedgerFeed(path)
+
+
+if LEDGER_PATH and published_kpis is None:
+    with rerun_timer.stage('load'):
+        ledger = open_ledger_feed(LEDGER_PATH).refresh()
+        if metric_store.values.get('retention') is not ledger.state:
+            metric_store.update_frame('retention', ledger.state)
+
+# Concurrent loading
+# The four frames load in the background, each on its own thread with its own
+# timeout (KASIPAY_LOAD_TIMEOUT). Whatever reads a frame that has not arrived yet
+# shows a placeholder instead, and the script reruns as each frame lands.
+FRAME_LABELS = {
+    'market_df': "market survey",
+    'funnel_df': "onboarding funnel",
+    'review_df': "customer reviews",
+    'weekly_df': "weekly metrics",
+}
+
+metric_store.start_loading()
+
+
+def frames_ready(*names):
+    # True when every frame can be read; otherwise shows a placeholder for the first that cannot
+    for name in names:
+        status = metric_store.frame_status(name)
+        if status == 'loading':
+            st.info(f"Loading {FRAME_LABELS[name]}...")
+            return False
+        if status in ('failed', 'timed out'):
+            st.error(f"Could not load the {FRAME_LABELS[name]}: {metric_store.frame_error(name)}")
+            return False
+    return True
+
+
+def loaded_metric(frame, name, fmt, get=get_metric):
+    # Formatted metric value for the sidebar, or an ellipsis while its frame loads
+    status = metric_store.frame_status(frame)
+    if status in ('ready', 'not started'):
+        return fmt.format(get(name))
+    return "…" if status == 'loading' else "n/a"
+
+
+# Live events
+# With KASIPAY_LIVE_EVENTS naming an append-only event file (see live.py), the
+# Overview cards and charts and the Impact Analysis charts poll it every
+# KASIPAY_LIVE_INTERVAL seconds and rerun on their own. Only events appended since
+# the last poll are read, only the aggregates they touch are replaced, and only the
+# figures drawn from those are rebuilt.
+LIVE_EVENTS_PATH = os.environ.get("KASIPAY_LIVE_EVENTS")
+LIVE_INTERVAL = float(os.environ.get("KASIPAY_LIVE_INTERVAL", 5))  # seconds
+LIVE = bool(LIVE_EVENTS_PATH) and published_kpis is None
+
+
+@st.cache_resource(show_spinner=False)
+def open_live_feed(path):
+    return LiveFeed(path)
+
+
+def live_versions():
+    # {frame: version of the live events applied to it}
+    return {
+        'market_df': getattr(metric_store.values.get('live_events'), 'market_version', 0),
+        'weekly_df': getattr(metric_store.values.get('live_weekly'), 'weekly_version', 0),
     }
-    
-    # Clip sentiment scores
-    review_data['Sentiment_Score'] = np.clip(review_data['Sentiment_Score'], -1, 1)
-    review_df = pd.DataFrame(review_data)
-    
-    # Weekly metrics data
-    dates = pd.date_range(start='2025-01-01', periods=24, freq='W')
-    intervention_week = 13
-    
-    weekly_users = []
-    weekly_dropoff = []
-    weekly_satisfaction = []
-    weekly_tickets = []
-    
-    for week in range(24):
-        if week < intervention_week:
-            users = 7 + np.random.randn() * 1.5
-            dropoff = 0.71 + np.random.randn() * 0.05
-            satisfaction = 3.4 + np.random.randn() * 0.2
-            tickets = 45 + np.random.randn() * 5
+
+
+def apply_live_events():
+    # Polls the feed; stalls replace the live market partials, other events the
+    # weekly rows after the loaded weekly_df, each only when events of its kind arrived
+    live = open_live_feed(LIVE_EVENTS_PATH).refresh().aggregates
+    applied = live_versions()
+    if live.market_version != applied['market_df']:
+        metric_store.update_frame('live_events', live)
+    if live.weekly_version != applied['weekly_df'] and metric_store.frame_status('weekly_df') in ('ready', 'not started'):
+        metric_store.update_frame('weekly_df', live.weekly_frame(metric_store.load_frame('weekly_df')), live_weekly=live)
+    return live
+
+
+if LIVE:
+    with rerun_timer.stage('load'):
+        apply_live_events()
+
+# Everything the rendered data depends on; part of every figure cache key
+if published_kpis is not None:
+    DATA_KEY = published_kpis['key']
+else:
+    DATA_KEY = (
+        DATA_SOURCE,
+        DATA_VERSION,
+        ingested.version if REVIEW_STORE_PATH else None,
+        funnel_events_version,
+        ledger.version if LEDGER_PATH else None,
+    )
+
+# Figure cache
+# Built figures are shared across sessions and reruns; a chart is only rebuilt when
+# its view, data or parameters change, or after LRU eviction. Figures themselves are
+# defined in charts.py; time series are downsampled there to a per-chart point budget.
+FIGURE_CACHE_MAX_ENTRIES = int(os.environ.get("KASIPAY_FIGURE_CACHE_ENTRIES", 64))
+
+
+@st.cache_resource(show_spinner=False)
+def open_figure_cache(max_entries):
+    return FigureCache(max_entries)
+
+
+figure_cache = open_figure_cache(FIGURE_CACHE_MAX_ENTRIES)
+
+
+def render_chart(view, chart_id, *params):
+    if not frames_ready(*chart_frames(chart_id)):
+        return
+
+    def build():
+        with rerun_timer.stage(f'build:{chart_id}'):
+            return build_chart(chart_id, metric_store, *params)
+
+    versions = live_versions()
+    live_key = tuple(versions.get(frame) for frame in chart_frames(chart_id))
+    fig = figure_cache.get((view, chart_id, DATA_KEY, live_key, params), build)
+    with rerun_timer.stage(f'render:{chart_id}'):
+        if chart_id in CHART_SELECTIONS:
+            key = f'select:{view}:{chart_id}'
+            st.plotly_chart(
+                fig, use_container_width=True, key=key, selection_mode='points',
+                on_select=partial(apply_chart_selection, chart_id, key)
+            )
         else:
-            users = 13 + np.random.randn() * 1.5
-            dropoff = 0.41 + np.random.randn() * 0.03
-            satisfaction = 4.1 + np.random.randn() * 0.15
-            tickets = 20 + np.random.randn() * 3
-            
-        weekly_users.append(max(5, users))
-        weekly_dropoff.append(max(0.3, min(0.8, dropoff)))
-        weekly_satisfaction.append(max(2.5, min(5, satisfaction)))
-        weekly_tickets.append(max(10, tickets))
-    
-    weekly_df = pd.DataFrame({
-        'Week': range(1, 25),
-        'Date': dates,
-        'Weekly_New_Active_Users': weekly_users,
-        'Onboarding_Dropoff_Rate': weekly_dropoff,
-        'Avg_Customer_Satisfaction': weekly_satisfaction,
-        'Support_Tickets_Onboarding': weekly_tickets
-    })
-    
-    return market_df, funnel_df, review_df, weekly_df
-
-# Load data
-market_df, funnel_df, review_df, weekly_df = generate_kasipay_data()
-
-# Calculate KPIs
-market_share = (market_df['Uses_KasiPay'].sum() / len(market_df)) * 100
-avg_sentiment = review_df['Sentiment_Score'].mean()
-verification_complaints = review_df['Keyword_Verification'].sum()
-mpesa_requests = review_df['Keyword_M-Pesa'].sum()
-
-# Pre/Post metrics
-pre_avg_users = weekly_df.iloc[:12]['Weekly_New_Active_Users'].mean()
-post_avg_users = weekly_df.iloc[12:]['Weekly_New_Active_Users'].mean()
-pre_avg_dropoff = weekly_df.iloc[:12]['Onboarding_Dropoff_Rate'].mean()
-post_avg_dropoff = weekly_df.iloc[12:]['Onboarding_Dropoff_Rate'].mean()
-pre_avg_satisfaction = weekly_df.iloc[:12]['Avg_Customer_Satisfaction'].mean()
-post_avg_satisfaction = weekly_df.iloc[12:]['Avg_Customer_Satisfaction'].mean()
+            st.plotly_chart(fig, use_container_width=True)
+
+
+# Cross-filter
+# Clicking bars or slices of a market or review chart filters every other chart of
+# the same data, in every view. Selections are kept per dimension in the sidebar's
+# Filters panel, where they can also be edited, and are answered from the
+# pre-aggregated cubes, so no frame is filtered.
+FILTER_LABELS = {
+    'Payment': "Payment method",
+    'Barrier': "Barrier",
+    'KasiPay': "KasiPay use",
+    'Transactions': "Daily transactions",
+    'Week': "Review week",
+    'Rating': "Rating",
+    'Sentiment': "Sentiment",
+    'Keyword': "Keyword",
+}
+
+
+def apply_chart_selection(chart_id, key):
+    # Replaces the chart's dimension filter with its clicked points; clearing the selection clears the filter
+    dimension, field = CHART_SELECTIONS[chart_id]
+    points = st.session_state[key].selection.points
+    st.session_state[f'filter:{dimension}'] = point_labels(metric_store, dimension, [point[field] for point in points if field in point])
+    st.session_state.filters_changed = True
+
+
+def clear_filters():
+    for dimension in FILTER_LABELS:
+        st.session_state[f'filter:{dimension}'] = []
+
+
+def format_filter_label(label):
+    if hasattr(label, 'left'):
+        return f"{label.left:.0f}–{label.right:.0f}"
+    if hasattr(label, 'strftime'):
+        return label.strftime('%Y-%m-%d')
+    return str(label)
+
+
+# Performance instrumentation
+# Stage timings are kept in a rolling window per view, shared across sessions. The
+# sidebar panel is opt-in; KASIPAY_PERF_EXPORT names a JSON file the same numbers,
+# histograms, cache statistics and memory are written to every PERF_EXPORT_INTERVAL.
+PERF_WINDOW = int(os.environ.get("KASIPAY_PERF_WINDOW", 500))  # reruns per view and stage
+PERF_EXPORT_PATH = os.environ.get("KASIPAY_PERF_EXPORT")
+PERF_EXPORT_INTERVAL = 10  # seconds
+
+
+@st.cache_resource(show_spinner=False)
+def open_stage_timings(window):
+    return StageTimings(window)
+
+
+stage_timings = open_stage_timings(PERF_WINDOW)
+
+
+# Live sections
+# In live mode a section of a view is a fragment that polls the event file and
+# reruns on its own every LIVE_INTERVAL; the rest of the page stays as rendered.
+# Its timings are recorded under "<view> (live)". A chart selection inside it
+# reruns the whole page, so the sidebar filters and other charts follow.
+def live_section(view):
+    def decorate(render):
+        if not LIVE:
+            return render
+
+        @st.fragment(run_every=LIVE_INTERVAL)
+        def polled(*args):
+            global rerun_timer
+            if st.session_state.pop('filters_changed', False):
+                st.rerun()
+            own_rerun = 'total' in rerun_timer.durations  # the page's timer already finished
+            if own_rerun:
+                rerun_timer = RerunTimer()
+                with rerun_timer.stage('load'):
+                    apply_live_events()
+            render(*args)
+            if own_rerun:
+                stage_timings.record(f"{view} (live)", rerun_timer.finish())
+        return polled
+    return decorate
+
+
+def live_caption():
+    live = open_live_feed(LIVE_EVENTS_PATH).snapshot.aggregates
+    late = live.late_events(metric_store.load_frame('weekly_df')) if metric_store.frame_status('weekly_df') in ('ready', 'not started') else 0
+    st.caption(
+        f"Live: {live.stall_events:,} stalls and {live.weekly_events:,} weekly-metric events from {os.path.basename(LIVE_EVENTS_PATH)}, "
+        f"updated every {LIVE_INTERVAL:g}s • {live.rejected:,} invalid • {late:,} dated within earlier weeks, not counted. "
+        "The latest week is in progress."
+    )
+
 
 # Sidebar
 with st.sidebar:
-    st.image("https://cdn-icons-png.flaticon.com/512/3082/3082383.png", width=100)
+    st.image(read_asset(LOGO_PATH), width=100)
     st.title("KasiPay Analytics")
     st.markdown("---")
     
+    st.session_state.pop('filters_changed', None)
     selected_view = st.selectbox(
         "Dashboard View",
-        ["Overview", "Market Analysis", "Onboarding Funnel", "Customer Feedback", "Impact Analysis"]
+        ["Overview", "Market Analysis", "Onboarding Funnel", "Customer Feedback", "Retention", "Impact Analysis"]
     )
+
+    # Region filter: market KPIs and charts cover the selected township shards, all when none
+    selected_regions = ()
+    if metric_store.frame_status('market_df') in ('ready', 'not started'):
+        selected_regions = tuple(st.multiselect("Regions", metric_store.regions(), placeholder="All regions"))
+    regions = selected_regions or None
+
+    filters = {}
+    with st.expander("Filters", expanded=any(st.session_state.get(f'filter:{dimension}') for dimension in FILTER_LABELS)):
+        for dimension, label in FILTER_LABELS.items():
+            frame = 'market_df' if dimension in MARKET_CUBE_DIMENSIONS else 'review_df'
+            if metric_store.frame_status(frame) in ('ready', 'not started'):
+                filters[dimension] = st.multiselect(
+                    label, filter_options(metric_store, dimension), key=f'filter:{dimension}', format_func=format_filter_label
+                )
+        st.button("Clear filters", on_click=clear_filters)
+    selection = filter_selection(metric_store, filters)
+    market_selection = selection_key(cube_selection(selection, MARKET_CUBE_DIMENSIONS))
+    review_selection = selection_key(cube_selection(selection, REVIEW_CUBE_DIMENSIONS))
     
     st.markdown("---")
     st.markdown("### Key Dates")
@@ -196,87 +436,89 @@ with st.sidebar:
     
     st.markdown("---")
     st.markdown("### Data Summary")
-    st.metric("Total Stalls Surveyed", f"{len(market_df):,}")
-    st.metric("Total Reviews Analyzed", f"{len(review_df):,}")
-    st.metric("Weeks of Data", "24")
+    st.metric("Total Stalls Surveyed", loaded_metric('market_df', 'stall_count', "{:,}", get_market_metric))
+    st.metric("Total Reviews Analyzed", loaded_metric('review_df', 'review_count', "{:,}", get_review_metric))
+    st.metric("Weeks of Data", loaded_metric('weekly_df', 'week_count', "{:,}"))
+    st.caption(f"Data: {DATA_SOURCE} • version {DATA_VERSION}")
+    if st.button("Reload data"):
+        invalidate_kasipay_data(DATA_SOURCE, DATA_VERSION)
+        figure_cache.clear()
+        st.rerun()
+    st.markdown("---")
+    show_performance = st.toggle("Performance", key='show_performance')
+    performance_panel = st.container()
 
 # Main content based on selected view
 if selected_view == "Overview":
-    # Header metrics
-    col1, col2, col3, col4 = st.columns(4)
+    @live_section(selected_view)
+    def overview_live():
+        # Header metrics
+        if frames_ready('market_df', 'weekly_df'):
+            market_share = get_market_metric('market_share')
+            with rerun_timer.stage('kpi'):
+                averages = period_averages(metric_store)
+            pre_avg_users, post_avg_users = averages['users']
+            pre_avg_dropoff, post_avg_dropoff = averages['dropoff']
+            pre_avg_satisfaction, post_avg_satisfaction = averages['satisfaction']
+
+            col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric(
-            "Market Share",
-            f"{market_share:.1f}%",
-            f"{market_share:.1f}% of target stalls"
-        )
-        st.markdown('</div>', unsafe_allow_html=True)
+            with col1:
+                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+                st.metric(
+                    "Market Share",
+                    f"{market_share:.1f}%",
+                    f"{market_share:.1f}% of target stalls"
+                )
+                st.markdown('</div>', unsafe_allow_html=True)
     
-    with col2:
-        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric(
-            "Onboarding Drop-off",
-            f"{post_avg_dropoff:.1%}",
-            f"{(pre_avg_dropoff - post_avg_dropoff):.1%}",
-            delta_color="inverse"
-        )
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        user_change = ((post_avg_users - pre_avg_users) / pre_avg_users) * 100
-        st.metric(
-            "Weekly New Users",
-            f"{post_avg_users:.0f}",
-            f"{user_change:.0f}%"
-        )
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        sat_change = ((post_avg_satisfaction - pre_avg_satisfaction) / 5) * 100
-        st.metric(
-            "Customer Satisfaction",
-            f"{post_avg_satisfaction:.1f}/5.0",
-            f"{sat_change:.0f}%"
-        )
-        st.markdown('</div>', unsafe_allow_html=True)
-    # Quick charts
-    st.markdown("---")
-    st.subheader(" Performance at a Glance")
+            with col2:
+                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+                st.metric(
+                    "Onboarding Drop-off",
+                    f"{post_avg_dropoff:.1%}",
+                    f"{(pre_avg_dropoff - post_avg_dropoff):.1%}",
+                    delta_color="inverse"
+                )
+                st.markdown('</div>', unsafe_allow_html=True)
     
-    col1, col2 = st.columns(2)
+            with col3:
+                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+                user_change = ((post_avg_users - pre_avg_users) / pre_avg_users) * 100
+                st.metric(
+                    "Weekly New Users",
+                    f"{post_avg_users:.0f}",
+                    f"{user_change:.0f}%"
+                )
+                st.markdown('</div>', unsafe_allow_html=True)
     
-    with col1:
-        # Market share pie chart
-        fig = px.pie(
-            values=[market_share, 100-market_share],
-            names=['KasiPay Users', 'Non-Users'],
-            title=f'Market Share: {market_share:.1f}%',
-            color_discrete_sequence=['#667eea', '#e2e8f0']
-        )
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        st.plotly_chart(fig, use_container_width=True)
+            with col4:
+                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+                sat_change = ((post_avg_satisfaction - pre_avg_satisfaction) / 5) * 100
+                st.metric(
+                    "Customer Satisfaction",
+                    f"{post_avg_satisfaction:.1f}/5.0",
+                    f"{sat_change:.0f}%"
+                )
+                st.markdown('</div>', unsafe_allow_html=True)
+        # Quick charts
+        st.markdown("---")
+        st.subheader(" Performance at a Glance")
     
-    with col2:
-        # Sentiment distribution
-        sentiment_counts = pd.cut(
-            review_df['Sentiment_Score'],
-            bins=[-1, -0.5, 0, 0.5, 1],
-            labels=['Very Negative', 'Negative', 'Positive', 'Very Positive']
-        ).value_counts()
-        
-        fig = px.bar(
-            x=sentiment_counts.index,
-            y=sentiment_counts.values,
-            title='Customer Sentiment Distribution',
-            color=sentiment_counts.values,
-            color_continuous_scale='RdYlGn'
-        )
-        fig.update_layout(xaxis_title='Sentiment', yaxis_title='Count')
-        st.plotly_chart(fig, use_container_width=True)
+        col1, col2 = st.columns(2)
+    
+        with col1:
+            # Market share pie chart
+            render_chart(selected_view, 'market_share', regions, market_selection)
+    
+        with col2:
+            # Sentiment distribution
+            render_chart(selected_view, 'sentiment_distribution', review_selection)
+
+        if LIVE:
+            live_caption()
+
+    overview_live()
 
  # Key Insights
     st.markdown("---")
@@ -317,6 +559,7 @@ if selected_view == "Overview":
 
 elif selected_view == "Market Analysis":
     st.header(" Market Analysis")
+    st.caption(f"Regions: {', '.join(regions) if regions else 'all'}")
     
     col1, col2 = st.columns(2)
     
@@ -324,99 +567,42 @@ elif selected_view == "Market Analysis":
    
     
         # Payment methods breakdown
-        payment_counts = {}
-        for method in ['KasiPay', 'SnapScan', 'Zapper', 'EFT']:
-            count = market_df.apply(
-                lambda x: method in str(x['Secondary_Payment_Method']) or 
-                         method in str(x['Primary_Payment_Method']), 
-                axis=1
-            ).sum()
-            payment_counts[method] = count
-        
-        payment_counts['Cash Only'] = len(market_df) - sum(payment_counts.values())
-        
-        fig = px.bar(
-            x=list(payment_counts.keys()),
-            y=list(payment_counts.values()),
-            title='Payment Methods Used by Stalls',
-            color=list(payment_counts.values()),
-            color_continuous_scale='Viridis'
-        )
-        fig.update_layout(xaxis_title='Payment Method', yaxis_title='Number of Stalls')
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(selected_view, 'payment_methods', regions, market_selection)
     
     with col2:
         # Reasons for not using KasiPay
-        reasons_df = market_df[market_df['Reason_For_Not_Using'].notna()]
-        reason_counts = reasons_df['Reason_For_Not_Using'].value_counts()
-        
-        fig = px.pie(
-            values=reason_counts.values,
-            names=reason_counts.index,
-            title='Top Barriers to Adoption',
-            color_discrete_sequence=px.colors.sequential.RdBu
-        )
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(selected_view, 'adoption_barriers', regions, market_selection)
     
     # Stalls by transaction volume
     st.subheader(" Stalls by Daily Transaction Volume")
-    
-    fig = px.histogram(
-        market_df,
-        x='Daily_Transaction_Count',
-        nbins=20,
-        title='Distribution of Daily Transactions',
-        color_discrete_sequence=['#667eea']
-    )
-    fig.update_layout(
-        xaxis_title='Daily Transactions',
-        yaxis_title='Number of Stalls',
-        showlegend=False
-    )
-    
-    # Add KasiPay users highlight
-    kasipay_users = market_df[market_df['Uses_KasiPay']]
-    if not kasipay_users.empty:
-        fig.add_trace(go.Histogram(
-            x=kasipay_users['Daily_Transaction_Count'],
-            name='KasiPay Users',
-            marker_color='#10B981',
-            opacity=0.7
-        ))
-    
-    fig.update_layout(barmode='overlay')
-    st.plotly_chart(fig, use_container_width=True)
+    render_chart(selected_view, 'transaction_volume', regions, market_selection)
 
 elif selected_view == "Onboarding Funnel":
     st.header(" Onboarding Funnel Analysis")
-    
-    col1, col2 = st.columns([2, 1])
-    
-    with col1:
-        # Funnel chart
-        fig = go.Figure(go.Funnel(
-            y=funnel_df['Funnel_Stage'],
-            x=funnel_df['Users'],
-            textinfo="value+percent initial",
-            marker={"color": ["#EF4444", "#F59E0B", "#F59E0B", "#F59E0B", "#10B981", "#10B981"]}
-        ))
-        
-        fig.update_layout(
-            title="User Onboarding Funnel",
-            showlegend=False,
-            height=500
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        st.subheader("Funnel Metrics")
+    if frames_ready('funnel_df'):
+        funnel_cohorts = get_metric('funnel_cohorts')
+    
+        cohort = None
+        if cohort_weeks(funnel_cohorts):
+            cohort = st.selectbox(
+                "Signup cohort (week starting)",
+                [None] + cohort_weeks(funnel_cohorts),
+                format_func=lambda week: "All cohorts" if week is None else week
+            )
+        funnel_df = cohort_funnel(get_metric('funnel_df'), funnel_cohorts, cohort)
+    
+        col1, col2 = st.columns([2, 1])
+    
+        with col1:
+            # Funnel chart
+            render_chart(selected_view, 'onboarding_funnel', cohort)
+    
+        with col2:
+            st.subheader("Funnel Metrics")
         
-        for idx, row in funnel_df.iterrows():
-            if idx > 0:  # Skip app download
-                prev_users = funnel_df.iloc[idx-1]['Users']
-                conversion = (row['Users'] / prev_users) * 100
-                
+            for row in funnel_df.iloc[1:].to_dict('records'):  # Skip app download
+                conversion = row['Conversion'] * 100
+            
                 st.metric(
                     label=f"{row['Funnel_Stage']}",
                     value=f"{row['Users']:,}",
@@ -425,23 +611,10 @@ elif selected_view == "Onboarding Funnel":
                 )
                 st.progress(min(conversion/100, 1.0))
     
-    # Drop-off reasons
-    st.subheader(" Drop-off Analysis")
+        # Drop-off reasons
+        st.subheader(" Drop-off Analysis")
     
-    dropoff_data = funnel_df[funnel_df['Drop-off_Count'] > 0].copy()
-    dropoff_data['Stage'] = dropoff_data['Funnel_Stage']
-    dropoff_data['Lost Users'] = dropoff_data['Drop-off_Count']
-    
-    fig = px.bar(
-        dropoff_data,
-        x='Stage',
-        y='Lost Users',
-        color='Drop-off_Rate',
-        title='Users Lost at Each Stage',
-        color_continuous_scale='Reds'
-    )
-    fig.update_layout(xaxis_title='Funnel Stage', yaxis_title='Users Lost')
-    st.plotly_chart(fig, use_container_width=True)
+        render_chart(selected_view, 'dropoff', cohort)
 
 elif selected_view == "Customer Feedback":
     st.header(" Customer Feedback Analysis")
@@ -450,200 +623,126 @@ elif selected_view == "Customer Feedback":
     
     with col1:
         # Rating distribution
-        rating_counts = review_df['Rating'].value_counts().sort_index()
-        fig = px.bar(
-            x=rating_counts.index,
-            y=rating_counts.values,
-            title='Customer Rating Distribution',
-            color=rating_counts.values,
-            color_continuous_scale='RdYlGn'
-        )
-        fig.update_layout(xaxis_title='Rating (1-5)', yaxis_title='Count')
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(selected_view, 'ratings', review_selection)
     
     with col2:
         # Keyword frequency
-        keywords = ['Verification', 'M-Pesa', 'Fees']
-        counts = [verification_complaints, mpesa_requests, review_df['Keyword_Fees'].sum()]
-        
-        fig = px.bar(
-            x=keywords,
-            y=counts,
-            title='Top Keywords in Customer Feedback',
-            color=counts,
-            color_continuous_scale='Blues'
-        )
-        fig.update_layout(xaxis_title='Keyword', yaxis_title='Mentions')
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(selected_view, 'keywords', review_selection)
     
     # Sentiment over time
     st.subheader(" Sentiment Trend Over Time")
     
-    review_df['Week'] = review_df['Date'].dt.isocalendar().week
-    weekly_sentiment = review_df.groupby('Week')['Sentiment_Score'].mean().reset_index()
-    
-    fig = px.line(
-        weekly_sentiment,
-        x='Week',
-        y='Sentiment_Score',
-        title='Average Weekly Sentiment Score',
-        markers=True
-    )
-    
-    # Add intervention line
-    intervention_week = 13
-    fig.add_vline(
-        x=intervention_week,
-        line_dash="dash",
-        line_color="red",
-        annotation_text="Onboarding Improved",
-        annotation_position="top right"
-    )
-    
-    fig.update_layout(
-        xaxis_title='Week',
-        yaxis_title='Sentiment Score (-1 to 1)',
-        yaxis_range=[-1, 1]
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    granularity = st.radio("Granularity", ["Day", "Week", "Month"], index=1, horizontal=True)
+    render_chart(selected_view, 'sentiment_trend', granularity, review_selection)
     
     # Recent reviews
     st.subheader(" Recent Customer Reviews")
+    if frames_ready('review_df'):
+        def reset_review_page():
+            st.session_state.review_page = 0
+
+        def turn_review_page(step):
+            st.session_state.review_page = max(0, st.session_state.review_page + step)
+
+        st.session_state.setdefault('review_page', 0)
+        col1, col2 = st.columns(2)
+        with col1:
+            rating_filter = st.selectbox("Rating", ["All", 5, 4, 3, 2, 1], key='review_rating', on_change=reset_review_page)
+        with col2:
+            band_filter = st.selectbox("Sentiment", ["All"] + SENTIMENT_BANDS[::-1], key='review_band', on_change=reset_review_page)
+
+        review_page = st.session_state.review_page
+        positions, has_more = get_metric('review_index').page(
+            review_page * REVIEWS_PER_PAGE,
+            REVIEWS_PER_PAGE,
+            rating=None if rating_filter == "All" else rating_filter,
+            band=None if band_filter == "All" else SENTIMENT_BANDS.index(band_filter),
+        )
+        with rerun_timer.stage('kpi'):
+            recent_reviews = metric_store.rows('review_df', positions)
+        if recent_reviews.empty:
+            st.caption("No reviews match these filters.")
     
-    recent_reviews = review_df.sort_values('Date', ascending=False).head(10)
-    
-    for _, review in recent_reviews.iterrows():
-        sentiment_color = "🟢" if review['Sentiment_Score'] > 0.3 else "🟡" if review['Sentiment_Score'] > -0.3 else "🔴"
+        for _, review in recent_reviews.iterrows():
+            sentiment_color = "🟢" if review['Sentiment_Score'] > 0.3 else "🟡" if review['Sentiment_Score'] > -0.3 else "🔴"
         
-        with st.expander(f"{sentiment_color} Rating: {review['Rating']}/5 - {review['Date'].strftime('%Y-%m-%d')}"):
-            st.write(review['Review_Text'])
-            st.caption(f"Sentiment: {review['Sentiment_Score']:.2f}")
+            with st.expander(f"{sentiment_color} Rating: {review['Rating']}/5 - {review['Date'].strftime('%Y-%m-%d')}"):
+                st.write(review['Review_Text'])
+                st.caption(f"Sentiment: {review['Sentiment_Score']:.2f}")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("Previous 10", disabled=review_page == 0, on_click=turn_review_page, args=(-1,))
+        with col2:
+            st.button("Next 10", disabled=not has_more, on_click=turn_review_page, args=(1,))
+
+elif selected_view == "Retention":
+    st.header(" Cohort Retention")
+
+    with rerun_timer.stage('kpi'):
+        cohort_sizes = get_metric('retention_cohort_sizes')
+        retention_curve = get_metric('retention_curve')
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Users", f"{int(cohort_sizes.sum()):,}")
+    with col2:
+        st.metric("Signup Cohorts", f"{len(cohort_sizes)}")
+    for col, week in ((col3, 1), (col4, 4)):
+        with col:
+            st.metric(f"Week-{week} Retention", f"{retention_curve[week]:.0%}" if week < len(retention_curve) else "n/a")
+
+    # Rows are signup weeks, columns weeks since signup; the latest week is still in progress
+    render_chart(selected_view, 'retention_heatmap')
+    render_chart(selected_view, 'retention_curve')
+    st.caption("Share of each signup week's users with at least one transaction n weeks later. The latest week is partial.")
 
 else:  # Impact Analysis
     st.header(" Impact Analysis: Before vs After Onboarding Improvements")
     
-    # Weekly metrics comparison
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Weekly active users with intervention line
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatter(
-            x=weekly_df['Week'],
-            y=weekly_df['Weekly_New_Active_Users'],
-            mode='lines+markers',
-            name='Weekly New Users',
-            line=dict(color='#667eea', width=3)
-        ))
-        
-        fig.add_vline(
-            x=13,
-            line_dash="dash",
-            line_color="red",
-            annotation_text="Onboarding Improved",
-            annotation_position="top right"
+    # Intervention cut-over; estimates are cached per (metric, cut-over), so moving it back is instant
+    cutover = None
+    if frames_ready('weekly_df'):
+        weekly_df = get_metric('weekly_df')
+        cutover = st.select_slider(
+            "Intervention (first week after)",
+            cutover_options(weekly_df),
+            value=default_cutover(weekly_df),
+            format_func=lambda date: date.strftime('%Y-%m-%d')
         )
-        
-        fig.update_layout(
-            title='Weekly New Active Users',
-            xaxis_title='Week',
-            yaxis_title='Users',
-            showlegend=True
-        )
-        st.plotly_chart(fig, use_container_width=True)
     
-    with col2:
-        # Onboarding drop-off rate
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatter(
-            x=weekly_df['Week'],
-            y=weekly_df['Onboarding_Dropoff_Rate'] * 100,
-            mode='lines+markers',
-            name='Drop-off Rate (%)',
-            line=dict(color='#EF4444', width=3)
-        ))
-        
-        fig.add_vline(
-            x=13,
-            line_dash="dash",
-            line_color="red"
-        )
-        
-        fig.update_layout(
-            title='Onboarding Drop-off Rate',
-            xaxis_title='Week',
-            yaxis_title='Drop-off Rate (%)',
-            yaxis_range=[30, 80]
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    
-    # Before/After comparison
-    st.subheader(" Key Metric Improvements")
-    
-    metrics_comparison = pd.DataFrame({
-        'Metric': ['Weekly New Users', 'Onboarding Drop-off', 'Customer Satisfaction', 'Support Tickets'],
-        'Before': [pre_avg_users, pre_avg_dropoff, pre_avg_satisfaction, weekly_df.iloc[:12]['Support_Tickets_Onboarding'].mean()],
-        'After': [post_avg_users, post_avg_dropoff, post_avg_satisfaction, weekly_df.iloc[12:]['Support_Tickets_Onboarding'].mean()],
-        'Improvement': [
-            f"+{((post_avg_users - pre_avg_users)/pre_avg_users)*100:.0f}%",
-            f"-{(pre_avg_dropoff - post_avg_dropoff)*100:.0f}%",
-            f"+{((post_avg_satisfaction - pre_avg_satisfaction)/5)*100:.0f}%",
-            f"-{((weekly_df.iloc[:12]['Support_Tickets_Onboarding'].mean() - weekly_df.iloc[12:]['Support_Tickets_Onboarding'].mean())/weekly_df.iloc[:12]['Support_Tickets_Onboarding'].mean())*100:.0f}%"
-        ]
-    })
-    
-    fig = go.Figure(data=[
-        go.Bar(name='Before', x=metrics_comparison['Metric'], y=metrics_comparison['Before'], marker_color='#EF4444'),
-        go.Bar(name='After', x=metrics_comparison['Metric'], y=metrics_comparison['After'], marker_color='#10B981')
-    ])
-    
-    fig.update_layout(
-        title='Before vs After Onboarding Improvements',
-        xaxis_title='Metric',
-        yaxis_title='Value',
-        barmode='group'
-    )
+    @live_section(selected_view)
+    def impact_live(cutover):
+        # Weekly metrics comparison
+        col1, col2 = st.columns(2)
     
-    # Add improvement annotations
-    for i, row in metrics_comparison.iterrows():
-        fig.add_annotation(
-            x=row['Metric'],
-            y=max(row['Before'], row['After']) + 0.1,
-            text=row['Improvement'],
-            showarrow=False,
-            font=dict(size=12, color='black')
-        )
-    
-    st.plotly_chart(fig, use_container_width=True)
+        with col1:
+            # Weekly active users with intervention line
+            render_chart(selected_view, 'weekly_users', cutover)
     
-    # Support tickets trend
-    st.subheader(" Support Ticket Reduction")
+        with col2:
+            # Onboarding drop-off rate
+            render_chart(selected_view, 'dropoff_rate', cutover)
     
-    fig = go.Figure()
+        # Before/After comparison
+        st.subheader(" Key Metric Improvements")
     
-    fig.add_trace(go.Scatter(
-        x=weekly_df['Week'],
-        y=weekly_df['Support_Tickets_Onboarding'],
-        mode='lines+markers',
-        name='Weekly Support Tickets',
-        line=dict(color='#F59E0B', width=3)
-    ))
+        render_chart(selected_view, 'before_after', cutover)
+        if cutover is not None:
+            with rerun_timer.stage('kpi'):
+                impacts = before_after_table(metric_store, cutover)
+            st.dataframe(impacts.round({'Before': 2, 'After': 2, 'Difference': 2}), hide_index=True)
+            st.caption("Difference in means and percent change, with bootstrap confidence intervals.")
     
-    fig.add_vline(
-        x=13,
-        line_dash="dash",
-        line_color="red"
-    )
+        # Support tickets trend
+        st.subheader(" Support Ticket Reduction")
     
-    fig.update_layout(
-        title='Weekly Onboarding Support Tickets',
-        xaxis_title='Week',
-        yaxis_title='Number of Tickets',
-        showlegend=True
-    )
-    st.plotly_chart(fig, use_container_width=True)
+        render_chart(selected_view, 'support_tickets', cutover)
+
+        if LIVE:
+            live_caption()
+
+    impact_live(cutover)
 
 # Footer
 st.markdown("---")
@@ -654,3 +753,29 @@ st.markdown("""
         <small>Market Entry Dashboard • Prepared for small market entrants</small>
     </div>
 """, unsafe_allow_html=True)
+
+# Performance
+stage_timings.record(selected_view, rerun_timer.finish())
+cache_stats = {'figures': figure_cache.stats(), 'metrics': metric_store.stats()}
+
+if show_performance:
+    with performance_panel:
+        st.markdown(f"### Performance: {selected_view}")
+        st.dataframe(
+            [{'Stage': row['stage'], 'Runs': row['count'], 'p50 (ms)': round(row['p50_ms'], 1), 'p95 (ms)': round(row['p95_ms'], 1)}
+             for row in stage_timings.summary(selected_view)],
+            hide_index=True
+        )
+        st.caption(
+            f"Figure cache: {cache_stats['figures']['hit_rate']:.0%} hits • "
+            f"Metric store: {cache_stats['metrics']['hit_rate']:.0%} hits • "
+            f"Memory: {current_rss() / 2**20:,.0f} MiB RSS"
+        )
+
+if PERF_EXPORT_PATH and stage_timings.export_due(PERF_EXPORT_INTERVAL):
+    write_metrics(PERF_EXPORT_PATH, stage_timings, cache_stats)
+
+# Frames still loading: wait for the next to arrive (or time out) and rerun to fill its placeholders
+if metric_store.loader.loading():
+    metric_store.loader.wait_next()
+    st.rerun()
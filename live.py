@@ -0,0 +1,288 @@
+# Live mode: the Overview and Impact Analysis aggregates kept current from an
+# append-only event file.
+#
+#   KASIPAY_LIVE_EVENTS=events.jsonl streamlit run kasipay.py
+#   python live.py events.jsonl --demo     # appends simulated events every second
+#   python live.py events.jsonl            # prints what the file adds so far
+#
+# One JSON event per line:
+#   {"type": "stall", "Region": "Soweto", "Uses_KasiPay": false, "Reason_For_Not_Using": "Phone too old",
+#    "Primary_Payment_Method": "Cash", "Secondary_Payment_Method": "SnapScan", "Daily_Transaction_Count": 40}
+#   {"type": "signup", "timestamp": "2025-06-23T09:15:00"}
+#   {"type": "onboarding", "timestamp": "2025-06-23T09:20:00", "completed": false}
+#   {"type": "satisfaction", "timestamp": "2025-06-23T11:00:00", "score": 4}
+#   {"type": "support_ticket", "timestamp": "2025-06-23T12:30:00"}
+# A LiveFeed reads only the complete lines appended since its last poll. Stalls are
+# folded into per-region market partials, which add to the survey's (see
+# metrics.py); the other events into per-day sums, which become weekly_df rows for
+# the weeks after its last. Lines that are not valid events are counted and skipped.
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from metrics import MARKET_COLUMNS, REGION_COLUMN, build_market_cube, market_partial, merge_market_partials
+from schema import conform
+from synthetic_data import (
+    MARKET_REASONS, MARKET_REASON_PROBS, MARKET_REGIONS, MARKET_REGION_PROBS, SECONDARY_METHODS,
+    SECONDARY_PROBS, WEEKLY_START,
+)
+
+WEEKLY_EVENTS = ('signup', 'onboarding', 'satisfaction', 'support_ticket')
+DAY_COLUMNS = ['signups', 'onboardings', 'dropoffs', 'satisfaction_sum', 'satisfaction_count', 'tickets']
+
+
+def parse_events(data):
+    # Events of complete JSON lines; lines that are not JSON objects come back as None
+    events = []
+    for line in data.decode('utf-8', errors='replace').splitlines():
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            event = None
+        events.append(event if isinstance(event, dict) else None)
+    return events
+
+
+def _stalls(events):
+    # Valid stall events as market survey rows
+    stalls = events.reindex(columns=MARKET_COLUMNS)
+    transactions = pd.to_numeric(stalls['Daily_Transaction_Count'], errors='coerce')
+    valid = stalls[REGION_COLUMN].notna() & stalls['Uses_KasiPay'].isin([True, False]) & (transactions >= 0)
+    stalls = stalls[valid].astype({REGION_COLUMN: str, 'Uses_KasiPay': bool})
+    return stalls.assign(Daily_Transaction_Count=transactions[valid].astype(np.int64))
+
+
+def _day_sums(events):
+    # Sums of valid weekly-metric events per day
+    columns = events.reindex(columns=['type', 'timestamp', 'completed', 'score'])
+    timestamps = pd.to_datetime(columns['timestamp'], errors='coerce', format='ISO8601', utc=True).dt.tz_localize(None)
+    scores = pd.to_numeric(columns['score'], errors='coerce')
+    kind = columns['type']
+    valid = timestamps.notna() & (
+        kind.isin(['signup', 'support_ticket'])
+        | ((kind == 'onboarding') & columns['completed'].isin([True, False]))
+        | ((kind == 'satisfaction') & scores.notna())
+    )
+    kind, satisfaction = kind[valid], kind[valid] == 'satisfaction'
+    sums = pd.DataFrame({
+        'signups': kind == 'signup',
+        'onboardings': kind == 'onboarding',
+        'dropoffs': (kind == 'onboarding') & (columns['completed'][valid] == False),  # noqa: E712
+        'satisfaction_sum': scores[valid].where(satisfaction, 0.0),
+        'satisfaction_count': satisfaction,
+        'tickets': kind == 'support_ticket',
+    }).astype(float)
+    return sums.groupby(timestamps[valid].dt.normalize().rename('Day')).sum()
+
+
+class LiveAggregates:
+    # Running aggregates of the events read so far. Immutable: extend() returns new
+    # aggregates, so a dashboard session can keep reading the old ones.
+
+    def __init__(self, partials=None, stalls=None, days=None, stall_events=0, weekly_events=0, rejected=0):
+        self.partials = partials or {}  # {region: market partial} of live stalls
+        self.stalls = pd.DataFrame(columns=MARKET_COLUMNS) if stalls is None else stalls  # for the market cube
+        self.days = pd.DataFrame(columns=DAY_COLUMNS, index=pd.DatetimeIndex([], name='Day'), dtype=float) if days is None else days
+        self.stall_events = stall_events
+        self.weekly_events = weekly_events
+        self.rejected = rejected
+
+    # Versions of the market and weekly aggregates: they change only when events of that kind arrive
+    @property
+    def market_version(self):
+        return self.stall_events
+
+    @property
+    def weekly_version(self):
+        return self.weekly_events
+
+    def extend(self, events):
+        # events: parsed lines, None for malformed ones
+        if not events:
+            return self
+        frame = pd.DataFrame.from_records([event for event in events if event is not None])
+        kind = frame.get('type', pd.Series(None, index=frame.index, dtype=object))
+
+        partials, stalls = self.partials, self.stalls
+        new_stalls = _stalls(frame[kind == 'stall'])
+        if len(new_stalls):
+            partials = dict(partials)
+            for region, shard in new_stalls.groupby(REGION_COLUMN, sort=True):
+                partial = market_partial(shard)
+                partials[region] = merge_market_partials([partials[region], partial]) if region in partials else partial
+            stalls = pd.concat([stalls, new_stalls], ignore_index=True) if len(stalls) else new_stalls.reset_index(drop=True)
+
+        days, day_sums = self.days, _day_sums(frame[kind.isin(WEEKLY_EVENTS)])
+        weekly_events = int(day_sums[['signups', 'onboardings', 'satisfaction_count', 'tickets']].to_numpy().sum())
+        if weekly_events:
+            days = days.add(day_sums, fill_value=0).sort_index() if len(days) else day_sums
+
+        rejected = self.rejected + len(events) - len(new_stalls) - weekly_events
+        return LiveAggregates(partials, stalls, days, self.stall_events + len(new_stalls),
+                              self.weekly_events + weekly_events, rejected)
+
+    def add_partials(self, partials):
+        # {region: market partial} with the live stalls of each region added
+        combined = dict(partials)
+        for region, partial in self.partials.items():
+            combined[region] = merge_market_partials([combined[region], partial]) if region in combined else partial
+        return combined
+
+    def add_to_cube(self, cube):
+        # A market cube with the live stalls added; rebuilt from them, only when a cross-filter needs it
+        if self.stalls.empty:
+            return cube
+        live = build_market_cube(self.stalls, like=cube)
+        return cube.pad(live.labels) + live
+
+    def _weeks(self, weekly_df):
+        # Weeks after weekly_df's last date of each day of events; 0 and below fall in weeks it already has
+        return (self.days.index - weekly_df['Date'].iloc[-1]).days // 7
+
+    def weekly_frame(self, weekly_df):
+        # weekly_df followed by a row per week after its last, up to the latest event's.
+        # Each row covers the 7 days from its date, as weekly_df's do; weeks without
+        # onboardings or ratings have no drop-off rate or satisfaction.
+        if weekly_df.empty or self.days.empty:
+            return weekly_df
+        weeks = self._weeks(weekly_df)
+        live = self.days[weeks >= 1].groupby(weeks[weeks >= 1]).sum()
+        if live.empty:
+            return weekly_df
+        live = live.reindex(range(1, live.index.max() + 1), fill_value=0)
+        rows = pd.DataFrame({
+            'Week': weekly_df['Week'].iloc[-1] + live.index,
+            'Date': weekly_df['Date'].iloc[-1] + pd.to_timedelta(7 * live.index, unit='D'),
+            'Weekly_New_Active_Users': live['signups'].to_numpy(),
+            'Onboarding_Dropoff_Rate': (live['dropoffs'] / live['onboardings']).to_numpy(),
+            'Avg_Customer_Satisfaction': (live['satisfaction_sum'] / live['satisfaction_count']).to_numpy(),
+            'Support_Tickets_Onboarding': live['tickets'].to_numpy(),
+        })
+        return conform('weekly_df', pd.concat([weekly_df, rows], ignore_index=True))
+
+    def late_events(self, weekly_df):
+        # Weekly-metric events dated within weekly_df's weeks, which it already accounts for
+        if weekly_df.empty or self.days.empty:
+            return 0
+        late = self.days[self._weeks(weekly_df) < 1]
+        return int(late[['signups', 'onboardings', 'satisfaction_count', 'tickets']].to_numpy().sum())
+
+
+# Consistent view of a feed: the aggregates and the bytes of the file they cover
+LiveSnapshot = namedtuple('LiveSnapshot', ['aggregates', 'offset'])
+
+
+class LiveFeed:
+    # Aggregates of an append-only event file that only reads what was appended
+    # since the last refresh; a partly written last line waits for the next. One
+    # feed is shared by every dashboard session.
+
+    def __init__(self, path):
+        self.path = path
+        self.snapshot = LiveSnapshot(LiveAggregates(), 0)
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            aggregates, offset = self.snapshot
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if size < offset:
+                raise ValueError(f"Live event file {self.path} shrank after it was read; events must only be appended")
+            if size > offset:
+                with open(self.path, 'rb') as file:
+                    file.seek(offset)
+                    data = file.read(size - offset)
+                end = data.rfind(b'\n') + 1
+                if end:
+                    self.snapshot = LiveSnapshot(aggregates.extend(parse_events(data[:end])), offset + end)
+            return self.snapshot
+
+
+# Simulated events for trying live mode: each tick covers some hours of the weeks
+# after the synthetic weekly metrics, at about their post-intervention levels
+DEMO_EVENT_TYPES = ['stall', 'signup', 'onboarding', 'satisfaction', 'support_ticket']
+DEMO_EVENT_PROBS = [0.1, 0.25, 0.2, 0.1, 0.35]
+DEMO_COMPLETION_RATE = 0.59
+DEMO_ADOPTION_RATE = 0.25
+
+
+def demo_events(rng, start, hours, n):
+    offsets = np.sort(rng.uniform(0, hours * 3600, n))
+    events = []
+    for kind, offset in zip(rng.choice(DEMO_EVENT_TYPES, n, p=DEMO_EVENT_PROBS), offsets):
+        timestamp = (start + pd.Timedelta(seconds=float(offset))).isoformat()
+        if kind == 'stall':
+            uses = bool(rng.random() < DEMO_ADOPTION_RATE)
+            events.append({
+                'type': 'stall',
+                'Region': str(rng.choice(MARKET_REGIONS, p=MARKET_REGION_PROBS)),
+                'Uses_KasiPay': uses,
+                'Reason_For_Not_Using': None if uses else str(rng.choice(MARKET_REASONS, p=MARKET_REASON_PROBS)),
+                'Primary_Payment_Method': 'Cash',
+                'Secondary_Payment_Method': 'KasiPay' if uses else str(rng.choice(SECONDARY_METHODS, p=SECONDARY_PROBS)),
+                'Daily_Transaction_Count': int(rng.integers(5, 100)),
+            })
+        elif kind == 'onboarding':
+            events.append({'type': kind, 'timestamp': timestamp, 'completed': bool(rng.random() < DEMO_COMPLETION_RATE)})
+        elif kind == 'satisfaction':
+            events.append({'type': kind, 'timestamp': timestamp, 'score': int(np.clip(np.rint(rng.normal(4.1, 0.8)), 1, 5))})
+        else:
+            events.append({'type': kind, 'timestamp': timestamp})
+    return events
+
+
+def run_demo(path, start, hours_per_tick, events_per_tick, interval, ticks=None, seed=0):
+    rng = np.random.default_rng(seed)
+    tick = 0
+    while ticks is None or tick < ticks:
+        events = demo_events(rng, start + pd.Timedelta(hours=hours_per_tick * tick), hours_per_tick, events_per_tick)
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write(''.join(json.dumps(event) + '\n' for event in events))
+        tick += 1
+        if ticks is None or tick < ticks:
+            time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise, or simulate, a live event file for the dashboard.")
+    parser.add_argument('path', help="append-only JSON-lines event file")
+    parser.add_argument('--demo', action='store_true', help="append simulated events until interrupted")
+    parser.add_argument('--start', type=pd.Timestamp, default=WEEKLY_START + pd.Timedelta(weeks=24),
+                        help="simulated time of the first event (default: the week after the synthetic weekly metrics)")
+    parser.add_argument('--hours-per-tick', type=float, default=12)
+    parser.add_argument('--events-per-tick', type=int, default=4)
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between ticks")
+    parser.add_argument('--ticks', type=int, help="stop after this many ticks")
+    args = parser.parse_args(argv)
+    if args.hours_per_tick <= 0 or args.events_per_tick < 0 or args.interval < 0:
+        parser.error("--hours-per-tick must be positive, --events-per-tick and --interval non-negative")
+
+    if args.demo:
+        try:
+            run_demo(args.path, args.start, args.hours_per_tick, args.events_per_tick, args.interval, args.ticks)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    aggregates = LiveFeed(args.path).refresh().aggregates
+    print(f"{aggregates.stall_events:,} stalls, {aggregates.weekly_events:,} weekly-metric events, {aggregates.rejected:,} rejected")
+    if aggregates.partials:
+        print(pd.DataFrame(
+            {'Stalls': {region: p['stalls'] for region, p in aggregates.partials.items()},
+             'KasiPay Users': {region: p['users'] for region, p in aggregates.partials.items()}}
+        ).to_string())
+    if not aggregates.days.empty:
+        print(aggregates.days.astype({column: int for column in DAY_COLUMNS if column != 'satisfaction_sum'}).to_string())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
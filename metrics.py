@@ -0,0 +1,442 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cube import MAX_SET_MEMBERS, Cube
+from review_store import (
+    ReviewIndex, ReviewAggregates, KEYWORD_COLUMNS, KEYWORD_LABELS, RATINGS, SENTIMENT_LABELS, build_review_cube,
+    sentiment_buckets,
+)
+from retention import RetentionState, retention_curve
+from synthetic_data import generate_ledger
+
+# KPI definitions shared by the dashboard and the aggregation worker. Nothing here
+# imports Streamlit; callers supply the memo store and the frame loader.
+FRAME_NAMES = ('market_df', 'funnel_df', 'review_df', 'weekly_df')
+HISTOGRAM_BINS = 20
+
+# Payment methods reported in Market Analysis; stalls with none of them count as 'Cash Only'
+CASH_ONLY = 'Cash Only'
+
+
+def parse_payment_methods(value):
+    # Comma-separated method names; each is a member of the market cube's Payment
+    # dimension, which has a cell per subset of them
+    methods = [method.strip() for method in value.split(',') if method.strip()]
+    if not methods:
+        raise ValueError("KASIPAY_PAYMENT_METHODS names no payment methods")
+    duplicates = sorted({method for method in methods if methods.count(method) > 1})
+    if duplicates:
+        raise ValueError(f"KASIPAY_PAYMENT_METHODS lists {duplicates} more than once")
+    if CASH_ONLY in methods:
+        raise ValueError(f"{CASH_ONLY!r} counts stalls with none of the payment methods; it cannot be one")
+    if len(methods) > MAX_SET_MEMBERS:
+        raise ValueError(f"KASIPAY_PAYMENT_METHODS lists {len(methods)} methods; at most {MAX_SET_MEMBERS} are supported")
+    return tuple(methods)
+
+
+PAYMENT_METHODS = parse_payment_methods(os.environ.get("KASIPAY_PAYMENT_METHODS", "KasiPay,SnapScan,Zapper,EFT"))
+PAYMENT_COLUMNS = ['Primary_Payment_Method', 'Secondary_Payment_Method']
+
+
+def build_payment_index(market_df, methods=PAYMENT_METHODS):
+    # Boolean stall x method membership matrix. Payment columns hold comma-joined
+    # values like 'Cash, EFT', so each distinct value is parsed once and the result
+    # is broadcast back to the rows through its categorical codes.
+    membership = np.zeros((len(market_df), len(methods)), dtype=bool)
+    for column in PAYMENT_COLUMNS:
+        values = market_df[column].astype('category')
+        parsed = np.zeros((len(values.cat.categories) + 1, len(methods)), dtype=bool)  # last row: missing value
+        for i, value in enumerate(values.cat.categories):
+            tokens = {token.strip() for token in str(value).split(',')}
+            parsed[i] = [method in tokens for method in methods]
+        membership |= parsed[values.cat.codes.to_numpy()]
+    return pd.DataFrame(membership, index=market_df.index, columns=list(methods))
+
+
+def count_payment_methods(payment_index):
+    counts = payment_index.sum()
+    counts[CASH_ONLY] = len(payment_index) - payment_index.any(axis=1).sum()
+    return counts
+
+
+# Mergeable market aggregates
+# The market survey is sharded by region. Each shard is summarised on its own and
+# the partials of any set of shards add up to the aggregates of their union, so
+# per-region results combine without touching the rows again.
+REGION_COLUMN = 'Region'
+MARKET_COLUMNS = [REGION_COLUMN, 'Uses_KasiPay', 'Reason_For_Not_Using', 'Daily_Transaction_Count', *PAYMENT_COLUMNS]
+
+
+def market_partial(shard):
+    # Stall and user counts, barrier counts, payment counts and per-value
+    # transaction counts (bincounts, so histograms can be re-binned after merging)
+    counts = shard['Daily_Transaction_Count'].to_numpy()
+    users = shard['Uses_KasiPay'].to_numpy()
+    return {
+        'stalls': len(shard),
+        'users': int(users.sum()),
+        'reasons': shard['Reason_For_Not_Using'].value_counts(sort=False),
+        'payments': count_payment_methods(build_payment_index(shard)),
+        'transactions': np.bincount(counts),
+        'user_transactions': np.bincount(counts[users]),
+    }
+
+
+def _add_bincounts(a, b):
+    total = np.zeros(max(len(a), len(b)), dtype=np.int64)
+    total[:len(a)] += a
+    total[:len(b)] += b
+    return total
+
+
+def merge_market_partials(partials):
+    partials = list(partials)
+    if not partials:
+        raise ValueError("No market shards to merge")
+    merged = dict(partials[0])
+    for partial in partials[1:]:
+        merged = {
+            'stalls': merged['stalls'] + partial['stalls'],
+            'users': merged['users'] + partial['users'],
+            'reasons': merged['reasons'].add(partial['reasons'], fill_value=0).astype(np.int64),
+            'payments': merged['payments'].add(partial['payments'], fill_value=0).astype(np.int64),
+            'transactions': _add_bincounts(merged['transactions'], partial['transactions']),
+            'user_transactions': _add_bincounts(merged['user_transactions'], partial['user_transactions']),
+        }
+    return merged
+
+
+def _market_share_of(totals):
+    return totals['users'] / totals['stalls'] * 100 if totals['stalls'] else 0.0
+
+
+def _transaction_histogram_of(totals):
+    # All stalls and KasiPay users share bin edges so the bars overlay; the edges
+    # span the observed range as when binning the raw counts
+    transactions = totals['transactions']
+    observed = np.flatnonzero(transactions)
+    value_range = (observed[0], observed[-1]) if len(observed) else None
+    values = np.arange(len(transactions))
+    all_counts, edges = np.histogram(values, HISTOGRAM_BINS, range=value_range, weights=transactions)
+    user_counts, _ = np.histogram(values[:len(totals['user_transactions'])], edges, weights=totals['user_transactions'])
+    return edges, all_counts.astype(np.int64), user_counts.astype(np.int64)
+
+
+# KPIs computed from merged partials, by metric name
+MARKET_TOTAL_METRICS = {
+    'market_share': _market_share_of,
+    'stall_count': lambda totals: totals['stalls'],
+    'payment_counts': lambda totals: totals['payments'],
+    'reason_counts': lambda totals: totals['reasons'].sort_values(ascending=False),
+    'transaction_histogram': _transaction_histogram_of,
+}
+# Cross-filter cubes
+# Stalls over region, payment methods, barrier, KasiPay use and transaction-volume
+# bucket; reviews over day, rating, sentiment bucket and keywords (built in
+# review_store.py, where a ReviewFeed keeps it current). Transaction buckets are the
+# transaction histogram's bins. Stalls and reviews share no key, so a selection
+# filters the cube its dimensions belong to.
+KASIPAY_LABELS = ['Non-Users', 'KasiPay Users']
+NO_BARRIER = 'None'  # barrier of stalls that use KasiPay
+MARKET_CUBE_DIMENSIONS = (REGION_COLUMN, 'Payment', 'Barrier', 'KasiPay', 'Transactions')
+REVIEW_CUBE_DIMENSIONS = ('Day', 'Rating', 'Sentiment', 'Keyword')
+
+
+def _extended_labels(labels, values):
+    # labels followed by the values it lacks, in order of appearance
+    values = pd.Index(pd.unique(np.asarray(values)))
+    return labels.append(values[~values.isin(labels)])
+
+
+def build_market_cube(market_df, like=None):
+    # like: a market cube whose labels the rows are coded against, so the two cubes
+    # add up once it is padded (Cube.pad) with the regions and barriers it lacks
+    counts = market_df['Daily_Transaction_Count'].to_numpy()
+    if like is not None:
+        regions = _extended_labels(like.labels[REGION_COLUMN], market_df[REGION_COLUMN].astype(str))
+        barriers = _extended_labels(like.labels['Barrier'], market_df['Reason_For_Not_Using'].dropna())
+        buckets = like.labels['Transactions']
+        edges = np.r_[buckets.left, buckets.right[-1:]]
+        region_codes = regions.get_indexer(market_df[REGION_COLUMN].astype(str))
+        reason_codes = barriers.get_indexer(market_df['Reason_For_Not_Using'].astype(object).fillna(NO_BARRIER))
+    else:
+        region_values = market_df[REGION_COLUMN].astype('category')
+        reasons = market_df['Reason_For_Not_Using'].astype('category')
+        reason_codes = reasons.cat.codes.to_numpy().astype(np.intp)
+        reason_codes[reason_codes < 0] = len(reasons.cat.categories)
+        edges = np.histogram_bin_edges(counts, HISTOGRAM_BINS, range=(counts.min(), counts.max()) if len(counts) else None)
+        regions = region_values.cat.categories.astype(str)
+        region_codes = region_values.cat.codes.to_numpy()
+        barriers = [*reasons.cat.categories, NO_BARRIER]
+    payments = build_payment_index(market_df).to_numpy()
+    return Cube.build(
+        {
+            REGION_COLUMN: region_codes,
+            'Payment': payments @ (1 << np.arange(len(PAYMENT_METHODS))),
+            'Barrier': reason_codes,
+            'KasiPay': market_df['Uses_KasiPay'].to_numpy(dtype=np.intp),
+            'Transactions': np.clip(np.searchsorted(edges, counts, side='right') - 1, 0, len(edges) - 2),
+        },
+        {
+            REGION_COLUMN: regions,
+            'Payment': [*PAYMENT_METHODS, CASH_ONLY],
+            'Barrier': barriers,
+            'KasiPay': KASIPAY_LABELS,
+            'Transactions': pd.IntervalIndex.from_breaks(edges, closed='left'),
+        },
+        members={'Payment': (list(PAYMENT_METHODS), CASH_ONLY)},
+    )
+
+
+def _cube_transaction_histogram(cube, selection):
+    # Same shape as transaction_histogram: (edges, all stalls, KasiPay users) per bucket
+    buckets = cube.labels['Transactions']
+    users = dict(selection, KasiPay=[label for label in selection.get('KasiPay', KASIPAY_LABELS) if label == KASIPAY_LABELS[1]])
+    return (
+        np.r_[buckets.left, buckets.right[-1:]],
+        cube.marginal('Transactions', selection).to_numpy(),
+        cube.marginal('Transactions', users).to_numpy(),
+    )
+
+
+def _cube_market_share(cube, selection):
+    users = cube.marginal('KasiPay', selection)
+    return users[KASIPAY_LABELS[1]] / users.sum() * 100 if users.sum() else 0.0
+
+
+def _cube_avg_sentiment(cube, selection):
+    reviews = cube.total(selection)
+    return cube.total(selection, 'sentiment') / reviews if reviews else float('nan')
+
+
+# KPIs answered from a cube under a selection ({dimension: labels}), by metric name
+MARKET_CUBE_METRICS = {
+    'market_share': _cube_market_share,
+    'stall_count': lambda cube, selection: int(cube.total(selection)),
+    'payment_counts': lambda cube, selection: cube.marginal('Payment', selection),
+    'reason_counts': lambda cube, selection: cube.marginal('Barrier', selection).drop(NO_BARRIER).sort_values(ascending=False),
+    'transaction_histogram': _cube_transaction_histogram,
+}
+REVIEW_CUBE_METRICS = {
+    'review_count': lambda cube, selection: int(cube.total(selection)),
+    'avg_sentiment': _cube_avg_sentiment,
+    'rating_counts': lambda cube, selection: cube.marginal('Rating', selection),
+    'sentiment_counts': lambda cube, selection: cube.marginal('Sentiment', selection),
+    'keyword_counts': lambda cube, selection: cube.marginal('Keyword', selection),
+}
+
+# Lazy KPI registry
+# Each metric declares the frames or metrics it is computed from. Nothing runs at
+# import: resolve_metric() computes dependencies on first use and memoizes them in
+# the caller's store. A dependency on frame_columns('review_df', 'Rating') loads
+# just those columns.
+METRICS = {}
+INTERVENTION_WEEK = 13
+INTERVENTION_DATE = pd.Timestamp(datetime.fromisocalendar(2025, INTERVENTION_WEEK, 1))  # Monday of ISO week 13
+
+
+def metric(name, *deps):
+    def register(fn):
+        METRICS[name] = (deps, fn)
+        return fn
+    return register
+
+
+def frame_columns(frame, *names):
+    return f"{frame}[{','.join(names)}]"
+
+
+def resolve_metric(name, store, load_frame):
+    # load_frame(frame name, columns or None) reads a frame the store does not hold
+    if name not in store:
+        frame, _, projection = name.partition('[')
+        if projection:
+            projected = projection.rstrip(']').split(',')
+            if frame in store:
+                store[name] = store[frame][projected]
+            else:
+                store[name] = load_frame(frame, projected)
+        elif name in FRAME_NAMES:
+            store[name] = load_frame(name, None)
+        else:
+            deps, fn = METRICS[name]
+            store[name] = fn(*(resolve_metric(dep, store, load_frame) for dep in deps))
+    return store[name]
+
+
+def dependent_metrics(name, names):
+    # Entries of names (frames, projections, metrics) computed from frame `name`
+    stale = {name} | {key for key in names if key.partition('[')[0] == name}
+    changed = True
+    while changed:
+        changed = False
+        for metric_name, (deps, _) in METRICS.items():
+            if metric_name not in stale and any(dep.partition('[')[0] in stale for dep in deps):
+                stale.add(metric_name)
+                changed = True
+    return stale
+
+
+# Market survey: one partial per region shard, merged for the whole market
+@metric('survey_partials', frame_columns('market_df', *MARKET_COLUMNS))
+def _survey_partials(market_df):
+    return {
+        str(region): market_partial(shard)
+        for region, shard in market_df.groupby(REGION_COLUMN, observed=True, sort=True)
+    }
+
+
+# Live events: the LiveAggregates of KASIPAY_LIVE_EVENTS (see live.py), replaced by
+# the dashboard as events arrive. Their stalls add to the survey's.
+@metric('live_events')
+def _live_events():
+    return None
+
+
+@metric('market_partials', 'survey_partials', 'live_events')
+def _market_partials(survey_partials, live_events):
+    return survey_partials if live_events is None else live_events.add_partials(survey_partials)
+
+
+@metric('market_totals', 'market_partials')
+def _market_totals(market_partials):
+    return merge_market_partials(market_partials.values())
+
+
+for name, total_metric in MARKET_TOTAL_METRICS.items():
+    metric(name, 'market_totals')(total_metric)
+
+
+@metric('survey_cube', frame_columns('market_df', *MARKET_COLUMNS))
+def _survey_cube(market_df):
+    return build_market_cube(market_df)
+
+
+@metric('market_cube', 'survey_cube', 'live_events')
+def _market_cube(survey_cube, live_events):
+    return survey_cube if live_events is None else live_events.add_to_cube(survey_cube)
+
+
+@metric('review_cube', frame_columns('review_df', 'Date', 'Rating', 'Sentiment_Score', *KEYWORD_COLUMNS))
+def _review_cube(reviews):
+    return build_review_cube(reviews)
+
+
+# Overview
+@metric('avg_sentiment', 'review_totals')
+def _avg_sentiment(review_totals):
+    return review_totals['Sentiment_Score'] / review_totals['Reviews']
+
+
+@metric('sentiment_counts', frame_columns('review_df', 'Sentiment_Score'))
+def _sentiment_counts(review_df):
+    return pd.Series(sentiment_buckets(review_df['Sentiment_Score'].to_numpy())).value_counts(sort=False)
+
+
+# Customer Feedback
+@metric('rating_counts', frame_columns('review_df', 'Rating'))
+def _rating_counts(review_df):
+    # Every rating, as the review cube's Rating marginal, so no reviews still draws five bars
+    return review_df['Rating'].value_counts().reindex(RATINGS, fill_value=0)
+
+
+# Running per-period sums, maintained on append when reviews come from the feed
+@metric('review_aggregates', frame_columns('review_df', 'Date', 'Rating', 'Sentiment_Score', *KEYWORD_COLUMNS))
+def _review_aggregates(reviews):
+    return ReviewAggregates.build(reviews)
+
+
+@metric('review_totals', 'review_aggregates')
+def _review_totals(review_aggregates):
+    return review_aggregates.totals()
+
+
+@metric('keyword_counts', 'review_totals')
+def _keyword_counts(review_totals):
+    return pd.Series({label: int(review_totals[column]) for label, column in zip(KEYWORD_LABELS, KEYWORD_COLUMNS)})
+
+
+@metric('verification_complaints', 'review_totals')
+def _verification_complaints(review_totals):
+    return int(review_totals['Keyword_Verification'])
+
+
+@metric('mpesa_requests', 'review_totals')
+def _mpesa_requests(review_totals):
+    return int(review_totals['Keyword_M-Pesa'])
+
+
+@metric('fee_mentions', 'review_totals')
+def _fee_mentions(review_totals):
+    return int(review_totals['Keyword_Fees'])
+
+
+@metric('review_index', frame_columns('review_df', 'Date', 'Rating', 'Sentiment_Score'))
+def _review_index(reviews):
+    return ReviewIndex.build(reviews)
+
+
+@metric('funnel_cohorts')
+def _funnel_cohorts():
+    # Only available when the funnel is computed from an event log
+    return None
+
+
+# Retention: state of the transaction ledger, replaced with the KASIPAY_LEDGER
+# state (see retention.py) when one is configured
+RETENTION_METRICS = {
+    'retention_matrix': RetentionState.matrix,
+    'retention_curve': retention_curve,
+    'retention_cohort_sizes': RetentionState.cohort_sizes,
+}
+
+
+@metric('retention')
+def _retention():
+    return RetentionState.build(generate_ledger())
+
+
+for name, retention_metric in RETENTION_METRICS.items():
+    metric(name, 'retention')(retention_metric)
+
+
+@metric('review_count', frame_columns('review_df', 'Rating'))
+def _review_count(ratings):
+    return len(ratings)
+
+
+@metric('week_count', 'weekly_df')
+def _week_count(weekly_df):
+    # Weeks of the loaded weekly frame, live weeks included
+    return len(weekly_df)
+
+
+# Pre/Post metrics, split at the intervention week
+@metric('pre_weekly', 'weekly_df')
+def _pre_weekly(weekly_df):
+    return weekly_df.iloc[:INTERVENTION_WEEK - 1]
+
+
+@metric('post_weekly', 'weekly_df')
+def _post_weekly(weekly_df):
+    return weekly_df.iloc[INTERVENTION_WEEK - 1:]
+
+
+PRE_POST_COLUMNS = {
+    'users': 'Weekly_New_Active_Users',
+    'dropoff': 'Onboarding_Dropoff_Rate',
+    'satisfaction': 'Avg_Customer_Satisfaction',
+    'tickets': 'Support_Tickets_Onboarding',
+}
+
+
+def _period_mean(column):
+    return lambda frame: frame[column].mean()
+
+
+for key, column in PRE_POST_COLUMNS.items():
+    metric(f'pre_avg_{key}', 'pre_weekly')(_period_mean(column))
+    metric(f'post_avg_{key}', 'post_weekly')(_period_mean(column))
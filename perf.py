@@ -0,0 +1,121 @@
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Timing instrumentation for dashboard reruns. A RerunTimer measures the stages of
+# one rerun (data load, KPI lookups, each chart's build and render); StageTimings
+# keeps a rolling window of those durations per (view, stage), shared by every
+# session, from which percentiles and histograms are reported.
+
+# Histogram bucket edges in seconds, log-spaced from 0.1 ms to 100 s
+HISTOGRAM_EDGES = np.logspace(-4, 2, 25)
+
+
+def current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # No /proc: lifetime peak is the best available (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RerunTimer:
+    # Durations of the stages of one rerun; a stage entered more than once adds up
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - started
+
+    def finish(self):
+        self.durations['total'] = time.perf_counter() - self.started
+        return self.durations
+
+
+class StageTimings:
+    # Last `window` durations of every (view, stage)
+
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._last_export = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, view, durations):
+        with self._lock:
+            for stage, seconds in durations.items():
+                self._samples[(view, stage)].append(seconds)
+
+    def _windows(self, view=None):
+        with self._lock:
+            return [(key, np.array(samples)) for key, samples in sorted(self._samples.items())
+                    if view is None or key[0] == view]
+
+    def summary(self, view=None):
+        rows = []
+        for (stage_view, stage), samples in self._windows(view):
+            p50, p95 = np.percentile(samples, [50, 95])
+            rows.append({
+                'view': stage_view,
+                'stage': stage,
+                'count': len(samples),
+                'p50_ms': p50 * 1000,
+                'p95_ms': p95 * 1000,
+                'max_ms': samples.max() * 1000,
+            })
+        return rows
+
+    def histograms(self):
+        # {view: {stage: counts}} over HISTOGRAM_EDGES, with under- and overflow buckets
+        bins = np.r_[0.0, HISTOGRAM_EDGES, np.inf]
+        histograms = defaultdict(dict)
+        for (view, stage), samples in self._windows():
+            histograms[view][stage] = np.histogram(samples, bins)[0].tolist()
+        return dict(histograms)
+
+    def export_due(self, interval):
+        # True at most once per interval across all sessions
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_export < interval:
+                return False
+            self._last_export = now
+            return True
+
+
+def write_metrics(path, timings, caches):
+    # Timing summary, histograms, cache statistics and memory as JSON, replaced atomically
+    payload = {
+        'written_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'stages': timings.summary(),
+        'histogram_edges_ms': (HISTOGRAM_EDGES * 1000).tolist(),
+        'histograms': timings.histograms(),
+        'caches': caches,
+        'memory': {'rss_bytes': current_rss()},
+    }
+    fd, tmp_path = tempfile.mkstemp(prefix='.perf-', dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f, indent=2)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
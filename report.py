@@ -0,0 +1,319 @@
+# Headless report of the dashboard views.
+#
+#   python report.py reports/2025-w30 --by region,cohort --formats html,png,pdf --workers 4
+#
+# Every view's KPIs and charts are built from one shared MetricStore, as the
+# dashboard opens them, and written to <out>/report.html: one self-contained file
+# with plotly.js inlined once, readable offline. --by adds a section per region
+# (Market Analysis) or signup cohort (Onboarding Funnel). PNG images and the
+# <out>/report.pdf bundle (one page per table or chart) are rendered with kaleido,
+# split across a process pool so each worker starts its renderer once; the PDF is
+# assembled with Pillow. Both are optional (pip install -r requirements-report.txt)
+# and checked before anything is rendered. Inputs default to the dashboard's
+# KASIPAY_* environment variables.
+import argparse
+import html
+import importlib.util
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from analytics import (
+    DATA_SOURCE, DATA_VERSION, MetricStore, event_funnel, cohort_funnel, cohort_weeks, filtered_metric,
+    period_averages, before_after_table,
+)
+from charts import build_chart, chart_frames, view_charts
+from live import LiveFeed
+from retention import LedgerFeed
+from review_store import ReviewStore, ReviewFeed
+
+VIEWS = ["Overview", "Market Analysis", "Onboarding Funnel", "Customer Feedback", "Retention", "Impact Analysis"]
+FAN_OUT_VIEWS = {'region': "Market Analysis", 'cohort': "Onboarding Funnel"}
+FORMATS = ('html', 'png', 'pdf')
+FORMAT_PACKAGES = {'png': {'kaleido': 'kaleido'}, 'pdf': {'kaleido': 'kaleido', 'PIL': 'Pillow'}}  # module: distribution
+IMAGE_WIDTH, IMAGE_HEIGHT = 1000, 500
+IMAGE_SCALE = 2
+TABLE_ROW_HEIGHT = 30
+PDF_CAPTION_HEIGHT = 60  # pixels above each page's image, for its section and title
+
+
+# KPI tables, one per view: the numbers of the view's cards, for one region or cohort
+def _overview_kpis(store, regions, cohort):
+    averages = period_averages(store)
+    return pd.DataFrame({
+        'Metric': ["Market Share", "Onboarding Drop-off", "Weekly New Users", "Customer Satisfaction"],
+        'Value': [
+            f"{filtered_metric(store, 'market_share', None, regions):.1f}%",
+            f"{averages['dropoff'][1]:.1%}",
+            f"{averages['users'][1]:.0f}",
+            f"{averages['satisfaction'][1]:.1f}/5.0",
+        ],
+    })
+
+
+def _market_kpis(store, regions, cohort):
+    return pd.DataFrame({
+        'Metric': ["Stalls Surveyed", "Market Share"],
+        'Value': [
+            f"{filtered_metric(store, 'stall_count', None, regions):,}",
+            f"{filtered_metric(store, 'market_share', None, regions):.1f}%",
+        ],
+    })
+
+
+def _funnel_kpis(store, regions, cohort):
+    funnel_df = cohort_funnel(store.get('funnel_df'), store.get('funnel_cohorts'), cohort)
+    return pd.DataFrame({
+        'Stage': funnel_df['Funnel_Stage'].astype(str),
+        'Users': funnel_df['Users'].map("{:,}".format),
+        'Conversion': funnel_df['Conversion'].map("{:.1%}".format),
+    })
+
+
+def _feedback_kpis(store, regions, cohort):
+    return pd.DataFrame({
+        'Metric': ["Reviews Analyzed", "Average Sentiment"],
+        'Value': [f"{store.get('review_count'):,}", f"{store.get('avg_sentiment'):+.2f}"],
+    })
+
+
+def _retention_kpis(store, regions, cohort):
+    sizes, curve = store.get('retention_cohort_sizes'), store.get('retention_curve')
+    weeks = [1, 4]
+    return pd.DataFrame({
+        'Metric': ["Users", "Signup Cohorts", *(f"Week-{week} Retention" for week in weeks)],
+        'Value': [
+            f"{int(sizes.sum()):,}",
+            f"{len(sizes)}",
+            *(f"{curve[week]:.0%}" if week < len(curve) else "n/a" for week in weeks),
+        ],
+    })
+
+
+def _impact_kpis(store, regions, cohort):
+    return before_after_table(store).round({'Before': 2, 'After': 2, 'Difference': 2})
+
+
+VIEW_KPIS = {
+    "Overview": _overview_kpis,
+    "Market Analysis": _market_kpis,
+    "Onboarding Funnel": _funnel_kpis,
+    "Customer Feedback": _feedback_kpis,
+    "Retention": _retention_kpis,
+    "Impact Analysis": _impact_kpis,
+}
+
+
+def chart_params(chart_id, regions=None, cohort=None):
+    # A chart's parameters as the dashboard opens it, scoped to regions or a cohort
+    frames = chart_frames(chart_id)
+    if 'market_df' in frames:
+        return (regions,)
+    if 'funnel_df' in frames:
+        return (cohort,)
+    return ()
+
+
+# One view of the report, for the whole data or one region or cohort; figures are (chart_id, figure)
+Section = namedtuple('Section', ['title', 'view', 'kpis', 'figures'])
+
+
+def build_section(store, view, region=None, cohort=None):
+    regions = (region,) if region is not None else None
+    scope = region if region is not None else cohort
+    return Section(
+        view if scope is None else f"{view}: {scope}",
+        view,
+        VIEW_KPIS[view](store, regions, cohort),
+        [(chart_id, build_chart(chart_id, store, *chart_params(chart_id, regions, cohort))) for chart_id in view_charts(view)],
+    )
+
+
+def fan_out_values(store, fan_out):
+    if fan_out == 'region':
+        return store.regions()
+    return cohort_weeks(store.get('funnel_cohorts'))
+
+
+def build_sections(store, views=VIEWS, by=()):
+    sections = [build_section(store, view) for view in views]
+    for fan_out in by:
+        sections += [build_section(store, FAN_OUT_VIEWS[fan_out], **{fan_out: value}) for value in fan_out_values(store, fan_out)]
+    return sections
+
+
+def open_store(source, version, snapshot_dir=None, review_store=None, funnel_paths=(), ledger=None, live_events=None):
+    # The dashboard's data: frames of the source with ingested reviews, event-log
+    # funnel, ledger retention and live events swapped in as it does
+    store = MetricStore(source, version, snapshot_dir)
+    store.start_loading()
+    while store.loader.loading():
+        store.loader.wait_next()
+    for name in store.loader.loaders:
+        if store.frame_status(name) in ('failed', 'timed out'):
+            raise ValueError(f"Could not load {name}: {store.frame_error(name)}")
+    if review_store:
+        ingested = ReviewFeed(ReviewStore(review_store)).refresh()
+        store.update_frame(
+            'review_df', ingested.frame,
+            review_index=ingested.index, review_aggregates=ingested.aggregates, review_cube=ingested.cube,
+        )
+    if funnel_paths:
+        funnel_df, cohorts = event_funnel(list(funnel_paths))
+        store.update_frame('funnel_df', funnel_df, funnel_cohorts=cohorts)
+    if ledger:
+        store.update_frame('retention', LedgerFeed(ledger).refresh().state)
+    if live_events:
+        live = LiveFeed(live_events).refresh().aggregates
+        store.update_frame('live_events', live)
+        store.update_frame('weekly_df', live.weekly_frame(store.load_frame('weekly_df')), live_weekly=live)
+    return store
+
+
+def slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def kpi_figure(kpis):
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Table(
+        header={'values': list(kpis.columns), 'align': 'left'},
+        cells={'values': [kpis[column].astype(str) for column in kpis.columns], 'align': 'left'},
+    ))
+    fig.update_layout(margin={'l': 10, 'r': 10, 't': 10, 'b': 10})
+    return fig
+
+
+def image_items(sections, directory):
+    # (caption, figure JSON, height, path) of every table and chart, in report order
+    items = []
+    for number, section in enumerate(sections):
+        prefix = os.path.join(directory, f'{number:02d}-{slug(section.title)}')
+        table_height = TABLE_ROW_HEIGHT * (len(section.kpis) + 1) + 20
+        items.append((f"{section.title}: key metrics", kpi_figure(section.kpis).to_json(), table_height, f'{prefix}-kpis.png'))
+        items += [(f"{section.title}: {chart_id}", fig.to_json(), IMAGE_HEIGHT, f'{prefix}-{chart_id}.png')
+                  for chart_id, fig in section.figures]
+    return items
+
+
+def render_images(items):
+    # Pool task: one kaleido session renders the whole batch
+    import plotly.io as pio
+    for height in sorted({height for _, _, height, _ in items}):
+        batch = [item for item in items if item[2] == height]
+        pio.write_images([pio.from_json(figure) for _, figure, _, _ in batch], [path for _, _, _, path in batch],
+                         width=IMAGE_WIDTH, height=height, scale=IMAGE_SCALE)
+    return len(items)
+
+
+def write_images(items, workers):
+    batches = [items[i::workers] for i in range(workers) if items[i::workers]]
+    with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+        return sum(pool.map(render_images, batches))
+
+
+def write_pdf(items, path):
+    # One page per image, captioned with its section and title
+    from PIL import Image, ImageDraw
+    pages = []
+    for caption, _, _, image_path in items:
+        with Image.open(image_path) as image:
+            page = Image.new('RGB', (image.width, image.height + PDF_CAPTION_HEIGHT), 'white')
+            page.paste(image.convert('RGB'), (0, PDF_CAPTION_HEIGHT))
+        ImageDraw.Draw(page).text((20, PDF_CAPTION_HEIGHT // 3), caption, fill='black', font_size=PDF_CAPTION_HEIGHT // 3)
+        pages.append(page)
+    pages[0].save(path + '.tmp', format='PDF', save_all=True, append_images=pages[1:], resolution=72 * IMAGE_SCALE)
+    os.replace(path + '.tmp', path)
+
+
+def write_html(sections, path, title):
+    from plotly.offline import get_plotlyjs
+    contents = ''.join(f'<li><a href="#{slug(section.title)}">{html.escape(section.title)}</a></li>' for section in sections)
+    body = ''.join(
+        f'<section id="{slug(section.title)}"><h2>{html.escape(section.title)}</h2>'
+        + section.kpis.to_html(index=False, border=0, classes='kpis')
+        + ''.join(fig.to_html(full_html=False, include_plotlyjs=False, default_width='100%') for _, fig in section.figures)
+        + '</section>'
+        for section in sections
+    )
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        file.write(
+            f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            '<style>body{font-family:sans-serif;margin:2rem;color:#1F2937}h2{border-bottom:1px solid #E5E7EB;padding-top:1rem}'
+            'table.kpis{border-collapse:collapse}table.kpis td,table.kpis th{padding:.25rem .75rem;text-align:left}</style>'
+            f'<script type="text/javascript">{get_plotlyjs()}</script></head>'
+            f'<body><h1>{html.escape(title)}</h1><ul>{contents}</ul>{body}</body></html>'
+        )
+    os.replace(path + '.tmp', path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render every dashboard view into an HTML report, PNG images and a PDF bundle.")
+    parser.add_argument('out', help="output directory")
+    parser.add_argument('--views', default=','.join(VIEWS), help="comma-separated views")
+    parser.add_argument('--by', default='', help="comma-separated fan-out: region, cohort")
+    parser.add_argument('--formats', default='html', help="comma-separated: html, png, pdf (png needs kaleido, pdf kaleido and Pillow)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--source', default=DATA_SOURCE)
+    parser.add_argument('--version', default=DATA_VERSION)
+    parser.add_argument('--snapshot-dir', default=os.environ.get("KASIPAY_SNAPSHOT_DIR"))
+    parser.add_argument('--review-store', default=os.environ.get("KASIPAY_REVIEW_STORE"))
+    parser.add_argument('--funnel-events', default=os.environ.get("KASIPAY_FUNNEL_EVENTS", ""), help="comma-separated event logs")
+    parser.add_argument('--ledger', default=os.environ.get("KASIPAY_LEDGER"))
+    parser.add_argument('--live-events', default=os.environ.get("KASIPAY_LIVE_EVENTS"))
+    args = parser.parse_args(argv)
+
+    views = [view.strip() for view in args.views.split(',') if view.strip()]
+    by = [fan_out.strip() for fan_out in args.by.split(',') if fan_out.strip()]
+    formats = {fmt.strip() for fmt in args.formats.split(',') if fmt.strip()}
+    funnel_paths = [path for path in args.funnel_events.split(',') if path]
+    if not set(views) <= set(VIEWS):
+        parser.error(f"unknown views: {sorted(set(views) - set(VIEWS))} (expected some of {VIEWS})")
+    if not set(by) <= set(FAN_OUT_VIEWS):
+        parser.error(f"--by must be some of {list(FAN_OUT_VIEWS)}")
+    if not formats or not formats <= set(FORMATS):
+        parser.error(f"--formats must be some of {list(FORMATS)}")
+    missing = sorted({
+        package for fmt in formats for module, package in FORMAT_PACKAGES.get(fmt, {}).items()
+        if importlib.util.find_spec(module) is None
+    })
+    if missing:
+        parser.error(f"--formats {','.join(sorted(formats))} needs {', '.join(missing)} (pip install -r requirements-report.txt)")
+    if 'cohort' in by and not funnel_paths:
+        parser.error("--by cohort needs --funnel-events (or KASIPAY_FUNNEL_EVENTS)")
+    if args.workers < 1:
+        parser.error("--workers must be positive")
+
+    started = time.monotonic()
+    store = open_store(args.source, args.version, args.snapshot_dir, args.review_store, funnel_paths, args.ledger, args.live_events)
+    loaded = time.monotonic()
+    sections = build_sections(store, views, by)
+    built = time.monotonic()
+    os.makedirs(args.out, exist_ok=True)
+    title = f"KasiPay report: {args.source} • version {args.version}"
+    if 'html' in formats:
+        write_html(sections, os.path.join(args.out, 'report.html'), title)
+    images = 0
+    if formats & {'png', 'pdf'}:
+        with tempfile.TemporaryDirectory() as scratch:
+            directory = os.path.join(args.out, 'png') if 'png' in formats else scratch
+            os.makedirs(directory, exist_ok=True)
+            items = image_items(sections, directory)
+            images = write_images(items, args.workers)
+            if 'pdf' in formats:
+                write_pdf(items, os.path.join(args.out, 'report.pdf'))
+    print(
+        f"Wrote {len(sections)} sections, {sum(len(section.figures) for section in sections)} charts"
+        f"{f', {images} images' if images else ''} to {args.out} in {time.monotonic() - started:.1f}s "
+        f"(load {loaded - started:.1f}s, build {built - loaded:.1f}s)"
+    )
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+# Weekly cohort retention from the transaction ledger.
+#
+#   python retention.py ledger/            # a directory of day files, or CSV/Parquet paths
+#
+# Rows of the matrix are signup weeks (the Monday of a user's first transaction),
+# columns weeks since signup, cells the share of the cohort transacting that week.
+# Each chunk of the ledger is reduced in one sorted pass: user ids are coded to
+# dense integers, (week, user) keys are sorted and adjacent duplicates dropped,
+# and the pairs of completed weeks are added to the counts with one bincount.
+# Only the latest week's active users are carried between chunks, so memory grows
+# with the number of users, not transactions. The ledger arrives in time order
+# (new days are appended), which is what makes a completed week final.
+import argparse
+import os
+import sys
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from funnel import CHUNK_SIZE, read_event_chunks
+
+LEDGER_COLUMNS = ['user_id', 'timestamp']
+LEDGER_SUFFIXES = ('.csv', '.parquet')
+USER_BITS = 32  # low bits of a (week, user) key hold the user code
+
+
+def ledger_weeks(timestamps):
+    # Monday-based week number since the epoch (1970-01-01 was a Thursday)
+    days = pd.to_datetime(timestamps).to_numpy().astype('datetime64[D]').astype(np.int64)
+    return (days + 3) // 7
+
+
+def week_start(weeks):
+    return pd.to_datetime((np.asarray(weeks, dtype=np.int64) * 7 - 3).astype('datetime64[D]'))
+
+
+def _grow(counts, size):
+    if counts.shape[0] >= size:
+        return counts
+    grown = np.zeros((size, size), dtype=np.int64)
+    grown[:counts.shape[0], :counts.shape[1]] = counts
+    return grown
+
+
+class RetentionState:
+    # Users transacting per (signup week, weeks since signup). Immutable: extend()
+    # returns a new state, so a dashboard session can keep reading the old one.
+
+    def __init__(self, user_ids=None, first_week=None, counts=None, base_week=None,
+                 open_week=None, open_users=None, rows=0):
+        self.user_ids = pd.Index([]) if user_ids is None else user_ids  # position = user code
+        self.first_week = np.empty(0, dtype=np.int64) if first_week is None else first_week
+        self.counts = np.zeros((0, 0), dtype=np.int64) if counts is None else counts  # completed weeks only
+        self.base_week = base_week  # first signup week, row 0 of counts
+        self.open_week = open_week  # latest week, still receiving days
+        self.open_users = np.empty(0, dtype=np.int64) if open_users is None else open_users
+        self.rows = rows
+
+    @classmethod
+    def build(cls, ledger):
+        return cls().extend(ledger)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def extend(self, ledger):
+        if ledger.empty:
+            return self
+        weeks = ledger_weeks(ledger['timestamp'])
+        if self.open_week is not None and weeks.min() < self.open_week:
+            raise ValueError("Ledger rows are older than the latest week already ingested; the ledger must be appended in time order")
+
+        # Integer-code user ids; ids not seen before get the next codes
+        ids = ledger['user_id'].to_numpy()
+        user_ids = self.user_ids
+        codes = user_ids.get_indexer(ids)
+        new = codes < 0
+        if new.any():
+            user_ids = user_ids.append(pd.Index(pd.unique(ids[new])))
+            codes[new] = user_ids.get_indexer(ids[new])
+        if len(user_ids) >= 1 << USER_BITS:
+            raise ValueError(f"More than {1 << USER_BITS} users")
+
+        # The sorted pass: distinct (week, user) pairs, ordered by week then user
+        base_week = weeks.min() if self.base_week is None else self.base_week
+        keys = np.sort(((weeks - base_week) << USER_BITS) | codes)
+        keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+        pair_weeks = (keys >> USER_BITS) + base_week
+        pair_users = keys & ((1 << USER_BITS) - 1)
+
+        # New users signed up in the first week they transact
+        first_week = np.concatenate([self.first_week, np.full(len(user_ids) - len(self.first_week), np.iinfo(np.int64).max)])
+        joined = pair_users >= len(self.first_week)
+        np.minimum.at(first_week, pair_users[joined], pair_weeks[joined])
+
+        # Users of the open week seen in earlier chunks; that week's pairs sort first
+        if self.open_week is not None:
+            carried = pair_weeks == self.open_week
+            merged = np.sort(np.concatenate([self.open_users, pair_users[carried]]))
+            merged = merged[np.r_[True, merged[1:] != merged[:-1]]] if len(merged) else merged
+            pair_users = np.concatenate([merged, pair_users[~carried]])
+            pair_weeks = np.concatenate([np.full(len(merged), self.open_week), pair_weeks[~carried]])
+
+        open_week = int(pair_weeks[-1])
+        closed = pair_weeks < open_week
+        size = open_week - base_week + 1
+        counts = _grow(self.counts, size)
+        if closed.any():
+            counts = counts + self._bincount(first_week, base_week, pair_users[closed], pair_weeks[closed], size)
+        return RetentionState(user_ids, first_week, counts, base_week, open_week, pair_users[~closed], self.rows + len(ledger))
+
+    @staticmethod
+    def _bincount(first_week, base_week, users, weeks, size):
+        signup = first_week[users]
+        cells = (signup - base_week) * size + (weeks - signup)
+        return np.bincount(cells, minlength=size * size).reshape(size, size)
+
+    def active_users(self):
+        # Users per (signup week, weeks since signup), the open week included
+        if self.open_week is None:
+            return self.counts
+        size = self.open_week - self.base_week + 1
+        weeks = np.full(len(self.open_users), self.open_week)
+        return _grow(self.counts, size) + self._bincount(self.first_week, self.base_week, self.open_users, weeks, size)
+
+    def cohort_sizes(self):
+        if self.open_week is None:
+            return pd.Series(dtype=np.int64, name='Users')
+        size = self.open_week - self.base_week + 1
+        users = np.bincount(self.first_week - self.base_week, minlength=size)
+        return pd.Series(users, index=pd.DatetimeIndex(week_start(self.base_week + np.arange(size)), name='Cohort_Week'), name='Users')
+
+    def matrix(self):
+        # Share of each signup week's users transacting n weeks later; NaN where
+        # that week has not happened yet
+        sizes = self.cohort_sizes()
+        active = self.active_users()
+        size = len(sizes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = active / sizes.to_numpy()[:, None]
+        observed = np.arange(size)[:, None] + np.arange(size)[None, :] < size
+        shares = np.where(observed & (sizes.to_numpy()[:, None] > 0), shares, np.nan)
+        return pd.DataFrame(shares, index=sizes.index, columns=pd.RangeIndex(size, name='Weeks_Since_Signup'))
+
+
+def retention_curve(state):
+    # Share of users transacting n weeks after signup, over the cohorts old enough to have reached week n
+    sizes = state.cohort_sizes().to_numpy()
+    active = state.active_users()
+    size = len(sizes)
+    observed = np.arange(size)[:, None] + np.arange(size)[None, :] < size
+    with np.errstate(divide='ignore', invalid='ignore'):
+        curve = (active * observed).sum(axis=0) / (sizes[:, None] * observed).sum(axis=0)
+    return pd.Series(curve, index=pd.RangeIndex(size, name='Weeks_Since_Signup'), name='Retention')
+
+
+def ledger_files(path):
+    # Day files of a ledger directory in name order, or the comma-separated paths as given
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(LEDGER_SUFFIXES)]
+    return [part for part in path.split(',') if part]
+
+
+# Consistent view of a feed: the retention state and the ledger files it covers
+LedgerSnapshot = namedtuple('LedgerSnapshot', ['state', 'files', 'version'])
+
+
+class LedgerFeed:
+    # Retention state of a ledger that only reads files added since the last
+    # refresh; a new day of ledger is a new file. One feed is shared by every
+    # dashboard session.
+
+    def __init__(self, path, chunksize=CHUNK_SIZE):
+        self.path = path
+        self.chunksize = chunksize
+        self.snapshot = LedgerSnapshot(RetentionState(), (), (0, 0))
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            state, files, _ = self.snapshot
+            for path in files:
+                if os.path.getsize(path) != self._sizes[path]:
+                    raise ValueError(f"Ledger file {path} changed after it was ingested; append new days as new files")
+            new_files = [path for path in ledger_files(self.path) if path not in self._sizes]
+            # Nothing is recorded until every new file has been read, so a file that
+            # fails to read leaves the feed as it was and is read again next refresh
+            sizes = {}
+            for path in new_files:
+                for chunk in read_event_chunks(path, self.chunksize, LEDGER_COLUMNS):
+                    state = state.extend(chunk)
+                sizes[path] = os.path.getsize(path)
+            if new_files:
+                files = files + tuple(new_files)
+                self._sizes.update(sizes)
+                self.snapshot = LedgerSnapshot(state, files, (len(files), state.rows))
+            return self.snapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute weekly cohort retention from a transaction ledger.")
+    parser.add_argument('path', help="directory of CSV/Parquet day files, or comma-separated files with user_id, timestamp")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    state = LedgerFeed(args.path, args.chunksize).refresh().state
+    matrix = state.matrix()
+    matrix.insert(0, 'Users', state.cohort_sizes())
+    print(matrix.to_string(float_format=lambda value: f"{value:.0%}", na_rep=''))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
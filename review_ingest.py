@@ -0,0 +1,244 @@
+# Streaming ingestion of app-store reviews into a ReviewStore.
+#
+#   python review_ingest.py exports/*.jsonl exports/*.csv exports/*.json --store data/reviews
+#
+# CSV and JSONL files are read in fixed-size chunks and resumed from the byte offset
+# recorded in the store manifest, so re-running the job on growing exports only
+# reads reviews it has not seen. A last record still being written is left for the
+# next run. A .json export is one array of reviews: it is read whole once complete,
+# skipping as many records as were already ingested from it. Keyword flags and
+# sentiment are derived from the text.
+import argparse
+import csv
+import io
+import itertools
+import json
+import math
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from review_store import REVIEW_COLUMNS, ReviewStore
+
+CHUNK_SIZE = 50_000
+
+# Input column names accepted for each review_df column (matched case-insensitively)
+COLUMN_ALIASES = {
+    'Review_ID': ['review_id', 'reviewid', 'id'],
+    'Date': ['date', 'at', 'created_at', 'timestamp'],
+    'Rating': ['rating', 'score', 'stars'],
+    'Review_Text': ['review_text', 'text', 'content', 'review', 'body'],
+}
+
+# Keyword flags: any pattern in the list sets the column to 1. Verification counts as a
+# complaint, so it matches identity-check terms only, not sign-up or setup in general
+# ("Setup was quick and easy" is praise)
+KEYWORD_PATTERNS = {
+    'Keyword_Verification': [
+        r'verif\w*', r'\bid\b', r'\bdocuments?\b', r'\bkyc\b', r'\bselfies?\b', r'\brejected\b', r'pending approval',
+    ],
+    'Keyword_M-Pesa': [r'm[- ]?pesa'],
+    'Keyword_Fees': [r'\bfees?\b', r'\bcharges?\b', r'\bpricing\b'],
+}
+
+# Word valences in [-1, 1] for the local sentiment scorer
+SENTIMENT_LEXICON = {
+    'love': 0.9, 'best': 0.8, 'great': 0.7, 'perfect': 0.7, 'excellent': 0.8, 'amazing': 0.8,
+    'awesome': 0.8, 'good': 0.5, 'nice': 0.4, 'easy': 0.6, 'easier': 0.5, 'simple': 0.4,
+    'fast': 0.5, 'quick': 0.4, 'smooth': 0.5, 'reliable': 0.5, 'convenient': 0.5,
+    'helpful': 0.5, 'recommend': 0.6, 'happy': 0.6, 'thanks': 0.4, 'cheap': 0.3,
+    'nightmare': -0.9, 'worst': -0.9, 'terrible': -0.8, 'hate': -0.8, 'useless': -0.8,
+    'scam': -0.9, 'painful': -0.6, 'difficult': -0.5, 'hard': -0.3, 'failed': -0.6,
+    'fails': -0.6, 'fail': -0.6, 'problem': -0.4, 'problems': -0.4, 'slow': -0.5,
+    'bad': -0.6, 'broken': -0.6, 'crash': -0.6, 'crashes': -0.6, 'error': -0.4,
+    'errors': -0.4, 'stuck': -0.5, 'frustrating': -0.7, 'annoying': -0.6,
+    'confusing': -0.5, 'expensive': -0.5,
+}
+NEGATIONS = {'not', 'no', 'never', 'nothing', 'without', "don't", "doesn't", "didn't", "isn't", "wasn't", "won't"}
+NEGATION_SCOPE = 3  # tokens after a negation whose valence is flipped
+NEGATION_WEIGHT = -0.75
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:['’][a-z]+)?")
+
+
+def build_keyword_matcher(patterns=KEYWORD_PATTERNS):
+    # One alternation with a named group per keyword column, so each text is
+    # scanned once no matter how many keywords are configured
+    columns = list(patterns)
+    alternation = '|'.join(
+        f"(?P<k{i}>{'|'.join(patterns[column])})" for i, column in enumerate(columns)
+    )
+    return re.compile(alternation, re.IGNORECASE), columns
+
+
+KEYWORD_MATCHER = build_keyword_matcher()
+
+
+def match_keywords(texts, matcher=KEYWORD_MATCHER):
+    regex, columns = matcher
+    flags = np.zeros((len(texts), len(columns)), dtype=np.int8)
+    for row, text in enumerate(texts):
+        for match in regex.finditer(text):
+            flags[row, int(match.lastgroup[1:])] = 1
+    return pd.DataFrame(flags, columns=columns)
+
+
+def score_sentiment(text, lexicon=SENTIMENT_LEXICON):
+    total = 0.0
+    negated_until = -1
+    for position, token in enumerate(TOKEN_PATTERN.findall(text.lower())):
+        if token in NEGATIONS:
+            negated_until = position + NEGATION_SCOPE
+            continue
+        valence = lexicon.get(token.replace('’', "'"), 0.0)
+        total += valence * NEGATION_WEIGHT if position <= negated_until else valence
+    # Squash the unbounded sum into [-1, 1]
+    return total / math.sqrt(total * total + 1.0)
+
+
+def process_reviews(raw):
+    lowered = {column.lower(): column for column in raw.columns}
+    renames = {}
+    for target, aliases in COLUMN_ALIASES.items():
+        source = next((lowered[alias] for alias in aliases if alias in lowered), None)
+        if source is None:
+            raise ValueError(f"Review input has no column for {target} (tried {aliases})")
+        renames[source] = target
+    reviews = raw[list(renames)].rename(columns=renames)
+
+    reviews['Review_ID'] = reviews['Review_ID'].astype(str)
+    reviews['Date'] = pd.to_datetime(reviews['Date'], errors='coerce')
+    reviews['Rating'] = pd.to_numeric(reviews['Rating'], errors='coerce').clip(1, 5)
+    reviews['Review_Text'] = reviews['Review_Text'].fillna('').astype(str)
+    reviews = reviews.dropna(subset=['Date', 'Rating']).reset_index(drop=True)
+    reviews['Rating'] = reviews['Rating'].round().astype(int)
+
+    texts = reviews['Review_Text'].tolist()
+    reviews['Sentiment_Score'] = [score_sentiment(text) for text in texts]
+    keyword_flags = match_keywords(texts)
+    for column in keyword_flags:
+        reviews[column] = keyword_flags[column].to_numpy()
+    return reviews[REVIEW_COLUMNS]
+
+
+def complete_csv_records(lines):
+    # How many of lines end a complete CSV record. A newline inside a quoted field
+    # continues the record; quotes are escaped by doubling, so an odd number of
+    # quotes so far means the line ends inside one.
+    quotes, complete = 0, 0
+    for i, line in enumerate(lines):
+        quotes += line.count(b'"')
+        if quotes % 2 == 0 and line.endswith(b'\n'):
+            complete = i + 1
+    return complete
+
+
+def read_csv_records(f, chunksize):
+    # Lines of up to chunksize complete records from the file position; a record
+    # still being written is left for the next run
+    lines = list(itertools.islice(f, chunksize))
+    while lines and not complete_csv_records(lines):
+        more = list(itertools.islice(f, chunksize))
+        if not more:
+            return []
+        lines += more
+    return lines[:complete_csv_records(lines)]
+
+
+def csv_offset_after(f, rows, chunksize=CHUNK_SIZE):
+    # Byte offset after the first `rows` records, for positions kept as a row count
+    # only; the file position must be just after the header
+    offset = f.tell()
+    while rows > 0:
+        lines = read_csv_records(f, chunksize)
+        if not lines:
+            break
+        quotes, taken = 0, 0
+        for line in lines:
+            offset += len(line)
+            quotes += line.count(b'"')
+            if quotes % 2 == 0 and line.strip():
+                taken += 1
+                if taken == rows:
+                    break
+        rows -= taken
+        f.seek(offset)
+    return offset
+
+
+def read_review_chunks(path, position, chunksize=CHUNK_SIZE):
+    # Yields (raw chunk, position after the chunk) starting from a manifest position
+    if path.endswith('.csv'):
+        rows, offset = position['rows'], position['offset']
+        with open(path, 'rb') as f:
+            header = f.readline()
+            if not header.endswith(b'\n'):
+                return  # header still being written
+            names = next(csv.reader([header.decode('utf-8-sig')]))
+            if offset < len(header):
+                offset = csv_offset_after(f, rows, chunksize) if rows else len(header)
+            f.seek(offset)
+            while True:
+                lines = read_csv_records(f, chunksize)
+                if not lines:
+                    break
+                data = b''.join(lines)
+                offset += len(data)
+                chunk = pd.read_csv(io.BytesIO(data), header=None, names=names, dtype=str)
+                rows += len(chunk)
+                yield chunk, {'rows': rows, 'offset': offset}
+                f.seek(offset)
+    elif path.endswith('.jsonl'):
+        rows, offset = position['rows'], position['offset']
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                lines = list(itertools.islice(f, chunksize))
+                if lines and not lines[-1].endswith(b'\n'):
+                    lines.pop()  # still being written; pick it up next run
+                if not lines:
+                    break
+                offset += sum(len(line) for line in lines)
+                records = [json.loads(line) for line in lines if line.strip()]
+                rows += len(records)
+                yield pd.DataFrame.from_records(records), {'rows': rows, 'offset': offset}
+    elif path.endswith('.json'):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if not data.rstrip().endswith(b']'):
+            return  # still being written
+        records = json.loads(data)
+        if not isinstance(records, list):
+            raise ValueError(f"Review file {path} is not a JSON array of reviews")
+        for start in range(position['rows'], len(records), chunksize):
+            chunk = records[start:start + chunksize]
+            yield pd.DataFrame.from_records(chunk), {'rows': start + len(chunk), 'offset': len(data)}
+    else:
+        raise ValueError(f"Unsupported review file: {path} (expected .csv, .jsonl or .json)")
+
+
+def ingest_files(paths, store, chunksize=CHUNK_SIZE):
+    added = 0
+    for path in paths:
+        for raw, position in read_review_chunks(path, store.source_position(path), chunksize):
+            reviews = process_reviews(raw) if len(raw) else pd.DataFrame(columns=REVIEW_COLUMNS)
+            store.append(reviews, source=path, position=position)
+            added += len(reviews)
+    return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest review exports into the KasiPay review store.")
+    parser.add_argument('paths', nargs='+', help="CSV, JSONL or JSON-array review files")
+    parser.add_argument('--store', required=True, help="review store directory")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    store = ReviewStore(args.store)
+    added = ingest_files(args.paths, store, args.chunksize)
+    print(f"Ingested {added:,} new reviews ({store.rows:,} in store)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,332 @@
+import io
+import json
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from cube import Cube
+
+# Column layout of the dashboard's review_df; the store keeps rows in this order
+REVIEW_COLUMNS = [
+    'Review_ID', 'Date', 'Rating', 'Review_Text', 'Sentiment_Score',
+    'Keyword_Verification', 'Keyword_M-Pesa', 'Keyword_Fees',
+]
+KEYWORD_COLUMNS = [column for column in REVIEW_COLUMNS if column.startswith('Keyword_')]
+
+# Compact dtypes of stored reviews, matching review_df's schema (see schema.py)
+REVIEW_DTYPES = {
+    'Review_ID': 'string[pyarrow]',
+    'Rating': 'int8',
+    'Review_Text': 'string[pyarrow]',
+    'Sentiment_Score': 'float32',
+    **dict.fromkeys(KEYWORD_COLUMNS, 'int8'),
+}
+
+DATE_DTYPE = 'datetime64[us]'  # as read_csv parses the stored dates
+
+
+def empty_reviews():
+    # A review frame with no rows, typed as read() returns stored ones
+    return pd.DataFrame({column: pd.Series(dtype=REVIEW_DTYPES.get(column, DATE_DTYPE)) for column in REVIEW_COLUMNS})
+
+
+# Sentiment bands used by the review browser: score <= -0.3, <= 0.3, above
+SENTIMENT_BANDS = ['Negative', 'Neutral', 'Positive']
+SENTIMENT_BAND_EDGES = [-0.3, 0.3]
+
+
+class ReviewStore:
+    # Append-only on-disk review table: a headerless CSV of processed reviews plus a
+    # JSON manifest. The manifest is the commit point - it records how many bytes of
+    # the CSV are valid and how far each input file has been ingested, so a crash
+    # between the two writes loses at most the uncommitted chunk, never duplicates it.
+
+    def __init__(self, path):
+        self.path = path
+        self.data_path = os.path.join(path, 'reviews.csv')
+        self.manifest_path = os.path.join(path, 'manifest.json')
+        os.makedirs(path, exist_ok=True)
+        self.reload()
+
+    def reload(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'rows': 0, 'bytes': 0, 'sources': {}}
+
+    @property
+    def rows(self):
+        return self.manifest['rows']
+
+    @property
+    def version(self):
+        # Committed size of the data file; grows with every append
+        return self.manifest['bytes']
+
+    def source_position(self, source):
+        return self.manifest['sources'].get(os.path.abspath(source), {'rows': 0, 'offset': 0})
+
+    def append(self, reviews, source=None, position=None):
+        with open(self.data_path, 'ab') as f:
+            f.truncate(self.manifest['bytes'])  # drop anything left by an uncommitted append
+            reviews[REVIEW_COLUMNS].to_csv(f, header=False, index=False, date_format='%Y-%m-%dT%H:%M:%S')
+            end = f.tell()
+
+        self.manifest['rows'] += len(reviews)
+        self.manifest['bytes'] = end
+        if source is not None:
+            self.manifest['sources'][os.path.abspath(source)] = position
+        self._save_manifest()
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def read(self, offset=0):
+        # Rows committed after byte offset; returns them with the new offset
+        end = self.manifest['bytes']
+        if end <= offset:
+            return empty_reviews(), offset
+        with open(self.data_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(end - offset)
+        reviews = pd.read_csv(
+            io.BytesIO(data),
+            header=None,
+            names=REVIEW_COLUMNS,
+            parse_dates=['Date'],
+            dtype=REVIEW_DTYPES,
+            keep_default_na=False,
+        )
+        return reviews, end
+
+
+def _merge_ordered(order, new_order, keys):
+    # Merge two position lists already sorted by keys; O(n) with no re-sort
+    at = np.searchsorted(keys[order], keys[new_order], side='left')
+    return np.insert(order, at, new_order)
+
+
+class ReviewIndex:
+    # Row positions of a review frame ordered newest first, overall and per rating
+    # and per sentiment band, so a page of reviews is a slice instead of a sort.
+    # Indexes are immutable: extend() merges appended rows into a new index, which
+    # lets a reader keep using the index that matches the frame it holds.
+
+    def __init__(self, keys=None, ratings=None, bands=None, order=None, by_rating=None, by_band=None):
+        empty = np.empty(0, dtype=np.int64)
+        self._keys = empty if keys is None else keys  # negated date, so ascending = newest first
+        self._ratings = np.empty(0, dtype=np.int8) if ratings is None else ratings
+        self._bands = np.empty(0, dtype=np.int8) if bands is None else bands
+        self.order = empty if order is None else order
+        self.by_rating = by_rating or {}
+        self.by_band = by_band or {}
+
+    @classmethod
+    def build(cls, reviews):
+        return cls().extend(reviews)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def extend(self, reviews):
+        # reviews are the rows appended after the ones already indexed
+        start = len(self)
+        new_keys = -reviews['Date'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        new_ratings = reviews['Rating'].to_numpy(dtype=np.int8)
+        new_bands = np.searchsorted(SENTIMENT_BAND_EDGES, reviews['Sentiment_Score'].to_numpy(), side='left').astype(np.int8)
+
+        keys = np.concatenate([self._keys, new_keys])
+        ratings = np.concatenate([self._ratings, new_ratings])
+        bands = np.concatenate([self._bands, new_bands])
+        # Stable sort of the new rows only; on equal dates the later row comes first
+        new_order = start + len(new_keys) - 1 - np.argsort(new_keys[::-1], kind='stable')
+
+        by_rating = dict(self.by_rating)
+        for rating in np.unique(new_ratings):
+            subset = new_order[ratings[new_order] == rating]
+            by_rating[int(rating)] = _merge_ordered(by_rating.get(int(rating), subset[:0]), subset, keys)
+        by_band = dict(self.by_band)
+        for band in np.unique(new_bands):
+            subset = new_order[bands[new_order] == band]
+            by_band[int(band)] = _merge_ordered(by_band.get(int(band), subset[:0]), subset, keys)
+
+        order = _merge_ordered(self.order, new_order, keys)
+        return ReviewIndex(keys, ratings, bands, order, by_rating, by_band)
+
+    def page(self, start=0, size=10, rating=None, band=None):
+        # Positions of reviews start..start+size (newest first) matching the filters,
+        # plus whether more matches follow
+        empty = np.empty(0, dtype=np.int64)
+        if rating is None and band is None:
+            matches = self.order
+        elif band is None:
+            matches = self.by_rating.get(rating, empty)
+        elif rating is None:
+            matches = self.by_band.get(band, empty)
+        else:
+            # Walk the shorter list and check the other facet chunk by chunk
+            by_rating, by_band = self.by_rating.get(rating, empty), self.by_band.get(band, empty)
+            candidates, values, wanted = (
+                (by_rating, self._bands, band) if len(by_rating) <= len(by_band) else (by_band, self._ratings, rating)
+            )
+            found = []
+            needed = start + size + 1
+            chunk = max(4 * needed, 1024)
+            for offset in range(0, len(candidates), chunk):
+                block = candidates[offset:offset + chunk]
+                found.append(block[values[block] == wanted])
+                if sum(len(f) for f in found) >= needed:
+                    break
+            matches = np.concatenate(found) if found else empty
+        return matches[start:start + size], len(matches) > start + size
+
+
+# Period start for each granularity; weeks are ISO weeks starting on Monday, so the
+# key is unique across years (ISO week 1 of 2025 and of 2026 get different keys)
+GRANULARITIES = {
+    'day': lambda days: days,
+    'week': lambda days: days - pd.to_timedelta(days.dt.weekday, unit='D'),
+    'month': lambda days: days.dt.to_period('M').dt.start_time,
+}
+
+
+class ReviewAggregates:
+    # Running per-period review count and sums of sentiment, rating and keyword hits
+    # at every granularity. extend() groups only the appended rows and adds them to
+    # the period tables, so a trend chart never regroups the raw reviews. Like
+    # ReviewIndex it is immutable and never writes to the frames it is given.
+
+    MEASURES = ['Reviews', 'Sentiment_Score', 'Rating'] + KEYWORD_COLUMNS
+
+    def __init__(self, tables=None):
+        self.tables = tables or {}
+
+    @classmethod
+    def build(cls, reviews):
+        return cls().extend(reviews)
+
+    def extend(self, reviews):
+        if reviews.empty:
+            return self
+        values = pd.DataFrame({
+            'Reviews': np.ones(len(reviews), dtype=np.int64),
+            'Sentiment_Score': reviews['Sentiment_Score'].to_numpy(dtype=float),
+            'Rating': reviews['Rating'].to_numpy(dtype=np.int64),
+            **{column: reviews[column].to_numpy(dtype=np.int64) for column in KEYWORD_COLUMNS},
+        })
+        days = reviews['Date'].dt.normalize()
+        tables = dict(self.tables)
+        for granularity, period_start in GRANULARITIES.items():
+            batch = values.groupby(period_start(days).to_numpy()).sum()
+            if granularity in tables:
+                batch = tables[granularity].add(batch, fill_value=0).sort_index().astype(values.dtypes)
+            tables[granularity] = batch
+        return ReviewAggregates(tables)
+
+    def totals(self):
+        if not self.tables:
+            return pd.Series(0, index=self.MEASURES)
+        return self.tables['day'].sum()
+
+    def series(self, granularity='week'):
+        # One row per period: Period start, review count, mean sentiment and rating, keyword hits
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity!r} (expected one of {list(GRANULARITIES)})")
+        table = self.tables.get(granularity, pd.DataFrame(columns=self.MEASURES))
+        series = table[KEYWORD_COLUMNS].copy()
+        series.insert(0, 'Reviews', table['Reviews'])
+        series.insert(1, 'Sentiment_Score', table['Sentiment_Score'] / table['Reviews'])
+        series.insert(2, 'Rating', table['Rating'] / table['Reviews'])
+        return series.rename_axis('Period').reset_index()
+
+
+# Cross-filter cube of reviews over day, rating, sentiment bucket and keywords (see
+# cube.py). Days run from the first review's to the last's.
+RATINGS = range(1, 6)
+SENTIMENT_BINS = [-1, -0.5, 0, 0.5, 1]
+SENTIMENT_LABELS = ['Very Negative', 'Negative', 'Positive', 'Very Positive']
+KEYWORD_LABELS = [column.removeprefix('Keyword_') for column in KEYWORD_COLUMNS]
+
+
+def sentiment_buckets(scores):
+    # The one binning rule of sentiment: right-closed SENTIMENT_BINS with -1.0 in
+    # the lowest bucket; scores are clipped to [-1, 1], a missing score has code -1
+    scores = np.clip(np.asarray(scores, dtype=float), SENTIMENT_BINS[0], SENTIMENT_BINS[-1])
+    return pd.Categorical(pd.cut(scores, bins=SENTIMENT_BINS, labels=SENTIMENT_LABELS, include_lowest=True))
+
+
+def build_review_cube(reviews):
+    # An empty store may hand over an untyped empty frame; it gives an empty cube
+    days = pd.to_datetime(reviews['Date']).dt.normalize()
+    first = days.min() if len(days) else pd.Timestamp(0)
+    scores = reviews['Sentiment_Score'].to_numpy(dtype=float)
+    sentiments = sentiment_buckets(scores).codes
+    if (sentiments < 0).any():
+        raise ValueError("Reviews without a sentiment score cannot be added to the review cube")
+    return Cube.build(
+        {
+            'Day': (days - first).dt.days.to_numpy(),
+            'Rating': reviews['Rating'].to_numpy(dtype=np.intp) - 1,
+            'Sentiment': sentiments,
+            'Keyword': sum((reviews[column].to_numpy() > 0).astype(np.intp) << bit for bit, column in enumerate(KEYWORD_COLUMNS)),
+        },
+        {
+            'Day': pd.date_range(first, days.max(), freq='D') if len(days) else pd.DatetimeIndex([]),
+            'Rating': RATINGS,
+            'Sentiment': SENTIMENT_LABELS,
+            'Keyword': KEYWORD_LABELS,
+        },
+        values={'sentiment': scores},
+        members={'Keyword': (KEYWORD_LABELS, None)},
+    )
+
+
+def extend_review_cube(cube, reviews):
+    # The cube with reviews added; only their rows are binned, and the two cubes are
+    # padded to the days of both before adding
+    if reviews.empty:
+        return cube
+    added = build_review_cube(reviews)
+    if not len(cube.labels['Day']):
+        return added
+    days = cube.labels['Day'].union(added.labels['Day'])
+    labels = dict(cube.labels, Day=pd.date_range(days[0], days[-1], freq='D'))
+    return cube.pad(labels) + added.pad(labels)
+
+
+# Consistent view of a feed: the frame, the structures derived from its rows and
+# the store version (committed bytes) they were read up to
+ReviewSnapshot = namedtuple('ReviewSnapshot', ['frame', 'index', 'aggregates', 'cube', 'version'])
+
+
+class ReviewFeed:
+    # In-memory copy of a ReviewStore that only reads rows appended since the last
+    # refresh, with a ReviewIndex, ReviewAggregates and review cube kept up to date
+    # on append. One feed is shared by every dashboard session.
+
+    def __init__(self, store):
+        self.store = store
+        self.snapshot = ReviewSnapshot(empty_reviews(), ReviewIndex(), ReviewAggregates(), build_review_cube(empty_reviews()), 0)
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            self.store.reload()
+            frame, index, aggregates, cube, version = self.snapshot
+            if self.store.version > version:
+                new_reviews, version = self.store.read(version)
+                self.snapshot = ReviewSnapshot(
+                    pd.concat([frame, new_reviews] if len(frame) else [new_reviews], ignore_index=True),
+                    index.extend(new_reviews),
+                    aggregates.extend(new_reviews),
+                    extend_review_cube(cube, new_reviews),
+                    version,
+                )
+            return self.snapshot
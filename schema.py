@@ -0,0 +1,150 @@
+# Column dtypes of the dashboard frames.
+#
+#   python schema.py --source synthetic-national
+#
+# Low-cardinality text is categorical, free text is dictionary-encoded when it
+# repeats and Arrow-backed otherwise, flags are int8/bool, scores float32 and
+# counts int32. conform() applies the schema, validate_frame() checks it, and the
+# CLI reports bytes per row before and after for a data source.
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from review_store import KEYWORD_COLUMNS
+
+STRING_DTYPE = pd.StringDtype('pyarrow')
+TEXT_CATEGORY_RATIO = 0.5  # 'text' columns are categorical at most this many distinct values per row
+
+SCHEMAS = {
+    'market_df': {
+        'Stall_ID': 'string',
+        'Region': 'category',
+        'Primary_Payment_Method': 'category',
+        'Secondary_Payment_Method': 'category',
+        'Uses_KasiPay': 'bool',
+        'Reason_For_Not_Using': 'category',
+        'Daily_Transaction_Count': 'int32',
+    },
+    'funnel_df': {
+        'Funnel_Stage': 'category',
+        'Users': 'int32',
+        'Drop-off_Count': 'int32',
+        'Drop-off_Rate': 'float32',
+        'Conversion': 'float32',
+        'Conversion_From_Start': 'float32',
+    },
+    'review_df': {
+        'Review_ID': 'string',
+        'Date': 'datetime',
+        'Rating': 'int8',
+        'Review_Text': 'text',
+        'Sentiment_Score': 'float32',
+        **dict.fromkeys(KEYWORD_COLUMNS, 'int8'),
+    },
+    'weekly_df': {
+        'Week': 'int16',
+        'Date': 'datetime',
+        'Weekly_New_Active_Users': 'float32',
+        'Onboarding_Dropoff_Rate': 'float32',
+        'Avg_Customer_Satisfaction': 'float32',
+        'Support_Tickets_Onboarding': 'float32',
+    },
+}
+
+
+def dtype_matches(dtype, kind):
+    if kind == 'category':
+        return isinstance(dtype, pd.CategoricalDtype)
+    if kind == 'string':
+        return isinstance(dtype, pd.StringDtype)
+    if kind == 'text':
+        return isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype))
+    if kind == 'datetime':
+        return pd.api.types.is_datetime64_dtype(dtype)
+    return dtype == np.dtype(kind)
+
+
+def needs_conversion(series, kind):
+    # Text that is not yet dictionary-encoded is re-checked for repeated values
+    if kind == 'text':
+        return not isinstance(series.dtype, pd.CategoricalDtype)
+    return not dtype_matches(series.dtype, kind)
+
+
+def convert(series, kind):
+    if not needs_conversion(series, kind):
+        return series
+    if kind == 'category':
+        return series.astype('category')
+    if kind == 'string':
+        return series.astype(STRING_DTYPE)
+    if kind == 'text':
+        distinct = series.nunique(dropna=False)
+        return series.astype('category') if distinct <= len(series) * TEXT_CATEGORY_RATIO else convert(series, 'string')
+    if kind == 'datetime':
+        return pd.to_datetime(series)
+    dtype = np.dtype(kind)
+    if dtype.kind in 'iu' and len(series):
+        # astype would silently wrap values that do not fit
+        info = np.iinfo(dtype)
+        if series.min() < info.min or series.max() > info.max:
+            raise ValueError(f"{series.name} has values outside the {dtype} range")
+    return series.astype(dtype)
+
+
+def conform(name, frame):
+    # frame with the schema's dtypes; columns already matching are kept as they are
+    schema = SCHEMAS[name]
+    converted = {column: convert(frame[column], kind) for column, kind in schema.items()
+                 if column in frame and needs_conversion(frame[column], kind)}
+    return frame.assign(**converted) if converted else frame
+
+
+def validate_frame(name, frame):
+    problems = [
+        f"{column}: missing" if column not in frame else f"{column}: {frame[column].dtype} is not {kind}"
+        for column, kind in SCHEMAS[name].items()
+        if column not in frame or not dtype_matches(frame[column].dtype, kind)
+    ]
+    if problems:
+        raise ValueError(f"{name} does not match its schema: " + "; ".join(problems))
+    return frame
+
+
+def bytes_per_row(frame):
+    return frame.memory_usage(deep=True, index=False).sum() / max(len(frame), 1)
+
+
+def schema_report(frames):
+    rows = []
+    for name, frame in frames.items():
+        compact = validate_frame(name, conform(name, frame))
+        before, after = bytes_per_row(frame), bytes_per_row(compact)
+        rows.append({
+            'frame': name,
+            'rows': len(frame),
+            'bytes_per_row_before': before,
+            'bytes_per_row_after': after,
+            'saved': 1 - after / before if before else 0.0,
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    from analytics import FrameLoader, source_loaders
+
+    parser = argparse.ArgumentParser(description="Report memory per row before and after applying the frame schema.")
+    parser.add_argument('--source', default='synthetic', help="data source name, or 'files' for KASIPAY_DATA_DIR")
+    args = parser.parse_args(argv)
+
+    try:
+        frames = FrameLoader(source_loaders(args.source)).results()
+    except ValueError as e:
+        parser.error(str(e))
+    print(schema_report(frames).to_string(index=False, float_format=lambda value: f"{value:,.2f}"))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
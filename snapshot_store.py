@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+from urllib.parse import quote, unquote
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+
+class SnapshotStore:
+    # Versioned, read-only snapshots of the dashboard frames as uncompressed Arrow
+    # IPC files, one directory per snapshot:
+    #
+    #   <root>/<snapshot>/market_df.arrow, funnel_df.arrow, ...
+    #
+    # A frame published as {shard: frame} is split into one file per shard,
+    #
+    #   <root>/<snapshot>/market_df/<shard>.arrow
+    #
+    # and readers pick the shards they need; without a selection they get all of
+    # them as one frame. Files are opened memory-mapped, so every worker on the host shares the same
+    # pages through the OS cache and only the columns a caller selects are touched.
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, snapshot, name=None):
+        path = os.path.join(self.root, snapshot)
+        return path if name is None else os.path.join(path, f'{name}.arrow')
+
+    def _shard_path(self, snapshot, name, shard):
+        return os.path.join(self._path(snapshot), name, f"{quote(str(shard), safe='')}.arrow")
+
+    def exists(self, snapshot):
+        return os.path.isdir(self._path(snapshot))
+
+    def shards(self, snapshot, name):
+        # Shard names of a sharded frame, [] for a frame stored whole
+        path = os.path.join(self._path(snapshot), name)
+        if not os.path.isdir(path):
+            return []
+        return sorted(unquote(file[:-len('.arrow')]) for file in os.listdir(path) if file.endswith('.arrow'))
+
+    def publish(self, snapshot, frames):
+        # Written to a hidden temp directory and renamed into place, so readers never
+        # see a half-written snapshot. If another worker published the same snapshot
+        # first, its copy wins and ours is discarded.
+        tmp_path = tempfile.mkdtemp(prefix=f'.{snapshot}-', dir=self.root)
+        os.chmod(tmp_path, 0o755)  # mkdtemp is owner-only; workers may run as other users
+        try:
+            for name, frame in frames.items():
+                if isinstance(frame, dict):
+                    os.mkdir(os.path.join(tmp_path, name))
+                    for shard, shard_frame in frame.items():
+                        self._write(shard_frame, os.path.join(tmp_path, name, f"{quote(str(shard), safe='')}.arrow"))
+                else:
+                    self._write(frame, os.path.join(tmp_path, f'{name}.arrow'))
+            os.rename(tmp_path, self._path(snapshot))
+        except OSError:
+            if not self.exists(snapshot):
+                raise
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @staticmethod
+    def _write(frame, path):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        with pa.OSFile(path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    def remove(self, snapshot):
+        # Readers that already mapped its files keep their pages until they close them
+        shutil.rmtree(self._path(snapshot), ignore_errors=True)
+
+    def _table(self, snapshot, name, shards=None):
+        stored = self.shards(snapshot, name)
+        if not stored:
+            return ipc.open_file(pa.memory_map(self._path(snapshot, name), 'r')).read_all()
+        if shards is not None and not shards:
+            raise ValueError(f"No shards of {name} selected")
+        missing = set(shards or ()) - set(stored)
+        if missing:
+            raise ValueError(f"{name} has no shards {sorted(missing)} in {snapshot}")
+        # Chunks of the mapped shard files side by side; nothing is copied
+        return pa.concat_tables(
+            ipc.open_file(pa.memory_map(self._shard_path(snapshot, name, shard), 'r')).read_all()
+            for shard in (stored if shards is None else shards)
+        )
+
+    def read(self, snapshot, name, columns=None, shards=None):
+        # shards selects shards of a sharded frame (all when None)
+        table = self._table(snapshot, name, shards)
+        if columns is not None:
+            table = table.select(list(columns))
+        # split_blocks keeps one pandas block per column, so null-free numeric
+        # columns stay zero-copy views of the mapped file
+        return table.to_pandas(split_blocks=True)
+
+    def take(self, snapshot, name, positions, columns=None):
+        # Just the given rows; other rows' pages of wide columns are never touched
+        table = self._table(snapshot, name)
+        if columns is not None:
+            table = table.select(list(columns))
+        return table.take(positions).to_pandas()
@@ -0,0 +1,57 @@
+# Static assets of the dashboard, bundled under static/ so that rendering needs no
+# network access. Streamlit serves that directory at app/static/
+# (server.enableStaticServing in .streamlit/config.toml).
+#
+#   python static_assets.py            # lists remote assets, exits 1 if there are any
+#
+# remote_assets() scans the dashboard sources and the bundled stylesheets and
+# images for anything the browser would fetch from another host; the dashboard
+# runs it once per server process and flags what it finds.
+import argparse
+import re
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+ASSET_DIR = ROOT / 'static'
+ASSET_URL = 'app/static'
+LOGO_PATH = ASSET_DIR / 'kasipay-logo.svg'
+STYLESHEET_PATH = ASSET_DIR / 'dashboard.css'
+STYLESHEET_URL = f'{ASSET_URL}/{STYLESHEET_PATH.name}'
+DASHBOARD_SOURCES = ['kasipay.py', 'charts.py']
+
+# A URL on another host in a position where it is loaded: st.image/st.logo/media
+# and page_icon arguments, HTML src/href attributes, CSS url() and @import
+REMOTE_ASSET = re.compile(
+    r"""(?:st\.(?:image|logo|audio|video)\(\s*|page_icon\s*=\s*|\b(?:src|href)\s*=\s*|url\(\s*|@import\s+)"""
+    r"""["']?((?:https?:)?//[^\s"')]+)"""
+)
+
+
+def asset_paths():
+    return [ROOT / name for name in DASHBOARD_SOURCES] + sorted(ASSET_DIR.glob('*.css')) + sorted(ASSET_DIR.glob('*.svg'))
+
+
+def remote_assets(paths=None):
+    # (file, line number, url) of every remote asset reference
+    found = []
+    for path in asset_paths() if paths is None else paths:
+        with open(path, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                found.extend((str(path), number, match.group(1)) for match in REMOTE_ASSET.finditer(line))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List remote assets the dashboard would fetch when it renders.")
+    parser.add_argument('paths', nargs='*', help="files to scan (default: dashboard sources and static/)")
+    args = parser.parse_args(argv)
+
+    found = remote_assets(args.paths or None)
+    for path, line, url in found:
+        print(f"{path}:{line}: {url}")
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
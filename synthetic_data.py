@@ -0,0 +1,234 @@
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from funnel import FUNNEL_STAGES, build_funnel_table
+
+# Synthetic market survey
+SECONDARY_METHODS = ['SnapScan', 'Zapper', 'None']
+SECONDARY_PROBS = [0.25, 0.25, 0.5]
+MARKET_REASONS = ['Verification too difficult', 'Phone too old', "Don't trust apps", 'Need M-Pesa', 'Happy with cash']
+MARKET_REASON_PROBS = [0.4, 0.2, 0.2, 0.15, 0.05]
+MARKET_REGIONS = ['Soweto', 'Khayelitsha', 'Umlazi', 'Tembisa', 'Mamelodi', 'Alexandra']
+MARKET_REGION_PROBS = [0.3, 0.2, 0.15, 0.15, 0.1, 0.1]
+
+# Chunked generation
+# Every dataset is generated in fixed-size chunks of rows, each column of chunk i
+# from its own stream, spawned from the seed by (dataset, i, column). A chunk's
+# values depend only on the seed, the chunk size, its index and the parameters,
+# so chunks can be generated in any order by any number of processes; and as each
+# column's draws only ever extend, generating more rows leaves earlier ones unchanged.
+CHUNK_ROWS = 1_000_000
+DATASET_KEYS = {'market_df': 0, 'funnel_events': 1, 'review_df': 2, 'weekly_df': 3}
+
+
+def chunk_streams(seed, dataset, index):
+    # streams(column) is the generator of one column of the chunk, the same stream as
+    # SeedSequence(seed).spawn(...)[dataset key].spawn(...)[index].spawn(...)[column]
+    key = DATASET_KEYS[dataset]
+    return lambda column: np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(key, index, column)))
+
+
+def chunk_count(n_rows, chunk_rows=CHUNK_ROWS):
+    return -(-n_rows // chunk_rows)
+
+
+def generate_chunk(dataset, index, n_rows, seed=42, chunk_rows=CHUNK_ROWS, **params):
+    # Rows [index * chunk_rows, min(n_rows, (index + 1) * chunk_rows)) of a dataset
+    if dataset not in CHUNK_GENERATORS:
+        raise ValueError(f"Unknown dataset: {dataset!r} (expected one of {list(CHUNK_GENERATORS)})")
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be positive")
+    start = index * chunk_rows
+    stop = min(n_rows, start + chunk_rows)
+    return CHUNK_GENERATORS[dataset](chunk_streams(seed, dataset, index), start, stop, **params)
+
+
+def generate_dataset(dataset, n_rows, seed=42, chunk_rows=CHUNK_ROWS, **params):
+    # The whole dataset in memory, chunk by chunk
+    chunks = [generate_chunk(dataset, i, n_rows, seed, chunk_rows, **params) for i in range(max(1, chunk_count(n_rows, chunk_rows)))]
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def _padded_ids(prefix, start, stop):
+    return np.char.add(prefix, np.char.zfill(np.arange(start + 1, stop + 1).astype(str), 3))
+
+
+def market_chunk(streams, start, stop, adoption_rate=0.25, reason_probs=None):
+    reason_probs = np.asarray(MARKET_REASON_PROBS if reason_probs is None else reason_probs, dtype=float)
+    if len(reason_probs) != len(MARKET_REASONS) or not np.isclose(reason_probs.sum(), 1.0):
+        raise ValueError(f"reason_probs must be {len(MARKET_REASONS)} probabilities summing to 1")
+    if not 0 <= adoption_rate <= 1:
+        raise ValueError("adoption_rate must be between 0 and 1")
+
+    # Adopters are spread evenly, so any first n stalls hold round(n * adoption_rate) of them
+    stalls = np.arange(start, stop)
+    users = np.floor((stalls + 1) * adoption_rate) > np.floor(stalls * adoption_rate)
+    n_non_users = int((~users).sum())
+
+    # Codes index into the category lists below; -1 marks a missing reason
+    secondary_codes = np.zeros(len(stalls), dtype=np.int8)
+    reason_codes = np.full(len(stalls), -1, dtype=np.int8)
+    secondary_codes[~users] = 1 + streams(0).choice(len(SECONDARY_METHODS), n_non_users, p=SECONDARY_PROBS)
+    reason_codes[~users] = streams(1).choice(len(MARKET_REASONS), n_non_users, p=reason_probs)
+
+    return pd.DataFrame({
+        'Stall_ID': _padded_ids('T', start, stop),
+        'Region': pd.Categorical.from_codes(streams(2).choice(len(MARKET_REGIONS), len(stalls), p=MARKET_REGION_PROBS), MARKET_REGIONS),
+        'Primary_Payment_Method': pd.Categorical.from_codes(np.zeros(len(stalls), dtype=np.int8), ['Cash']),
+        'Secondary_Payment_Method': pd.Categorical.from_codes(secondary_codes, ['KasiPay'] + SECONDARY_METHODS),
+        'Uses_KasiPay': users,
+        'Reason_For_Not_Using': pd.Categorical.from_codes(reason_codes, MARKET_REASONS),
+        'Daily_Transaction_Count': streams(3).integers(5, 100, len(stalls), dtype=np.int32),
+    })
+
+
+def generate_market_data(n_stalls=96, adoption_rate=0.25, reason_probs=None, seed=42, batch_size=CHUNK_ROWS):
+    return generate_dataset('market_df', n_stalls, seed, batch_size, adoption_rate=adoption_rate, reason_probs=reason_probs)
+
+
+# Onboarding funnel
+def generate_funnel_data():
+    return build_funnel_table([500, 350, 180, 120, 110, 84])
+
+
+# Per-user onboarding events, one per stage reached, dropping out like the table above
+FUNNEL_FURTHEST_PROBS = [0.30, 0.34, 0.12, 0.02, 0.05, 0.17]
+FUNNEL_START = pd.Timestamp('2025-01-01')
+
+
+def funnel_events_chunk(streams, start, stop, days=180):
+    furthest = streams(0).choice(len(FUNNEL_STAGES), stop - start, p=FUNNEL_FURTHEST_PROBS)
+    users = np.repeat(np.arange(start, stop), furthest + 1)
+    stages = np.arange(len(users)) - np.repeat(np.cumsum(furthest + 1) - (furthest + 1), furthest + 1)
+    signup = streams(1).integers(0, days * 86400, stop - start)
+    # Each stage follows the previous one by up to two days
+    elapsed = streams(2).integers(0, 2 * 86400, len(users))
+    elapsed[stages == 0] = 0
+    offsets = signup[users - start] + np.cumsum(elapsed) - np.repeat(np.cumsum(elapsed)[np.cumsum(furthest + 1) - (furthest + 1)], furthest + 1)
+    return pd.DataFrame({
+        'user_id': users,
+        'event': pd.Categorical.from_codes(stages, FUNNEL_STAGES),
+        'timestamp': FUNNEL_START + pd.to_timedelta(offsets, unit='s'),
+    })
+
+
+# Review sentiment data
+REVIEW_TEXTS = [
+    "Low fees are great but the signup was a nightmare. My ID verification failed 3 times.",
+    "Love this app! So easy to pay at my local spaza now.",
+    "Why can't I use M-Pesa to top up my wallet? Makes no sense. Verification also took 2 days.",
+    "Gave up. Too difficult to sign up. Sticking with cash.",
+    "Good app. Would be perfect if it worked with M-Pesa.",
+    "Verification process needs improvement but otherwise great!",
+    "M-Pesa integration please! That's all I ask.",
+    "Fast transactions once you're set up. Setup was painful though.",
+    "Best app for township payments!",
+    "Can't believe how easy it is to pay now. No more cash problems."
+]
+
+REVIEW_START = pd.Timestamp('2025-01-01')
+RATING_PROBS = [0.1, 0.15, 0.2, 0.3, 0.25]
+KEYWORD_PROBS = {'Keyword_Verification': 0.3, 'Keyword_M-Pesa': 0.4, 'Keyword_Fees': 0.05}
+
+
+def review_chunk(streams, start, stop, reviews_per_day=1):
+    n = stop - start
+    return pd.DataFrame({
+        'Review_ID': _padded_ids('R', start, stop),
+        'Date': REVIEW_START + pd.to_timedelta(np.arange(start, stop) // reviews_per_day, unit='D'),
+        'Rating': streams(0).choice(np.arange(1, 6, dtype=np.int8), n, p=RATING_PROBS),
+        'Review_Text': pd.Categorical.from_codes(streams(1).integers(0, len(REVIEW_TEXTS), n), REVIEW_TEXTS),
+        'Sentiment_Score': np.clip(streams(2).normal(0.35, 0.5, n), -1, 1),
+        **{column: (streams(3 + i).random(n) < p).astype(np.int8) for i, (column, p) in enumerate(KEYWORD_PROBS.items())},
+    })
+
+
+def generate_review_data(n_reviews=150, seed=42, reviews_per_day=1):
+    return generate_dataset('review_df', n_reviews, seed, reviews_per_day=reviews_per_day)
+
+
+# Weekly metrics data: (mean, sd, lower bound, upper bound) before and from the intervention
+WEEKLY_START = pd.Timestamp('2025-01-05')  # first Sunday of 2025
+WEEKLY_METRICS = {
+    'Weekly_New_Active_Users': ((7, 1.5), (13, 1.5), 5, None),
+    'Onboarding_Dropoff_Rate': ((0.71, 0.05), (0.41, 0.03), 0.3, 0.8),
+    'Avg_Customer_Satisfaction': ((3.4, 0.2), (4.1, 0.15), 2.5, 5),
+    'Support_Tickets_Onboarding': ((45, 5), (20, 3), 10, None),
+}
+
+
+def weekly_chunk(streams, start, stop, intervention_week=13):
+    weeks = np.arange(start, stop)
+    after = weeks >= intervention_week
+    columns = {}
+    for i, (column, (before, after_params, lower, upper)) in enumerate(WEEKLY_METRICS.items()):
+        mean = np.where(after, after_params[0], before[0])
+        sd = np.where(after, after_params[1], before[1])
+        columns[column] = np.clip(mean + sd * streams(i).standard_normal(len(weeks)), lower, upper)
+    return pd.DataFrame({
+        'Week': weeks + 1,
+        'Date': WEEKLY_START + pd.to_timedelta(7 * weeks, unit='D'),
+        **columns,
+    })
+
+
+def generate_weekly_data(n_weeks=24, intervention_week=13, seed=42):
+    return generate_dataset('weekly_df', n_weeks, seed, intervention_week=intervention_week)
+
+
+CHUNK_GENERATORS = {
+    'market_df': market_chunk,
+    'funnel_events': funnel_events_chunk,
+    'review_df': review_chunk,
+    'weekly_df': weekly_chunk,
+}
+
+
+# Transaction ledger in time order: users sign up through the period, keep
+# transacting with a decaying weekly probability, and cohorts from the
+# intervention week on retain better
+def generate_ledger(n_users=5000, n_weeks=24, intervention_week=13, seed=42):
+    rng = np.random.default_rng(seed)
+    signup = np.sort(rng.integers(0, n_weeks, n_users))
+    weeks_left = n_weeks - signup
+    user = np.repeat(np.arange(n_users), weeks_left)
+    since = np.arange(len(user)) - np.repeat(np.cumsum(weeks_left) - weeks_left, weeks_left)
+    floor = np.where(signup[user] >= intervention_week - 1, 0.3, 0.15)
+    active = (since == 0) | (rng.random(len(user)) < floor + (0.55 - floor) * 0.8 ** since)
+    user, week = user[active], (signup[user] + since)[active]
+
+    transactions = 1 + rng.poisson(2, len(user))
+    user, week = np.repeat(user, transactions), np.repeat(week, transactions)
+    offset = rng.integers(0, 7 * 24 * 3600, len(user))
+    timestamp = pd.Timestamp('2025-01-06') + pd.to_timedelta(week * 7 * 24 * 3600 + offset, unit='s')
+    order = np.argsort(timestamp.to_numpy(), kind='stable')
+    return pd.DataFrame({
+        'user_id': pd.Index([f'U{i:06d}' for i in range(n_users)])[user[order]],
+        'timestamp': timestamp[order],
+    })
+
+
+# Generate synthetic data
+def synthetic_source(n_stalls=96, adoption_rate=0.25, reason_probs=None, n_reviews=150, n_weeks=24, seed=42):
+    # Each frame has its own streams, so they can be built concurrently
+    return {
+        'market_df': partial(generate_market_data, n_stalls, adoption_rate, reason_probs, seed=seed),
+        'funnel_df': generate_funnel_data,
+        'review_df': partial(generate_review_data, n_reviews, seed=seed),
+        'weekly_df': partial(generate_weekly_data, n_weeks, seed=seed),
+    }
+
+
+def generate_kasipay_data(n_stalls=96, adoption_rate=0.25, reason_probs=None, n_reviews=150, n_weeks=24, seed=42):
+    # (market_df, funnel_df, review_df, weekly_df), built one after another
+    return tuple(load() for load in synthetic_source(n_stalls, adoption_rate, reason_probs, n_reviews, n_weeks, seed).values())
+
+
+# Data sources by name; each returns {frame name: load()} for the four frames
+DATA_SOURCES = {
+    "synthetic": synthetic_source,
+    # National-scale load test
+    "synthetic-national": lambda: synthetic_source(n_stalls=2_000_000),
+}
@@ -0,0 +1,37 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from analytics import FrameLoader
+
+
+def test_frame_loader_reports_slow_and_failing_loads():
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return pd.DataFrame()
+
+    def broken():
+        raise ValueError("bad export")
+
+    loader = FrameLoader(
+        {'fast': lambda: pd.DataFrame({'a': [1]}), 'slow': slow, 'broken': broken},
+        timeouts={'slow': 0.2},
+    )
+    assert loader.status('fast') == 'not started'
+    loader.start()
+    try:
+        assert loader.result('fast')['a'].tolist() == [1]
+        assert loader.status('fast') == 'ready'
+        with pytest.raises(ValueError, match="bad export"):
+            loader.result('broken')
+        assert loader.status('broken') == 'failed' and loader.error('broken') == "bad export"
+        assert loader.wait_next() == []  # returns once the slow load is past its timeout
+        assert loader.status('slow') == 'timed out'
+        with pytest.raises(TimeoutError, match="slow did not load within 0.2s"):
+            loader.result('slow')
+        assert not loader.complete()
+    finally:
+        release.set()
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chart_data import downsample, histogram_bins, lttb_indices, minmax_indices
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(3)
+    y = np.cumsum(rng.normal(size=5000))
+    y[1234], y[4321] = y.max() + 50, y.min() - 50  # spikes a downsampler must not hide
+    return pd.date_range('2025-01-01', periods=len(y), freq='h').to_numpy(), y
+
+
+@pytest.mark.parametrize('indices', [lttb_indices, minmax_indices])
+def test_downsampling_keeps_endpoints_and_extrema(series, indices):
+    x, y = series
+    for budget in (2, 3, 50, 501):
+        kept = indices(x, y, budget)
+        assert len(kept) <= budget
+        assert np.all(np.diff(kept) > 0)
+        assert kept[0] == 0 and kept[-1] == len(y) - 1
+        if budget >= 50:
+            assert {1234, 4321} <= set(kept.tolist())
+    assert indices(x, y, len(y)).tolist() == list(range(len(y)))
+    with pytest.raises(ValueError):
+        indices(x, y, 1)
+
+
+def test_lttb_spends_the_whole_budget(series):
+    x, y = series
+    assert len(lttb_indices(x, y, 200)) == 200
+
+
+def test_downsample_sorts_by_x_and_keeps_rows():
+    frame = pd.DataFrame({'x': np.arange(1000)[::-1], 'y': np.sin(np.arange(1000) / 20)})
+    reduced = downsample(frame, 'x', 'y', 100, method='minmax')
+    assert len(reduced) <= 100
+    assert reduced['x'].is_monotonic_increasing
+    assert reduced['x'].iloc[0] == 0 and reduced['x'].iloc[-1] == 999
+    pd.testing.assert_frame_equal(reduced, frame.loc[reduced.index])
+
+
+def test_histogram_bins_count_every_value():
+    values = np.random.default_rng(0).integers(5, 100, 1000)
+    edges, counts = histogram_bins(values, bins=20)
+    assert len(edges) == 21 and edges[0] == values.min() and edges[-1] == values.max()
+    assert counts.sum() == len(values)
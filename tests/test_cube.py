@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import MAX_SET_MEMBERS, Cube
+from metrics import (
+    KEYWORD_LABELS, NO_BARRIER, PAYMENT_METHODS, build_market_cube, build_payment_index, build_review_cube,
+)
+from review_store import KEYWORD_COLUMNS
+from synthetic_data import generate_market_data, generate_review_data
+
+
+@pytest.fixture
+def market():
+    market = generate_market_data(3000, seed=11)
+    # some stalls accept several methods, so the Payment dimension holds real sets
+    market['Primary_Payment_Method'] = market['Primary_Payment_Method'].astype(str)
+    market.loc[market.index[::5], 'Primary_Payment_Method'] = 'Cash, EFT, Zapper'
+    return market
+
+
+def test_market_marginals_match_filtering_the_frame(market):
+    cube = build_market_cube(market)
+    payments = build_payment_index(market)
+    selection = {'Region': ['Soweto', 'Umlazi'], 'Payment': ['Zapper', 'Cash Only']}
+    in_regions = market['Region'].isin(selection['Region'])
+    paying = payments['Zapper'] | ~payments.any(axis=1)
+    barriers = market.loc[in_regions & paying, 'Reason_For_Not_Using'].astype(object).fillna(NO_BARRIER).value_counts()
+    marginal = cube.marginal('Barrier', selection)
+    assert marginal[marginal > 0].sort_index().equals(barriers.sort_index().rename('count'))
+    assert cube.total(selection) == (in_regions & paying).sum()
+
+    # a set dimension counts each member, and the selection on itself is ignored
+    by_payment = cube.marginal('Payment', selection)
+    expected = payments[in_regions].sum()
+    assert by_payment[list(PAYMENT_METHODS)].tolist() == expected.tolist()
+    assert by_payment['Cash Only'] == (in_regions & ~payments.any(axis=1)).sum()
+
+
+def test_review_marginals_match_filtering_the_frame():
+    reviews = generate_review_data(400, reviews_per_day=2)
+    cube = build_review_cube(reviews)
+    selection = {'Rating': [1, 2], 'Keyword': ['Fees', 'M-Pesa']}
+    keyword_hits = reviews[['Keyword_Fees', 'Keyword_M-Pesa']].sum(axis=1) > 0
+    rows = reviews[reviews['Rating'].isin([1, 2]) & keyword_hits]
+    assert cube.total(selection) == len(rows)
+    assert cube.total(selection, 'sentiment') == pytest.approx(rows['Sentiment_Score'].sum())
+    keywords = cube.marginal('Keyword', {'Rating': [1, 2]})
+    in_ratings = reviews[reviews['Rating'].isin([1, 2])]
+    assert keywords.tolist() == [int(in_ratings[column].sum()) for column in KEYWORD_COLUMNS]
+    assert list(keywords.index) == KEYWORD_LABELS
+    days = cube.marginal('Day', selection)
+    assert days[days > 0].to_dict() == rows.groupby(rows['Date'].dt.normalize()).size().to_dict()
+
+
+def test_cubes_coded_alike_add_up_to_the_cube_of_both(market):
+    first, second = market.iloc[:2000], market.iloc[2000:].astype({'Region': str})
+    second.loc[second.index[:40], 'Region'] = 'Diepsloot'  # a region the first cube lacks
+    base = build_market_cube(first)
+    extra = build_market_cube(second, like=base)
+    combined = base.pad(extra.labels) + extra
+    both = pd.concat([first, second])
+    assert combined.total() == len(both)
+    for dimension in ('Region', 'Barrier', 'KasiPay', 'Payment'):
+        marginal = combined.marginal(dimension)
+        assert marginal.sum() == (base.marginal(dimension).sum() + extra.marginal(dimension).sum())
+    regions = both['Region'].astype(str).value_counts()
+    assert combined.marginal('Region')[regions.index].tolist() == regions.tolist()
+
+    with pytest.raises(ValueError):
+        base + extra
+    with pytest.raises(ValueError):
+        extra.pad(base.labels)
+
+
+def test_build_sums_values_per_cell():
+    cube = Cube.build(
+        {'a': np.array([0, 1, 1, 2]), 'b': np.array([1, 0, 0, 1])},
+        {'a': ['x', 'y', 'z'], 'b': ['p', 'q']},
+        values={'amount': np.array([1.0, 2.0, 3.0, 4.0])},
+    )
+    assert cube.measures['count'].tolist() == [[0, 1], [2, 0], [0, 1]]
+    assert cube.marginal('a', {'b': ['q']}, 'amount').tolist() == [1.0, 0.0, 4.0]
+    with pytest.raises(ValueError):
+        cube.marginal('c')
+
+
+def test_set_dimensions_are_capped():
+    names = [f'm{i}' for i in range(MAX_SET_MEMBERS + 1)]
+    with pytest.raises(ValueError, match="at most"):
+        Cube.build({'s': np.array([0])}, {'s': names}, members={'s': (names, None)})
@@ -0,0 +1,17 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'kasipay.py')
+VIEWS = ["Overview", "Market Analysis", "Onboarding Funnel", "Customer Feedback", "Retention", "Impact Analysis"]
+
+
+@pytest.mark.parametrize('view', VIEWS)
+def test_views_render_with_empty_review_store(view, tmp_path, monkeypatch):
+    monkeypatch.setenv('KASIPAY_REVIEW_STORE', str(tmp_path / 'reviews'))
+    app = AppTest.from_file(APP, default_timeout=120)
+    app.run()
+    app.selectbox[0].select(view).run()
+    assert not app.exception, [exception.message for exception in app.exception]
+    assert any(metric.label == "Total Reviews Analyzed" and metric.value == "0" for metric in app.metric)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+import funnel
+from generate_data import dataset_dir, write_datasets
+from synthetic_data import generate_dataset
+
+
+def test_streamed_funnel_matches_one_pass(tmp_path):
+    events = generate_dataset('funnel_events', 400, seed=3).sample(frac=1, random_state=0)
+    events['event'] = events['event'].astype(str)
+    events.loc[events.index[::7], 'event'] = 'app_download'  # aliases map to their stage
+    events.loc[events.index[::11], 'event'] = 'opened_settings'  # unknown events are ignored
+    half = len(events) // 2
+    events.iloc[:half].to_csv(tmp_path / 'a.csv', index=False)
+    events.iloc[half:].to_csv(tmp_path / 'b.csv', index=False)
+
+    streamed = funnel.furthest_stages([str(tmp_path / 'a.csv'), str(tmp_path / 'b.csv')], chunksize=50)
+    whole = funnel.reduce_events(events)
+    pd.testing.assert_frame_equal(streamed.sort_index(), whole.sort_index(), check_dtype=False)
+
+    funnel_df = funnel.compute_funnel(streamed)
+    assert np.all(np.diff(funnel_df['Users']) <= 0)
+    cohorts = funnel.compute_cohort_funnels(streamed)
+    assert cohorts.sum().tolist() == funnel_df['Users'].tolist()
+
+
+def test_funnel_reads_generated_event_parts(tmp_path, capsys):
+    write_datasets(str(tmp_path), {'funnel_events': 250}, chunk_rows=100, workers=1)
+    events = dataset_dir(str(tmp_path), 'funnel_events')
+    expected = pd.read_parquet(tmp_path / 'funnel_df.parquet')
+
+    funnel_df = funnel.compute_funnel(funnel.furthest_stages([events]))
+    assert funnel_df['Users'].tolist() == expected['Users'].tolist()
+    assert funnel_df['Users'].iloc[0] == 250
+
+    funnel.main([events])
+    assert "App Download" in capsys.readouterr().out
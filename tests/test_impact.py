@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+import impact
+
+
+def test_bootstrap_means_are_seeded_and_independent_of_block_size(monkeypatch):
+    values = np.random.default_rng(0).normal(10, 2, 40)
+    means = impact.bootstrap_means(values, 2000, np.random.default_rng(5))
+    assert np.array_equal(means, impact.bootstrap_means(values, 2000, np.random.default_rng(5)))
+    assert not np.array_equal(means, impact.bootstrap_means(values, 2000, np.random.default_rng(6)))
+    monkeypatch.setattr(impact, 'BLOCK_ELEMENTS', 7 * len(values))
+    assert np.array_equal(means, impact.bootstrap_means(values, 2000, np.random.default_rng(5)))
+    assert abs(means.mean() - values.mean()) < 0.1
+
+
+def test_impact_estimate_is_reproducible_and_brackets_the_difference():
+    rng = np.random.default_rng(1)
+    before, after = rng.normal(7, 1.5, 12), rng.normal(13, 1.5, 12)
+    estimate = impact.impact_estimate(before, after, n_resamples=1000)
+    assert estimate == impact.impact_estimate(before, after, n_resamples=1000)
+    low, high = estimate['difference_ci']
+    assert low < estimate['difference'] < high
+    assert low > 0
+    with pytest.raises(ValueError):
+        impact.impact_estimate(before[:1], after)
@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from live import LiveAggregates, LiveFeed, demo_events
+from metrics import build_market_cube, market_partial, merge_market_partials
+from synthetic_data import generate_market_data, generate_weekly_data
+
+
+def test_events_folded_in_batches_match_one_batch():
+    events = demo_events(np.random.default_rng(2), pd.Timestamp('2025-06-23'), 24 * 14, 600) + [None, {'type': 'stall'}]
+    whole = LiveAggregates().extend(events)
+    folded = LiveAggregates()
+    for start in range(0, len(events), 77):
+        folded = folded.extend(events[start:start + 77])
+    assert (folded.stall_events, folded.weekly_events, folded.rejected) == (whole.stall_events, whole.weekly_events, whole.rejected)
+    assert folded.rejected == 2
+    pd.testing.assert_frame_equal(folded.days, whole.days, check_freq=False)
+    assert sorted(folded.partials) == sorted(whole.partials)
+    for region, partial in whole.partials.items():
+        assert folded.partials[region]['stalls'] == partial['stalls']
+        assert folded.partials[region]['payments'].equals(partial['payments'])
+
+
+def test_live_stalls_add_to_the_survey():
+    market = generate_market_data(200)
+    events = [event for event in demo_events(np.random.default_rng(3), pd.Timestamp('2025-06-23'), 48, 300) if event['type'] == 'stall']
+    live = LiveAggregates().extend(events)
+    survey = {str(region): market_partial(shard) for region, shard in market.groupby('Region', observed=True)}
+    combined = merge_market_partials(live.add_partials(survey).values())
+    assert combined['stalls'] == len(market) + len(events)
+    assert combined['users'] == market['Uses_KasiPay'].sum() + sum(event['Uses_KasiPay'] for event in events)
+
+    cube = live.add_to_cube(build_market_cube(market))
+    assert cube.total() == len(market) + len(events)
+    assert cube.marginal('KasiPay').sum() == combined['stalls']
+
+
+def test_weekly_events_become_rows_after_the_last_week():
+    weekly = generate_weekly_data(4)
+    last = weekly['Date'].iloc[-1]
+    events = [
+        {'type': 'signup', 'timestamp': str(last + pd.Timedelta(days=8))},
+        {'type': 'signup', 'timestamp': str(last + pd.Timedelta(days=9))},
+        {'type': 'onboarding', 'timestamp': str(last + pd.Timedelta(days=8)), 'completed': False},
+        {'type': 'onboarding', 'timestamp': str(last + pd.Timedelta(days=8)), 'completed': True},
+        {'type': 'satisfaction', 'timestamp': str(last + pd.Timedelta(days=15)), 'score': 4},
+        {'type': 'support_ticket', 'timestamp': str(last + pd.Timedelta(days=2))},  # a week weekly_df already has
+    ]
+    live = LiveAggregates().extend(events)
+    frame = live.weekly_frame(weekly)
+    assert len(frame) == len(weekly) + 2
+    rows = frame.iloc[len(weekly):]
+    assert rows['Week'].tolist() == [5, 6]
+    assert rows['Weekly_New_Active_Users'].tolist() == [2, 0]
+    assert rows['Onboarding_Dropoff_Rate'].iloc[0] == 0.5 and np.isnan(rows['Onboarding_Dropoff_Rate'].iloc[1])
+    assert rows['Avg_Customer_Satisfaction'].iloc[1] == 4
+    assert live.late_events(weekly) == 1
+
+
+def test_feed_reads_complete_lines_only(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    signup = json.dumps({'type': 'signup', 'timestamp': '2025-06-23T09:15:00'})
+    path.write_text(signup + '\n' + signup[:10])
+    feed = LiveFeed(str(path))
+    assert feed.refresh().aggregates.weekly_events == 1
+    with open(path, 'a') as file:
+        file.write(signup[10:] + '\n')
+    snapshot = feed.refresh()
+    assert snapshot.aggregates.weekly_events == 2
+    assert snapshot.offset == path.stat().st_size
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from metrics import (
+    MARKET_TOTAL_METRICS, REGION_COLUMN, SENTIMENT_LABELS, build_payment_index, build_review_cube, count_payment_methods,
+    dependent_metrics, market_partial, merge_market_partials, parse_payment_methods, resolve_metric,
+)
+from synthetic_data import generate_market_data, generate_review_data
+
+
+def test_payment_index_matches_row_by_row_parsing():
+    market = pd.DataFrame({
+        'Primary_Payment_Method': ['Cash', 'Cash, EFT', 'KasiPay', None, 'SnapScan,Zapper'],
+        'Secondary_Payment_Method': ['None', 'KasiPay', 'KasiPay', 'EFT', None],
+    })
+    methods = ('KasiPay', 'SnapScan', 'Zapper', 'EFT')
+    index = build_payment_index(market, methods)
+    for row, (primary, secondary) in enumerate(zip(market['Primary_Payment_Method'], market['Secondary_Payment_Method'])):
+        tokens = {token.strip() for value in (primary, secondary) if pd.notna(value) for token in value.split(',')}
+        assert index.iloc[row].tolist() == [method in tokens for method in methods]
+    counts = count_payment_methods(index)
+    assert counts.to_dict() == {'KasiPay': 2, 'SnapScan': 1, 'Zapper': 1, 'EFT': 2, 'Cash Only': 1}
+
+
+def test_payment_methods_are_validated():
+    assert parse_payment_methods(" KasiPay, EFT ,,") == ('KasiPay', 'EFT')
+    for value in ("", " , ", "EFT,KasiPay,EFT", "KasiPay,Cash Only", ",".join(f"M{i}" for i in range(25))):
+        with pytest.raises(ValueError):
+            parse_payment_methods(value)
+
+
+def test_metrics_load_only_the_columns_they_need_once():
+    reviews = generate_review_data()
+    loads = []
+
+    def load_frame(frame, columns):
+        loads.append((frame, columns))
+        return reviews if columns is None else reviews[columns]
+
+    store = {}
+    assert resolve_metric('review_count', store, load_frame) == len(reviews)
+    assert resolve_metric('review_count', store, load_frame) == len(reviews)
+    assert loads == [('review_df', ['Rating'])]
+
+
+def test_frame_update_drops_only_its_dependents():
+    stale = dependent_metrics('weekly_df', ['weekly_df', 'review_df[Rating]', 'review_count', 'pre_weekly'])
+    assert {'weekly_df', 'pre_weekly', 'post_weekly', 'week_count'} <= stale
+    assert not stale & {'review_df[Rating]', 'review_count', 'rating_counts'}
+
+
+def test_merged_region_partials_match_the_unsharded_market():
+    market = generate_market_data(2000, seed=3)
+    partials = [market_partial(shard) for _, shard in market.groupby(REGION_COLUMN, observed=True)]
+    merged, whole = merge_market_partials(partials), market_partial(market)
+    assert merged['stalls'] == whole['stalls'] and merged['users'] == whole['users']
+    assert merged['reasons'].sort_index().equals(whole['reasons'].sort_index())
+    assert merged['payments'].sort_index().equals(whole['payments'].sort_index())
+    assert np.array_equal(merged['transactions'], whole['transactions'])
+    assert np.array_equal(merged['user_transactions'], whole['user_transactions'])
+    assert MARKET_TOTAL_METRICS['market_share'](merged) == MARKET_TOTAL_METRICS['market_share'](whole)
+    for merged_part, whole_part in zip(
+        MARKET_TOTAL_METRICS['transaction_histogram'](merged), MARKET_TOTAL_METRICS['transaction_histogram'](whole)
+    ):
+        assert np.array_equal(merged_part, whole_part)
+
+
+def test_review_cube_sentiment_marginal_matches_sentiment_counts():
+    reviews = generate_review_data()
+    reviews.loc[0, 'Sentiment_Score'] = -1.0  # the lowest edge belongs to Very Negative in both
+    counts = resolve_metric('sentiment_counts', {'review_df': reviews}, None)
+    marginal = build_review_cube(reviews).marginal('Sentiment')
+    assert list(marginal.index) == SENTIMENT_LABELS
+    assert marginal.tolist() == counts.reindex(SENTIMENT_LABELS).tolist()
+    assert marginal.sum() == len(reviews)
+
+
+def test_empty_review_frame_gives_empty_cube():
+    cube = build_review_cube(pd.DataFrame(columns=['Date', 'Rating', 'Sentiment_Score', 'Keyword_Verification', 'Keyword_M-Pesa', 'Keyword_Fees']))
+    assert cube.total() == 0
+    assert cube.marginal('Sentiment').tolist() == [0] * len(SENTIMENT_LABELS)
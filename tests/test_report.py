@@ -0,0 +1,14 @@
+import importlib.util
+
+import pytest
+
+import report
+
+
+def test_missing_pdf_packages_fail_before_rendering(tmp_path, monkeypatch, capsys):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec', lambda name: None if name in ('kaleido', 'PIL') else find_spec(name))
+    with pytest.raises(SystemExit):
+        report.main([str(tmp_path / 'out'), '--formats', 'html,pdf'])
+    assert "needs Pillow, kaleido" in capsys.readouterr().err
+    assert not (tmp_path / 'out').exists()
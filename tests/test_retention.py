@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from retention import LedgerFeed, RetentionState, ledger_weeks, retention_curve
+from synthetic_data import generate_ledger
+
+
+def test_failed_refresh_leaves_feed_unchanged(tmp_path):
+    (tmp_path / 'day1.csv').write_text("user_id,timestamp\n1,2024-01-01\n2,2024-01-02\n")
+    (tmp_path / 'day2.csv').write_text("user_id,when\n3,2024-01-08\n")
+    feed = LedgerFeed(str(tmp_path))
+    with pytest.raises(ValueError):
+        feed.refresh()
+    assert feed.snapshot.files == ()
+    assert feed.snapshot.state.rows == 0
+
+    (tmp_path / 'day2.csv').write_text("user_id,timestamp\n3,2024-01-08\n")
+    snapshot = feed.refresh()
+    assert len(snapshot.files) == 2
+    assert snapshot.state.rows == 3
+
+
+def test_chunked_state_matches_one_pass_and_direct_counts():
+    ledger = generate_ledger(n_users=600, n_weeks=10, seed=4)
+    whole = RetentionState.build(ledger)
+    for chunk in (97, 1000, len(ledger)):
+        chunked = RetentionState()
+        for start in range(0, len(ledger), chunk):
+            chunked = chunked.extend(ledger.iloc[start:start + chunk])
+        assert np.array_equal(chunked.active_users(), whole.active_users())
+        assert chunked.cohort_sizes().equals(whole.cohort_sizes())
+        pd.testing.assert_frame_equal(chunked.matrix(), whole.matrix())
+        assert chunked.rows == len(ledger)
+
+    weeks = pd.Series(ledger_weeks(ledger['timestamp']), index=ledger.index)
+    signup = weeks.groupby(ledger['user_id']).transform('min')
+    direct = (
+        pd.DataFrame({'cohort': signup - signup.min(), 'since': weeks - signup, 'user': ledger['user_id']})
+        .drop_duplicates().groupby(['cohort', 'since']).size()
+    )
+    active = whole.active_users()
+    assert all(active[cohort, since] == users for (cohort, since), users in direct.items())
+    assert active.sum() == direct.sum()
+    assert retention_curve(whole).iloc[0] == 1.0
+
+
+def test_ledger_rows_out_of_time_order_are_rejected():
+    ledger = generate_ledger(n_users=50, n_weeks=4)
+    state = RetentionState.build(ledger.iloc[len(ledger) // 2:])
+    with pytest.raises(ValueError, match="time order"):
+        state.extend(ledger.iloc[:10])
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from review_ingest import ingest_files, match_keywords, read_review_chunks
+from review_store import ReviewStore
+
+HEADER = 'review_id,date,rating,text\n'
+
+
+def test_csv_partial_last_row_waits_for_next_run(tmp_path):
+    path = str(tmp_path / 'reviews.csv')
+    store = ReviewStore(str(tmp_path / 'store'))
+    with open(path, 'w') as f:
+        f.write(HEADER + '1,2025-03-01,5,"great app,\nreally easy"\n2,2025-03-02,2,"half wri')
+    assert ingest_files([path], store) == 1
+
+    with open(path, 'a') as f:
+        f.write('tten review"\n3,2025-03-03,4,fine\n')
+    assert ingest_files([path], store) == 2
+    reviews, _ = store.read()
+    assert reviews['Review_ID'].tolist() == ['1', '2', '3']
+    assert reviews['Review_Text'].tolist() == ['great app,\nreally easy', 'half written review', 'fine']
+
+
+def test_csv_row_count_position_resumes_at_that_record(tmp_path):
+    path = str(tmp_path / 'reviews.csv')
+    with open(path, 'w') as f:
+        f.write(HEADER + '1,2025-03-01,5,"two\nlines"\n2,2025-03-02,2,ok\n3,2025-03-03,4,fine\n')
+    chunks = list(read_review_chunks(path, {'rows': 2, 'offset': 0}))
+    assert [chunk['review_id'].tolist() for chunk, _ in chunks] == [['3']]
+    assert chunks[-1][1] == {'rows': 3, 'offset': len(open(path, 'rb').read())}
+
+
+def test_verification_flags_identity_checks_not_onboarding_praise():
+    flags = match_keywords([
+        "Setup was quick and easy, love it",
+        "Signed up in two minutes, great onboarding",
+        "My ID verification failed 3 times",
+        "Selfie rejected, still pending approval after a week",
+        "They want KYC documents for R50",
+        "I'd pay with M-Pesa if I could",
+    ])
+    assert flags['Keyword_Verification'].tolist() == [0, 0, 1, 1, 1, 0]
+    assert flags['Keyword_M-Pesa'].tolist() == [0, 0, 0, 0, 0, 1]
+
+
+def test_json_array_export_is_read_whole_and_resumed_by_count(tmp_path):
+    path = tmp_path / 'reviews.json'
+    store = ReviewStore(str(tmp_path / 'store'))
+    records = [{'id': f'J{i}', 'date': f'2025-03-0{i}', 'stars': 4, 'content': 'Great app'} for i in range(1, 4)]
+    path.write_text(json.dumps(records[:2])[:-1])  # still being written
+    assert ingest_files([str(path)], store) == 0
+    path.write_text(json.dumps(records[:2]))
+    assert ingest_files([str(path)], store) == 2
+    path.write_text(json.dumps(records))  # re-exported with one more review
+    assert ingest_files([str(path)], store) == 1
+    assert store.read()[0]['Review_ID'].tolist() == ['J1', 'J2', 'J3']
+
+    path.write_text(json.dumps({'reviews': records}) + ']')
+    with pytest.raises(ValueError):
+        ingest_files([str(path)], ReviewStore(str(tmp_path / 'other')))
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from review_store import (
+    REVIEW_COLUMNS, SENTIMENT_BAND_EDGES, ReviewAggregates, ReviewFeed, ReviewIndex, ReviewStore, build_review_cube,
+    empty_reviews,
+)
+from synthetic_data import generate_review_data
+
+
+def test_empty_store_reads_typed_frame(tmp_path):
+    store = ReviewStore(str(tmp_path / 'reviews'))
+    reviews, offset = store.read()
+    assert offset == 0
+    assert list(reviews.columns) == REVIEW_COLUMNS
+    assert reviews.dtypes.equals(empty_reviews().dtypes)
+    assert reviews['Date'].dtype.kind == 'M'
+    assert ReviewFeed(store).refresh().frame.dtypes.equals(reviews.dtypes)
+
+
+def newest_first(reviews, mask):
+    # Expected order: newest date first, the later row first on equal dates
+    keyed = reviews[mask].assign(position=np.flatnonzero(mask))
+    return keyed.sort_values(['Date', 'position'], ascending=False)['position'].tolist()
+
+
+def test_index_pages_match_sorting_the_frame():
+    reviews = generate_review_data(300, reviews_per_day=4)
+    index = ReviewIndex.build(reviews.iloc[:120]).extend(reviews.iloc[120:])
+    bands = np.searchsorted(SENTIMENT_BAND_EDGES, reviews['Sentiment_Score'].to_numpy(), side='left')
+    for rating, band in [(None, None), (5, None), (None, 2), (4, 1)]:
+        mask = np.ones(len(reviews), dtype=bool)
+        if rating is not None:
+            mask &= reviews['Rating'].to_numpy() == rating
+        if band is not None:
+            mask &= bands == band
+        expected = newest_first(reviews, mask)
+        for start in (0, 10, len(expected) - 3):
+            positions, more = index.page(start, 10, rating=rating, band=band)
+            assert positions.tolist() == expected[start:start + 10]
+            assert more == (len(expected) > start + 10)
+
+
+def test_aggregates_extended_in_chunks_match_one_pass():
+    reviews = generate_review_data(200, reviews_per_day=3)
+    chunked = ReviewAggregates()
+    for start in range(0, len(reviews), 37):
+        chunked = chunked.extend(reviews.iloc[start:start + 37])
+    whole = ReviewAggregates.build(reviews)
+    for granularity in ('day', 'week', 'month'):
+        pd.testing.assert_frame_equal(chunked.series(granularity), whole.series(granularity))
+    weekly = whole.series('week')
+    weeks = reviews['Date'] - pd.to_timedelta(reviews['Date'].dt.weekday, unit='D')
+    expected = reviews.groupby(weeks)['Sentiment_Score'].mean()
+    np.testing.assert_allclose(weekly['Sentiment_Score'], expected.to_numpy())
+    assert weekly['Reviews'].sum() == len(reviews)
+
+
+def test_feed_cube_extended_on_append_matches_a_rebuild(tmp_path):
+    reviews = generate_review_data(120, reviews_per_day=2)
+    late, early = reviews.iloc[60:], reviews.iloc[:60]  # the second batch is dated before the first
+    store = ReviewStore(str(tmp_path / 'reviews'))
+    feed = ReviewFeed(store)
+    assert feed.refresh().cube.total() == 0
+    for batch in (late, early):
+        store.append(batch)
+        snapshot = feed.refresh()
+    rebuilt = build_review_cube(snapshot.frame)
+    assert snapshot.cube.labels['Day'].equals(rebuilt.labels['Day'])
+    for name, values in rebuilt.measures.items():
+        np.testing.assert_allclose(snapshot.cube.measures[name], values)
+    assert snapshot.cube.total() == len(reviews)
@@ -0,0 +1,40 @@
+import os
+
+import pandas as pd
+
+from analytics import shard_frames
+from snapshot_store import SnapshotStore
+from synthetic_data import generate_market_data, generate_review_data
+
+
+def test_published_frames_read_back_by_column_and_row(tmp_path):
+    reviews = generate_review_data(50)
+    store = SnapshotStore(str(tmp_path))
+    store.publish('synthetic-1', {'review_df': reviews})
+
+    assert store.exists('synthetic-1')
+    pd.testing.assert_frame_equal(store.read('synthetic-1', 'review_df'), reviews)
+    pd.testing.assert_frame_equal(store.read('synthetic-1', 'review_df', ['Rating', 'Date']), reviews[['Rating', 'Date']])
+    pd.testing.assert_frame_equal(
+        store.take('synthetic-1', 'review_df', [3, 1], ['Review_ID']),
+        reviews[['Review_ID']].iloc[[3, 1]].reset_index(drop=True),
+    )
+
+
+def test_sharded_frames_read_back_by_shard(tmp_path):
+    market = generate_market_data(300)
+    store = SnapshotStore(str(tmp_path))
+    store.publish('synthetic-1', shard_frames({'market_df': market}))
+    regions = sorted(market['Region'].astype(str).unique())
+    assert store.shards('synthetic-1', 'market_df') == regions
+    soweto = store.read('synthetic-1', 'market_df', ['Stall_ID'], shards=['Soweto'])
+    assert soweto['Stall_ID'].tolist() == market.loc[market['Region'] == 'Soweto', 'Stall_ID'].tolist()
+    assert len(store.read('synthetic-1', 'market_df')) == len(market)
+
+
+def test_first_publish_of_a_snapshot_wins(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.publish('synthetic-1', {'weekly_df': pd.DataFrame({'Week': [1, 2]})})
+    store.publish('synthetic-1', {'weekly_df': pd.DataFrame({'Week': [3]})})
+    assert store.read('synthetic-1', 'weekly_df')['Week'].tolist() == [1, 2]
+    assert os.listdir(tmp_path) == ['synthetic-1']  # no half-written temp directories
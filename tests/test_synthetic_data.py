@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from generate_data import dataset_dir, write_datasets
+from synthetic_data import CHUNK_GENERATORS, MARKET_REASONS, generate_chunk, generate_dataset, generate_market_data
+
+
+def test_market_data_spreads_adopters_evenly_and_is_seeded():
+    market = generate_market_data(1000, adoption_rate=0.3, seed=7, batch_size=256)
+    users = market['Uses_KasiPay'].to_numpy()
+    assert len(market) == 1000
+    assert market['Stall_ID'].is_unique
+    # any first n stalls hold round(n * adoption_rate) adopters
+    assert [users[:n].sum() for n in (10, 100, 1000)] == [3, 30, 300]
+    assert market.loc[users, 'Reason_For_Not_Using'].isna().all()
+    assert market.loc[~users, 'Reason_For_Not_Using'].isin(MARKET_REASONS).all()
+    assert (market.loc[users, 'Secondary_Payment_Method'] == 'KasiPay').all()
+    assert market['Daily_Transaction_Count'].between(5, 99).all()
+
+    assert market.equals(generate_market_data(1000, adoption_rate=0.3, seed=7, batch_size=256))
+    other = generate_market_data(1000, adoption_rate=0.3, seed=8, batch_size=256)
+    assert not np.array_equal(market['Daily_Transaction_Count'], other['Daily_Transaction_Count'])
+
+
+@pytest.mark.parametrize('dataset', list(CHUNK_GENERATORS))
+def test_more_rows_leave_earlier_rows_unchanged(dataset):
+    small = generate_dataset(dataset, 130, seed=5, chunk_rows=50)
+    large = generate_dataset(dataset, 260, seed=5, chunk_rows=50)
+    key = 'user_id' if dataset == 'funnel_events' else None
+    prefix = large[large[key] < 130] if key else large.iloc[:130]
+    pd.testing.assert_frame_equal(prefix.reset_index(drop=True), small)
+    # a chunk is generated alone, from the seed and its index only
+    last = generate_chunk(dataset, 5, 260, seed=5, chunk_rows=50)
+    tail = large[large[key] >= 250] if key else large.iloc[250:]
+    pd.testing.assert_frame_equal(last, tail.reset_index(drop=True))
+
+
+def test_written_parts_do_not_depend_on_workers(tmp_path):
+    sizes = {'market_df': 250, 'review_df': 120, 'funnel_events': 90}
+    write_datasets(str(tmp_path / 'one'), sizes, chunk_rows=40, workers=1)
+    write_datasets(str(tmp_path / 'three'), sizes, chunk_rows=40, workers=3)
+    for dataset in sizes:
+        one, three = dataset_dir(str(tmp_path / 'one'), dataset), dataset_dir(str(tmp_path / 'three'), dataset)
+        names = sorted(os.listdir(one))
+        assert names == sorted(os.listdir(three))
+        for name in names:
+            with open(os.path.join(one, name), 'rb') as a, open(os.path.join(three, name), 'rb') as b:
+                assert a.read() == b.read(), f"{dataset}/{name}"
+    pd.testing.assert_frame_equal(
+        pd.read_parquet(tmp_path / 'one' / 'funnel_df.parquet'), pd.read_parquet(tmp_path / 'three' / 'funnel_df.parquet'),
+    )